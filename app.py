@@ -1,20 +1,50 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, get_flashed_messages, send_from_directory, jsonify
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, flash, get_flashed_messages, send_from_directory, jsonify, make_response, abort, Response, stream_with_context
 import json
 import csv
-from datetime import datetime
-from utils.graph_utils import generate_profit_chart, generate_item_profit_chart, generate_service_profit_chart, generate_daily_revenue_chart
+import math
+from datetime import datetime, timezone
 import os
 import locale
 import sys
 import logging
 from logging.handlers import RotatingFileHandler
 import io
+import hashlib
+import threading
 
 # Import the path handling utilities
-from path_fix import get_data_path, get_data_file_path
+from path_fix import init_data_dir, get_data_path, get_data_file_path
+# pandas is only imported once a route needs it
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
 # Import app configuration
 from config import configure_app
+# Shared in-memory cache of the JSON data files
+from utils.data_store import data_store
+# Name index of services, inventory and promotions
+from utils.catalog import catalog
+# Shared, incrementally refreshed jobs table
+from utils.jobs_cache import jobs_table, jobs_writer
+# Optional SQLite mirror of jobs.csv for history queries
+from utils import jobs_db
+# Keyset-paged job history
+from utils.history import (history_index, read_filters, read_limit, encode_cursor, decode_cursor,
+                           PAGE_SIZE, iter_pages, csv_export, xlsx_export, xlsx_available)
+# Single-pass dashboard aggregation
+from utils.analytics import (DashboardMetrics, compute_dashboard, jobs_index, date_window,
+                             comparison_window, DATE_RANGES, COMPARISONS)
+# Persisted daily rollups for the chart reports
+from utils.rollups import rollup_store
+# Per-item statistics index and promotional price suggestions
+from utils.item_stats import item_stats
+from utils.price_suggestions import build_suggestions
+# Vectorized pricing scenarios and cached results for the simulator
+from utils.pricing import sweep
+from utils.simulator import simulator_results
+# Price elasticity fitted from the jobs history, for demand-adjusted projections
+from utils.elasticity import elasticity_model
+# Start-up readiness reported by /healthz
+from utils.readiness import readiness
 
 # Set up logger with FileHandler
 log_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.log')
@@ -100,330 +130,208 @@ app = configure_app(app)
 # Default to service menu disabled unless specifically enabled by launcher
 app.config.setdefault('SERVICE_MENU_ENABLED', False)
 
+# Jobs storage backend for history queries: 'csv' (default) or 'sqlite'
+app.config.setdefault('JOBS_BACKEND', os.environ.get('SALON_JOBS_BACKEND', 'csv'))
+
+# Warm caches in a background thread at startup unless disabled (SALON_WARMUP=0)
+app.config.setdefault('WARMUP_ENABLED', os.environ.get('SALON_WARMUP', '1') != '0')
+
+# Resolve the data directory and sync bundled defaults once at startup,
+# so per-request path lookups never touch the filesystem
+readiness.require('data_dir')
+readiness.mark('data_dir', path=init_data_dir().path)
+
+@app.route('/healthz')
+def healthz():
+    """Readiness probe: 200 once start-up has finished, 503 before that"""
+    # Caches and the chart backend load on first use; report whether that has happened yet
+    report = readiness.report(extra={
+        'jobs_table': {'ready': jobs_table.version > 0, 'version': jobs_table.version},
+        'rollups': {'ready': rollup_store.version > 0, 'version': rollup_store.version},
+        'chart_backend': {'ready': 'matplotlib.pyplot' in sys.modules},
+    })
+    return jsonify(report), 200 if report['ready'] else 503
+
 # API routes for accessing data files
 @app.route('/api/customers')
 def api_customers():
-    customers_path = get_data_file_path('customers.json')
-    print(f"Loading customers from: {customers_path}")
-    if os.path.exists(customers_path):
-        try:
-            with open(customers_path, 'r', encoding='utf-8') as f:
-                customers_data = json.load(f)
-                print(f"Loaded {len(customers_data)} customers: {[c.get('name', 'Unknown') for c in customers_data]}")
-                return jsonify(customers_data)
-        except Exception as e:
-            print(f"Error loading customers: {e}")
-            return jsonify([])
-    else:
-        print(f"No customers file found at {customers_path}")
+    try:
+        customers_data = data_store.load('customers.json')
+    except Exception as e:
+        print(f"Error loading customers: {e}")
+        return jsonify([])
+    if customers_data is None:
+        print(f"No customers file found at {get_data_file_path('customers.json')}")
         return jsonify([])
+    return jsonify(customers_data)
 
 @app.route('/api/services')
 def api_services():
-    services_path = get_data_file_path('services.json')
-    print(f"Loading services from: {services_path}")
-    if os.path.exists(services_path):
-        try:
-            with open(services_path, 'r', encoding='utf-8') as f:
-                services_data = json.load(f)
-                print(f"Loaded {len(services_data)} services")
-                return jsonify(services_data)
-        except Exception as e:
-            print(f"Error loading services: {e}")
-            return jsonify([])
-    else:
-        print(f"No services file found at {services_path}")
+    try:
+        services_data = data_store.load('services.json')
+    except Exception as e:
+        print(f"Error loading services: {e}")
+        return jsonify([])
+    if services_data is None:
+        print(f"No services file found at {get_data_file_path('services.json')}")
         return jsonify([])
+    return jsonify(services_data)
 
 @app.route('/api/inventory')
 def api_inventory():
-    inventory_path = get_data_file_path('inventory.json')
-    print(f"Loading inventory from: {inventory_path}")
-    if os.path.exists(inventory_path):
-        try:
-            with open(inventory_path, 'r', encoding='utf-8') as f:
-                inventory_data = json.load(f)
-                print(f"Loaded {len(inventory_data)} inventory items")
-                return jsonify(inventory_data)
-        except Exception as e:
-            print(f"Error loading inventory: {e}")
-            return jsonify([])
-    else:
-        print(f"No inventory file found at {inventory_path}")
+    try:
+        inventory_data = data_store.load('inventory.json')
+    except Exception as e:
+        print(f"Error loading inventory: {e}")
+        return jsonify([])
+    if inventory_data is None:
+        print(f"No inventory file found at {get_data_file_path('inventory.json')}")
         return jsonify([])
+    return jsonify(inventory_data)
 
 @app.route('/')
 def analyst():
     chart = None
+    chart_url = None
+    chart_data_url = None
     report_type = request.args.get('report_type', 'total_profit')
     chart_type = request.args.get('chart_type', 'pie')  # Changed default to pie
     date_range = request.args.get('date_range', 'all')
     comparison = request.args.get('comparison', 'none')
+    # render=client draws the chart in the browser from /charts/<report_type>.json
+    render = request.args.get('render', 'server')
+    if date_range not in DATE_RANGES:
+        date_range = 'all'
+    if comparison not in COMPARISONS:
+        comparison = 'none'
+    # All Time has no earlier period to compare with; its growth rates compare its first and second half
+    if date_range == 'all':
+        comparison = 'none'
     
-    # Default values for stats
-    total_revenue = 0
-    total_cost = 0
-    net_profit = 0
-    service_revenue = 0
-    product_revenue = 0
-    service_profit = 0
-    product_profit = 0
     last_updated = datetime.now().strftime('%d %B %Y, %H:%M')
     report_title = 'Sales Analysis'
     
-    # Default values for additional metrics
-    customer_count = 0
-    average_price = 0
-    best_profit_item = "N/A"
-    best_profit_amount = 0
-    customer_growth_rate = 0
-    service_growth_rate = 0
-    product_growth_rate = 0
+    # Default (empty) values for all stats
+    metrics = DashboardMetrics()
     
     # Load jobs data if available
     jobs_path = get_data_file_path('jobs.csv')
     if os.path.exists(jobs_path):
         try:
-            # Load jobs data for analysis
-            # Debug info
-            print(f"Jobs CSV exists: {os.path.exists(jobs_path)}")
+            # Days covered by the selected period and by the period it is compared with
+            window = date_window(date_range)
+            previous_window = comparison_window(window, comparison)
             
-            # Load jobs.csv with proper header handling
+            # All KPIs come from one aggregation of the jobs inside the window
             try:
-                # Load CSV with header row (not treating header as data)
-                jobs_df = pd.read_csv(jobs_path)
-                print(f"Loaded CSV with columns: {jobs_df.columns.tolist()}")
-                print(f"Data shape: {jobs_df.shape}")
-                
-            except Exception as e:
-                print(f"Error loading jobs.csv: {e}")
-                # Create empty dataframe with needed columns
-                jobs_df = pd.DataFrame(columns=['date', 'customer', 'item', 'quantity', 'price', 'cost', 'category'])
+                previous_jobs = jobs_index.window(previous_window) if previous_window else None
+                metrics = compute_dashboard(jobs_index.window(window), previous_jobs)
+            except Exception as metrics_error:
+                print(f"Error calculating dashboard metrics: {metrics_error}")
             
-            # Convert columns to proper types
-            if not jobs_df.empty:
-                # Ensure numeric columns are properly typed
-                jobs_df['quantity'] = pd.to_numeric(jobs_df['quantity'], errors='coerce').fillna(0).astype(int)
-                jobs_df['price'] = pd.to_numeric(jobs_df['price'], errors='coerce').fillna(0)
-                jobs_df['cost'] = pd.to_numeric(jobs_df['cost'], errors='coerce').fillna(0)
-                # Add cost column based on item mappings
-                # Get services and inventory for cost mapping
-                services = []
-                inventory = []
-                services_path = get_data_file_path('services.json')
-                if os.path.exists(services_path):
-                    with open(services_path, 'r', encoding='utf-8') as f:
-                        services = json.load(f)
-                inventory_path = get_data_file_path('inventory.json')
-                if os.path.exists(inventory_path):
-                    with open(inventory_path, 'r', encoding='utf-8') as f:
-                        inventory = json.load(f)
-                
-                # Create cost mapping
-                cost_map = {}
-                for service in services:
-                    cost_map[service.get('name')] = float(service.get('cost', 0))
-                for item in inventory:
-                    cost_map[item.get('name')] = float(item.get('cost', 0))
-                
-                # Add costs
-                costs = []
-                for _, row in jobs_df.iterrows():
-                    item_name = row['item']
-                    quantity = row['quantity']
-                    cost = cost_map.get(item_name, 0) * quantity
-                    costs.append(cost)
-                
-                jobs_df['cost'] = costs
-            
-            # Calculate basic stats
-            if not jobs_df.empty:
-                # Calculate metrics with defensive checks
-                try:
-                    # Make sure price and quantity columns exist and are numeric
-                    if 'price' in jobs_df.columns and 'quantity' in jobs_df.columns:
-                        # Calculate revenue (price * quantity)
-                        jobs_df['revenue'] = jobs_df['price'] * jobs_df['quantity']
-                        
-                        # Use total_profit from CSV if available, otherwise calculate it
-                        if 'total_profit' in jobs_df.columns:
-                            jobs_df['profit'] = jobs_df['total_profit']
-                        elif 'cost' in jobs_df.columns:
-                            # Calculate profit: (price - cost) * quantity (cost is unit cost)
-                            jobs_df['profit'] = (jobs_df['price'] - jobs_df['cost']) * jobs_df['quantity']
-                        else:
-                            jobs_df['profit'] = jobs_df['revenue']
-                        
-                        # Calculate total cost for summary (unit cost * quantity)
-                        if 'cost' in jobs_df.columns:
-                            jobs_df['total_cost'] = jobs_df['cost'] * jobs_df['quantity']
-                        else:
-                            jobs_df['total_cost'] = 0
-                        
-                        # Calculate summary metrics
-                        total_revenue = jobs_df['revenue'].sum()
-                        total_cost = jobs_df['total_cost'].sum() if 'total_cost' in jobs_df.columns else 0
-                        net_profit = jobs_df['profit'].sum()
-                    else:
-                        print(f"Missing required columns. Available columns: {jobs_df.columns.tolist()}")
-                        total_revenue = total_cost = net_profit = 0
-                except Exception as calc_error:
-                    print(f"Error in calculation: {calc_error}")
-                    total_revenue = total_cost = net_profit = 0
-                
-                # Calculate category-specific metrics
-                # Default values
-                service_revenue = service_cost = service_profit = 0
-                product_revenue = product_cost = product_profit = 0
-                
-                # Check if we have the necessary columns for category analysis
-                if 'category' in jobs_df.columns and 'revenue' in jobs_df.columns:
-                    try:
-                        # Filter by service and product
-                        services_df = jobs_df[jobs_df['category'] == 'service']
-                        products_df = jobs_df[jobs_df['category'] == 'product']
-                        
-                        # Calculate service metrics
-                        if not services_df.empty and 'revenue' in services_df:
-                            service_revenue = services_df['revenue'].sum()
-                            service_cost = services_df['cost'].sum() if 'cost' in services_df else 0
-                            service_profit = service_revenue - service_cost
-                        
-                        # Calculate product metrics
-                        if not products_df.empty and 'revenue' in products_df:
-                            product_revenue = products_df['revenue'].sum()
-                            product_cost = products_df['cost'].sum() if 'cost' in products_df else 0
-                            product_profit = product_revenue - product_cost
-                    except Exception as cat_error:
-                        print(f"Error in category calculations: {cat_error}")
+            # Charts are drawn from the persisted daily rollup, cut down to the window,
+            # and reused from the chart cache while no new job has been recorded
+            from utils.graph_utils import REPORTS, render_report_chart
+            if report_type in REPORTS:
+                report_title = REPORTS[report_type][1]
+                if chart_type == 'table':
+                    chart = render_report_chart(report_type, chart_type, window)
+                elif render == 'client':
+                    chart_data_url = url_for('chart_data', report_type=report_type,
+                                             chart_type=chart_type, date_range=date_range)
                 else:
-                    print("Missing category or revenue columns for category analysis")
-                
-                # Calculate additional analytics metrics
-                customer_count = 0
-                average_price = 0
-                best_profit_item = "N/A"
-                best_profit_amount = 0
-                customer_growth_rate = 0
-                service_growth_rate = 0
-                product_growth_rate = 0
-                
-                try:
-                    # Customer count - unique customers (debug the count)
-                    if 'customer' in jobs_df.columns:
-                        unique_customers = jobs_df['customer'].dropna().unique()
-                        customer_count = len(unique_customers)
-                        print(f"Debug: Unique customers found: {unique_customers}")
-                        print(f"Debug: Customer count: {customer_count}")
-                    
-                    # Average price per transaction
-                    if 'price' in jobs_df.columns and not jobs_df.empty:
-                        average_price = jobs_df['price'].mean()
-                    
-                    # Best profit item
-                    if 'item' in jobs_df.columns and 'profit' in jobs_df.columns:
-                        item_profits = jobs_df.groupby('item')['profit'].sum().sort_values(ascending=False)
-                        if not item_profits.empty:
-                            best_profit_item = item_profits.index[0]
-                            best_profit_amount = item_profits.iloc[0]
-                    
-                    # Calculate growth rates (simplified - comparing current period vs previous)
-                    # For now, we'll calculate based on available data trends
-                    # This is a basic implementation - in a real scenario, you'd compare time periods
-                    
-                    if 'date' in jobs_df.columns and not jobs_df.empty:
-                        # Sort by date to analyze trends
-                        jobs_df_sorted = jobs_df.sort_values('date')
-                        
-                        # For growth rates, we'll use a simple approach:
-                        # Compare first half vs second half of data
-                        mid_point = len(jobs_df_sorted) // 2
-                        if mid_point > 0:
-                            first_half = jobs_df_sorted.iloc[:mid_point]
-                            second_half = jobs_df_sorted.iloc[mid_point:]
-                            
-                            # Customer growth rate
-                            first_customers = first_half['customer'].nunique() if not first_half.empty else 0
-                            second_customers = second_half['customer'].nunique() if not second_half.empty else 0
-                            if first_customers > 0:
-                                customer_growth_rate = ((second_customers - first_customers) / first_customers) * 100
-                            
-                            # Service growth rate (by revenue)
-                            first_service_revenue = first_half[first_half['category'] == 'service']['revenue'].sum() if not first_half.empty else 0
-                            second_service_revenue = second_half[second_half['category'] == 'service']['revenue'].sum() if not second_half.empty else 0
-                            if first_service_revenue > 0:
-                                service_growth_rate = ((second_service_revenue - first_service_revenue) / first_service_revenue) * 100
-                            
-                            # Product growth rate (by revenue)
-                            first_product_revenue = first_half[first_half['category'] == 'product']['revenue'].sum() if not first_half.empty else 0
-                            second_product_revenue = second_half[second_half['category'] == 'product']['revenue'].sum() if not second_half.empty else 0
-                            if first_product_revenue > 0:
-                                product_growth_rate = ((second_product_revenue - first_product_revenue) / first_product_revenue) * 100
-                            
-                except Exception as metrics_error:
-                    print(f"Error calculating additional metrics: {metrics_error}")
-            
-            # Import all chart generation functions
-            from utils.graph_utils import (generate_daily_revenue_chart, generate_item_profit_chart, 
-                                          generate_service_profit_chart, generate_category_comparison_chart)
-            
-            # Generate charts with the requested chart_type
-            if report_type == 'total_profit':
-                chart = generate_daily_revenue_chart(chart_type=chart_type)
-                report_title = 'Daily Revenue Analysis'
-            elif report_type == 'profit_per_item':
-                chart = generate_item_profit_chart(chart_type=chart_type)
-                report_title = 'Profit Analysis - Inventory Products Only'
-            elif report_type == 'profit_per_service':
-                chart = generate_service_profit_chart(chart_type=chart_type)
-                report_title = 'Profit Per Service Type'
-            elif report_type == 'category_comparison':
-                chart = generate_category_comparison_chart(chart_type=chart_type)
-                report_title = 'Services vs Products Analysis'
+                    # The browser loads (and caches) image charts from /charts/<report_type>.png
+                    chart_url = url_for('chart_image', report_type=report_type,
+                                        chart_type=chart_type, date_range=date_range)
         
         except Exception as e:
             print(f"Error processing data: {e}")
     
-    # Format values as Thai Baht
-    formatted_revenue = format_thai_baht(total_revenue)
-    formatted_cost = format_thai_baht(total_cost)
-    formatted_profit = format_thai_baht(net_profit)
-    
-    # Format category metrics
-    formatted_service_revenue = format_thai_baht(service_revenue)
-    formatted_product_revenue = format_thai_baht(product_revenue)
-    formatted_service_profit = format_thai_baht(service_profit)
-    formatted_product_profit = format_thai_baht(product_profit)
-    
-    # Calculate percentages
-    service_percentage = (service_revenue / total_revenue * 100) if total_revenue > 0 else 0
-    product_percentage = (product_revenue / total_revenue * 100) if total_revenue > 0 else 0
-    
     return render_template('analyst.html', 
                           chart=chart, 
+                          chart_url=chart_url,
+                          chart_data_url=chart_data_url,
+                          render=render,
                           report_type=report_type,
                           chart_type=chart_type,
                           date_range=date_range,
+                          date_range_label=DATE_RANGES[date_range],
                           comparison=comparison,
-                          total_revenue=formatted_revenue,
-                          total_cost=formatted_cost,
-                          net_profit=formatted_profit,
-                          service_revenue=formatted_service_revenue,
-                          product_revenue=formatted_product_revenue,
-                          service_profit=formatted_service_profit,
-                          product_profit=formatted_product_profit,
-                          service_percentage=f"{service_percentage:.1f}%",
-                          product_percentage=f"{product_percentage:.1f}%",
-                          customer_count=customer_count,
-                          average_price=format_thai_baht(average_price),
-                          best_profit_item=best_profit_item,
-                          best_profit_amount=format_thai_baht(best_profit_amount),
-                          customer_growth_rate=f"{customer_growth_rate:.1f}%",
-                          service_growth_rate=f"{service_growth_rate:.1f}%",
-                          product_growth_rate=f"{product_growth_rate:.1f}%",
+                          comparison_label=COMPARISONS[comparison],
+                          total_revenue=format_thai_baht(metrics.total_revenue),
+                          total_cost=format_thai_baht(metrics.total_cost),
+                          net_profit=format_thai_baht(metrics.net_profit),
+                          service_revenue=format_thai_baht(metrics.service_revenue),
+                          product_revenue=format_thai_baht(metrics.product_revenue),
+                          service_profit=format_thai_baht(metrics.service_profit),
+                          product_profit=format_thai_baht(metrics.product_profit),
+                          service_percentage=f"{metrics.service_percentage:.1f}%",
+                          product_percentage=f"{metrics.product_percentage:.1f}%",
+                          customer_count=metrics.customer_count,
+                          average_price=format_thai_baht(metrics.average_price),
+                          best_profit_item=metrics.best_profit_item,
+                          best_profit_amount=format_thai_baht(metrics.best_profit_amount),
+                          customer_growth_rate=f"{metrics.customer_growth_rate:.1f}%",
+                          service_growth_rate=f"{metrics.service_growth_rate:.1f}%",
+                          product_growth_rate=f"{metrics.product_growth_rate:.1f}%",
                           last_updated=last_updated,
                           report_title=report_title)
 
+def _chart_response(report_type, mimetype, render):
+    """
+    Response for a chart endpoint, with an ETag and Last-Modified derived from
+    jobs.csv so browsers can revalidate with a conditional GET (304) instead of
+    downloading the chart again. render(chart_type, window) is only called when needed.
+    """
+    from utils.graph_utils import REPORTS
+    if report_type not in REPORTS:
+        abort(404)
+
+    chart_type = request.args.get('chart_type', 'pie')
+    date_range = request.args.get('date_range', 'all')
+    window = date_window(date_range if date_range in DATE_RANGES else 'all')
+    stamp = rollup_store.data_stamp()
+    if stamp is None:
+        abort(404)
+
+    window_key = tuple(day.strftime('%Y-%m-%d') for day in window) if window else None
+    response = make_response()
+    response.set_etag(hashlib.md5(repr((report_type, mimetype, chart_type, window_key, stamp)).encode()).hexdigest())
+    response.last_modified = datetime.fromtimestamp(stamp[0] / 1e9, tz=timezone.utc)
+    response.cache_control.no_cache = True
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    body = render(chart_type, window)
+    if isinstance(body, str) and mimetype == 'image/png':
+        # Nothing to draw (or the chart failed), body is an HTML message
+        response.status_code = 500 if 'alert-danger' in body else 404
+        response.mimetype = 'text/html'
+    else:
+        response.mimetype = mimetype
+    response.set_data(body)
+    return response
+
+@app.route('/charts/<report_type>.png')
+def chart_image(report_type):
+    from utils.graph_utils import render_report_chart
+    return _chart_response(report_type, 'image/png',
+                           lambda chart_type, window: render_report_chart(report_type, chart_type, window, output='png'))
+
+@app.route('/charts/<report_type>.json')
+def chart_data(report_type):
+    from utils.graph_utils import render_report_series
+
+    def render(chart_type, window):
+        series = render_report_series(report_type, chart_type, window)
+        if not isinstance(series, dict):
+            # The generator failed and returned an HTML error message
+            abort(500)
+        return json.dumps(series, separators=(',', ':'))
+
+    return _chart_response(report_type, 'application/json', render)
+
 @app.route('/update_price', methods=['POST'])
 def update_price():
     """Update price in services.json or inventory.json"""
@@ -437,12 +345,9 @@ def update_price():
         new_price = float(data['newPrice'])
         
         # Search for the item in services.json
-        services_path = get_data_file_path('services.json')
+        services = data_store.load('services.json', copy_data=True)
         services_updated = False
-        if os.path.exists(services_path):
-            with open(services_path, 'r', encoding='utf-8') as f:
-                services = json.load(f)
-                
+        if services is not None:
             # Look for the item in services
             for service in services:
                 if service.get('name') == item_name:
@@ -452,22 +357,17 @@ def update_price():
             
             # Save updates if any were made
             if services_updated:
-                with open(services_path, 'w', encoding='utf-8') as f:
-                    json.dump(services, f, indent=2, ensure_ascii=False)
+                data_store.save('services.json', services)
                 return jsonify({'success': True, 'message': 'Service price updated', 'type': 'service'})
         
         # If not found in services, check inventory.json
-        inventory_path = get_data_file_path('inventory.json')
-        if os.path.exists(inventory_path):
-            with open(inventory_path, 'r', encoding='utf-8') as f:
-                inventory = json.load(f)
-                
+        inventory = data_store.load('inventory.json', copy_data=True)
+        if inventory is not None:
             # Look for the item in inventory
             for item in inventory:
                 if item.get('name') == item_name:
                     item['retail_price'] = int(new_price)  # Convert to integer
-                    with open(inventory_path, 'w', encoding='utf-8') as f:
-                        json.dump(inventory, f, indent=2, ensure_ascii=False)
+                    data_store.save('inventory.json', inventory)
                     return jsonify({'success': True, 'message': 'Inventory price updated', 'type': 'inventory'})
         
         return jsonify({'success': False, 'message': 'Item not found in services or inventory'}), 404
@@ -499,124 +399,20 @@ def simulator():
     jobs_path = get_data_file_path('jobs.csv')
     if os.path.exists(jobs_path):
         try:
-            # Load jobs data using the correct path
-            jobs_df = pd.read_csv(jobs_path)
+            # Shared jobs table; revenue and profit are precomputed
+            jobs_df = jobs_table.frame(copy=False)
             
             # Ensure required columns exist
             if all(col in jobs_df.columns for col in ['item', 'quantity', 'price', 'cost']):
-                # Calculate current metrics
-                jobs_df['revenue'] = jobs_df['price'] * jobs_df['quantity']
-                
-                # Use total_profit from CSV if available, otherwise calculate it
-                if 'total_profit' in jobs_df.columns:
-                    jobs_df['profit'] = jobs_df['total_profit']
-                else:
-                    # Calculate profit: (price - cost) * quantity (cost is unit cost)
-                    jobs_df['profit'] = (jobs_df['price'] - jobs_df['cost']) * jobs_df['quantity']
-                
-                # Calculate summary statistics
-                summary_stats = {
-                    'avg_price': jobs_df['price'].mean(),
-                    'customer_count': jobs_df['customer'].nunique(),
-                    'most_requested_item': jobs_df.groupby('item')['quantity'].sum().idxmax(),
-                    'most_requested_price': jobs_df[jobs_df['item'] == jobs_df.groupby('item')['quantity'].sum().idxmax()]['price'].mean()
-                }
-                
-                # Group by item
-                item_metrics = jobs_df.groupby('item').agg({
-                    'quantity': 'sum',
-                    'revenue': 'sum',
-                    'profit': 'sum',
-                    'price': 'mean',
-                    'cost': 'mean',
-                    'customer': pd.Series.nunique
-                }).reset_index()
-                
-                # Calculate profit margin and potential optimizations
-                item_metrics['profit_margin'] = (item_metrics['profit'] / item_metrics['revenue'] * 100).round(2)
-                
-                # Determine suggested price increase percentage based on profit margin
-                def suggest_increase(margin):
-                    if margin < 20:
-                        return 15
-                    elif margin < 35:
-                        return 10
-                    elif margin < 50:
-                        return 5
-                    else:
-                        return 0
-                    
-                item_metrics['suggested_increase'] = item_metrics['profit_margin'].apply(suggest_increase)
-                
-                # Calculate potential price increases (suggested and fixed percentages)
-                for pct in [5, 10, 15]:
-                    # New price with increase
-                    new_price_col = f'price_{pct}pct'
-                    item_metrics[new_price_col] = (item_metrics['price'] * (1 + pct/100)).round(0)
-                    
-                    # Estimate new profit (assuming same quantity sold)
-                    new_revenue_col = f'revenue_{pct}pct'
-                    item_metrics[new_revenue_col] = item_metrics['quantity'] * item_metrics[new_price_col]
-                    
-                    # New profit
-                    new_profit_col = f'profit_{pct}pct'
-                    item_metrics[new_profit_col] = item_metrics[new_revenue_col] - (item_metrics['cost'] * item_metrics['quantity'])
-                    
-                    # Profit increase
-                    profit_increase_col = f'profit_increase_{pct}pct'
-                    item_metrics[profit_increase_col] = item_metrics[new_profit_col] - item_metrics['profit']
-                
-                # Calculate suggested price and profit based on suggested increase percentage
-                item_metrics['price_suggested'] = item_metrics.apply(
-                    lambda row: row['price'] * (1 + row['suggested_increase']/100), axis=1
-                ).round(0)
-                
-                item_metrics['revenue_suggested'] = item_metrics['quantity'] * item_metrics['price_suggested']
-                item_metrics['profit_suggested'] = item_metrics['revenue_suggested'] - (item_metrics['cost'] * item_metrics['quantity'])
-                item_metrics['profit_increase_suggested'] = item_metrics['profit_suggested'] - item_metrics['profit']
-                
-                # Add custom price and profit calculations
-                item_metrics['custom_price'] = item_metrics['price']
-                for idx, row in item_metrics.iterrows():
-                    if row['item'] in custom_prices:
-                        item_metrics.at[idx, 'custom_price'] = custom_prices[row['item']]
-                
-                # Calculate custom profit metrics
-                item_metrics['custom_price_increase_pct'] = ((item_metrics['custom_price'] / item_metrics['price']) - 1) * 100
-                item_metrics['revenue_custom'] = item_metrics['quantity'] * item_metrics['custom_price']
-                item_metrics['profit_custom'] = item_metrics['revenue_custom'] - (item_metrics['cost'] * item_metrics['quantity'])
-                item_metrics['profit_increase_custom'] = item_metrics['profit_custom'] - item_metrics['profit']
-                
-                # Calculate custom profit margin: (Custom Profit / Custom Revenue) * 100
-                item_metrics['custom_profit_margin'] = (item_metrics['profit_custom'] / item_metrics['revenue_custom'] * 100).round(2)
-                # Handle division by zero
-                item_metrics['custom_profit_margin'] = item_metrics['custom_profit_margin'].fillna(0)
-                
-                # Calculate total profit summary
-                total_current_profit = item_metrics['profit'].sum()
-                total_suggested_profit = item_metrics['profit_suggested'].sum()
-                total_custom_profit = item_metrics['profit_custom'].sum()
-                
-                # Convert to list of dicts for template
-                items_data = item_metrics.to_dict('records')
-                
-                # Sort by potential profit increase (using suggested percentage)
-                items_data = sorted(items_data, key=lambda x: x.get('profit_increase_suggested', 0), reverse=True)
-                
-                # Format numeric values for display
-                for item in items_data:
-                    # Format currency values
-                    for key in ['price', 'cost', 'price_5pct', 'price_10pct', 'price_15pct', 'price_suggested', 'custom_price']:
-                        if key in item:
-                            item[key] = f'฿{item[key]:,.0f}'
-                    
-                    for key in item:
-                        if any(term in key for term in ['revenue', 'profit']) and 'pct' not in key:
-                            item[key] = f'฿{item[key]:,.2f}'
-                    
-                    # Format percentages
-                    if 'custom_price_increase_pct' in item:
-                        item['custom_price_increase_pct'] = f'{item["custom_price_increase_pct"]:.1f}%'
+                # Summary statistics come from the item statistics index; the per-item
+                # results are cached per data version and only custom-priced items are recomputed
+                summary_stats = item_stats.summary() or {}
+                items_data, item_results = simulator_results.records(custom_prices)
+                totals = simulator_results.totals(item_results)
+                total_current_profit = totals['total_current_profit']
+                total_suggested_profit = totals['total_suggested_profit']
+                total_custom_profit = totals['total_custom_profit']
+                total_adjusted_profit = totals['total_adjusted_profit']
                 
                 # Format summary statistics
                 summary_stats['avg_price'] = f'฿{summary_stats["avg_price"]:,.0f}'
@@ -624,6 +420,8 @@ def simulator():
                 summary_stats['total_current_profit'] = f'฿{total_current_profit:,.2f}'
                 summary_stats['total_suggested_profit'] = f'฿{total_suggested_profit:,.2f}'
                 summary_stats['total_custom_profit'] = f'฿{total_custom_profit:,.2f}'
+                summary_stats['total_adjusted_profit'] = f'฿{total_adjusted_profit:,.2f}'
+                summary_stats['adjusted_profit_increase_pct'] = f'{((total_adjusted_profit - total_current_profit) / total_current_profit * 100) if total_current_profit > 0 else 0:.1f}%'
                 summary_stats['suggested_profit_increase'] = f'฿{(total_suggested_profit - total_current_profit):,.2f}'
                 summary_stats['custom_profit_increase'] = f'฿{(total_custom_profit - total_current_profit):,.2f}'
                 summary_stats['suggested_profit_increase_pct'] = f'{((total_suggested_profit - total_current_profit) / total_current_profit * 100) if total_current_profit > 0 else 0:.1f}%'
@@ -637,14 +435,70 @@ def simulator():
                            summary_stats=summary_stats,
                            last_updated=last_updated)
 
+@app.route('/api/simulator', methods=['GET', 'POST'])
+def simulator_api():
+    """
+    Raw simulator results: per-item numbers and profit totals.
+    Custom prices are given as a JSON {"custom_prices": {item: price}} body.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        custom_prices = payload.get('custom_prices') or {}
+        if not isinstance(custom_prices, dict):
+            return jsonify({'success': False, 'message': 'custom_prices must be an object of item prices'}), 400
+        custom_prices = {str(name): float(price) for name, price in custom_prices.items()}
+        
+        item_results = simulator_results.frame(custom_prices)
+        items = item_results.astype(object).where(item_results.notna(), None).to_dict('records')
+        return jsonify({
+            'success': True,
+            'version': simulator_results.version,
+            'totals': simulator_results.totals(item_results),
+            'items': items,
+        })
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid custom price: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f'Error computing simulator results: {str(e)}')
+        return jsonify({'success': False, 'message': f'Error computing simulator results: {str(e)}'})
+
+@app.route('/api/simulator/sweep', methods=['GET', 'POST'])
+def simulator_sweep():
+    """
+    Profit curves for a grid of price changes across all items, with the best price per item.
+    Takes start/stop/step percentages (default -20..30 in steps of 1), or a JSON list of changes.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        if isinstance(payload.get('changes'), list):
+            changes = [float(pct) for pct in payload['changes']]
+        else:
+            start = float(request.args.get('start', payload.get('start', -20)))
+            stop = float(request.args.get('stop', payload.get('stop', 30)))
+            step = float(request.args.get('step', payload.get('step', 1)))
+            if step <= 0 or stop < start or (stop - start) / step > 1000:
+                return jsonify({'success': False, 'message': 'Invalid price change range'}), 400
+            changes = [start + i * step for i in range(int(round((stop - start) / step)) + 1)]
+        
+        item_metrics = item_stats.item_metrics()
+        # Quantity follows each item's price elasticity unless ?demand=fixed
+        elasticities = None
+        if request.args.get('demand', payload.get('demand', 'elastic')) != 'fixed':
+            elasticities = elasticity_model.elasticities(item_metrics['item'])
+        result = sweep(item_metrics, changes, elasticities=elasticities)
+        return jsonify(dict(result, success=True))
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f'Error running price sweep: {str(e)}')
+        return jsonify({'success': False, 'message': f'Error running price sweep: {str(e)}'})
+
 @app.route('/customers', methods=['GET', 'POST'])
 def customers():
-    path = get_data_file_path('customers.json')
-    _customers = []
-    if os.path.exists(path):
-        # Load customers
-        with open(path, 'r', encoding='utf-8') as f:
-            _customers = json.load(f)
+    # Load customers
+    _customers = data_store.load('customers.json', default=[], copy_data=True)
     search_query = request.args.get('search', '').strip().lower()
     if request.method == 'POST':
         action = request.form.get('action')
@@ -658,8 +512,7 @@ def customers():
         elif action == 'update':
             idx = int(request.form.get('idx'))
             _customers[idx] = {'name': name, 'phone': phone, 'birthday': birthday, 'note': note}
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(_customers, f, indent=2, ensure_ascii=False)
+        data_store.save('customers.json', _customers)
         return redirect(url_for('customers'))
     # Filter customers if search query is present
     if search_query:
@@ -670,11 +523,7 @@ def customers():
 
 @app.route('/services', methods=['GET', 'POST'])
 def services():
-    path = get_data_file_path('services.json')
-    _services = []
-    if os.path.isfile(path):
-        with open(path, 'r', encoding='utf-8') as f:
-            _services = json.load(f)
+    _services = data_store.load('services.json', default=[], copy_data=True)
     search_query = request.args.get('search', '').strip().lower()
     if request.method == 'POST':
         action = request.form.get('action')
@@ -690,8 +539,7 @@ def services():
         elif action == 'remove':
             idx = int(request.form.get('idx'))
             _services.pop(idx)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(_services, f, indent=2, ensure_ascii=False)
+        data_store.save('services.json', _services)
         return redirect(url_for('services'))
     # Filter services if search query is present
     if search_query:
@@ -700,6 +548,45 @@ def services():
         filtered_services = _services
     return render_template('services.html', services=filtered_services, search=request.args.get('search', ''))
 
+def record_jobs(date, customer, lines, inventory):
+    """
+    Record the line items of one visit: every row is appended to jobs.csv in a
+    single write, and the stock changes of all products in a single journal write.
+    lines are (item_name, quantity, price, total_cost, category, promotion_id) tuples.
+    """
+    # Format the date in DD/MM/YYYY format to be consistent
+    formatted_date = date
+    try:
+        # Try to parse the date and reformat it
+        parsed_date = pd.to_datetime(date, dayfirst=True)
+        formatted_date = parsed_date.strftime('%d/%m/%Y')
+    except:
+        pass  # Keep the original format if parsing fails
+    
+    # Only add promotion_id if jobs.csv has the column (it is created with headers if missing)
+    headers = jobs_writer.columns()
+    with_promotion_id = bool(headers and len(headers) >= 8 and headers[-1] == 'promotion_id')
+    
+    job_rows = []
+    for item_name, quantity, price, total_cost, item_category, promotion_id in lines:
+        job_row = [formatted_date, customer, item_name, quantity, price, total_cost, item_category]
+        if with_promotion_id:
+            job_row.append(promotion_id)
+        job_rows.append(job_row)
+    jobs_writer.append(job_rows)
+
+    # Fold the new jobs into the daily rollups
+    try:
+        rollup_store.sync()
+    except Exception as e:
+        logger.error(f"Error updating rollups: {e}")
+
+    # Journal the stock changes instead of rewriting inventory.json
+    stocked = {item.get('name') for item in inventory}
+    changes = [{'name': line[0], 'quantity': -line[1], 'date': date} for line in lines if line[0] in stocked]
+    if changes:
+        data_store.append('inventory.json', changes)
+
 @app.route('/job', methods=['GET', 'POST'])
 def job():
     # Initialize variables that will be used across all code paths
@@ -708,28 +595,12 @@ def job():
     # We've removed history functionality from this route - it's now in the /history route
     
     # Prevent use if services.json or inventory.json is missing
-    services_path = get_data_file_path('services.json')
-    inventory_path = get_data_file_path('inventory.json')
-    if not (os.path.exists(services_path) and os.path.exists(inventory_path)):
+    services = data_store.load('services.json')
+    inventory = data_store.load('inventory.json')
+    if services is None or inventory is None:
         # Remove flash, just render with disable_form
         return render_template('job.html', disable_form=True, jobs=[])
 
-    _customers = [ {
-        "name": "dummy",
-        "phone": '',
-        "birthday": '',
-        "note": ""
-      }]
-    customers_path = get_data_file_path('customers.json')
-    if os.path.exists(customers_path):
-        with open(customers_path, 'r', encoding='utf-8') as f:
-            _customers = json.load(f)
-    services_path = get_data_file_path('services.json')
-    with open(services_path, 'r') as f:
-        services = json.load(f)
-    inventory_path = get_data_file_path('inventory.json')
-    with open(inventory_path, 'r', encoding='utf-8') as f:
-        inventory = json.load(f)
     if request.method == 'POST':
         date = request.form.get('date')
         customer = request.form.get('customer')
@@ -742,115 +613,129 @@ def job():
             flash('Please select an item.', 'error')
             return redirect(url_for('job'))
             
-        # Calculate total price and cost
-        total_price = price * quantity
-        total_cost = cost  # Cost is already calculated based on quantity in the frontend
+        # Cost is already calculated based on quantity in the frontend
+        total_cost = cost
         
-        # Determine item category (service, product, or promotion)
-        item_category = "unknown"
-        # Check if item is in services
-        for service in services:
-            if service.get('name') == item_name:
-                item_category = "service"
-                break
-        # If not found in services, check inventory
-        if item_category == "unknown":
-            for item in inventory:
-                if item.get('name') == item_name:
-                    item_category = "product"
-                    break
-                    
-        # If not found in services or inventory, check promotions
-        if item_category == "unknown":
-            promotions_path = get_data_file_path('promotions.json')
-            if os.path.exists(promotions_path):
-                try:
-                    with open(promotions_path, 'r', encoding='utf-8') as f:
-                        promotions_data = json.load(f)
-                        for promo in promotions_data:
-                            if promo.get('name') == item_name:
-                                item_category = "promotion"
-                                break
-                except Exception as e:
-                    logger.error(f"Error checking promotions: {e}")
-                    pass
+        # Determine item category (service, product, or promotion) and promotion ID
+        item_category, promotion_id = catalog.resolve([item_name])[item_name]
         
-        # If no jobs.csv file exists, create it with headers
-        jobs_path = get_data_file_path('jobs.csv')
-        if not os.path.exists(jobs_path):
-            # Ensure data directory exists
-            data_dir = get_data_path()
-            with open(jobs_path, 'w', newline='', encoding='utf-8') as f:
-                csv.writer(f).writerow(['date', 'customer', 'item', 'quantity', 'price', 'cost', 'category', 'promotion_id'])
-
-        # Get promotion ID if this is a promotion
-        promotion_id = None
-        if item_category == "promotion":
-            promotions_path = get_data_file_path('promotions.json')
-            if os.path.exists(promotions_path):
-                try:
-                    with open(promotions_path, 'r', encoding='utf-8') as f:
-                        promotions_data = json.load(f)
-                        for promo in promotions_data:
-                            if promo.get('name') == item_name:
-                                promotion_id = promo.get('id')
-                                break
-                except Exception as e:
-                    logger.error(f"Error finding promotion ID: {e}")
-                    pass
-
-        # Append the new job
-        with open(jobs_path, 'a', newline='', encoding='utf-8') as f:
-            # Format the date in DD/MM/YYYY format to be consistent
-            formatted_date = date
-            try:
-                # Try to parse the date and reformat it
-                parsed_date = pd.to_datetime(date, dayfirst=True)
-                formatted_date = parsed_date.strftime('%d/%m/%Y')
-            except:
-                pass  # Keep the original format if parsing fails
-            
-            # Check if we need to add promotion_id
-            job_row = [formatted_date, customer, item_name, quantity, price, total_cost, item_category]
-            
-            # Only add promotion_id if it exists and if jobs.csv already has the column
-            # Read the first line to check headers
-            with open(jobs_path, 'r', newline='', encoding='utf-8') as check_file:
-                reader = csv.reader(check_file)
-                headers = next(reader, None)
-                
-            # If we have 8 columns and the last is promotion_id, add it
-            if headers and len(headers) >= 8 and headers[-1] == 'promotion_id':
-                job_row.append(promotion_id)
-                
-            # Write the row with the appropriate number of columns
-            csv.writer(f).writerow(job_row)
-
-        for item in inventory:
-            if item['name'] == item_name:
-                try:
-                    item['current_quantity'] = int(item.get('current_quantity', 0)) - quantity
-                    item['last_date_sell'] = date
-                except Exception:
-                    pass
-                break
-        inventory_path = get_data_file_path('inventory.json')
-        with open(inventory_path, 'w', encoding='utf-8') as f:
-            json.dump(inventory, f, indent=2, ensure_ascii=False)
+        record_jobs(date, customer, [(item_name, quantity, price, total_cost, item_category, promotion_id)], inventory)
         # Redirect to job route - load jobs again to show updated data
         return redirect(url_for('job'))
 
     # No need to duplicate data in static folder
     return render_template('job.html', disable_form=False, jobs=jobs)
 
+# Most line items accepted in one basket
+MAX_BASKET_ITEMS = 50
+
+@app.route('/api/jobs/basket', methods=['POST'])
+def job_basket():
+    """
+    Record several items for one customer visit at once. Takes JSON
+    {"date", "customer", "items": [{"item", "quantity", "price", "cost"}]},
+    where cost is the total cost of the line, as in the job form. Price and
+    cost default to the catalog price and unit cost times quantity; a line
+    without a price is rejected when the catalog has no usable price either.
+    """
+    try:
+        services = data_store.load('services.json')
+        inventory = data_store.load('inventory.json')
+        if services is None or inventory is None:
+            return jsonify({'success': False, 'message': 'Cannot add jobs: services or inventory data is missing'}), 409
+        
+        payload = request.get_json(silent=True) or {}
+        date = str(payload.get('date') or '').strip()
+        customer = str(payload.get('customer') or '').strip()
+        items = payload.get('items')
+        
+        errors = []
+        if not date:
+            errors.append('Please select a date.')
+        if not customer:
+            errors.append('Please select a customer.')
+        if not isinstance(items, list) or not items:
+            errors.append('The basket is empty.')
+            items = []
+        elif len(items) > MAX_BASKET_ITEMS:
+            errors.append(f'A basket can hold at most {MAX_BASKET_ITEMS} items.')
+            items = []
+        
+        # Validate every line against the catalog in one pass
+        index = catalog.index()
+        lines = []
+        for number, line in enumerate(items, start=1):
+            item_name = str(line.get('item') or '') if isinstance(line, dict) else ''
+            if not item_name:
+                errors.append(f'Line {number}: please select an item.')
+                continue
+            entry = index.get(item_name)
+            if entry is None:
+                errors.append(f'Line {number}: "{item_name}" is not a service, product or promotion.')
+                continue
+            try:
+                quantity = float(line.get('quantity', 1))
+                price = float(line['price']) if line.get('price') is not None else entry.price
+                # Total cost of the line, from the catalog unless given
+                cost = float(line['cost']) if line.get('cost') is not None else entry.cost * quantity
+            except (TypeError, ValueError):
+                errors.append(f'Line {number}: quantity, price and cost must be numbers.')
+                continue
+            if price is None:
+                errors.append(f'Line {number}: "{item_name}" has no price in the catalog; please enter a price.')
+                continue
+            if not (math.isfinite(quantity) and quantity.is_integer() and quantity >= 1):
+                errors.append(f'Line {number}: quantity must be a whole number of at least 1.')
+                continue
+            if not (math.isfinite(price) and math.isfinite(cost)) or price < 0 or cost < 0:
+                errors.append(f'Line {number}: price and cost must be numbers of at least 0.')
+                continue
+            quantity = int(quantity)
+            lines.append((item_name, quantity, price, cost, entry.category, entry.promotion_id))
+        
+        if errors:
+            return jsonify({'success': False, 'message': errors[0], 'errors': errors}), 400
+        
+        record_jobs(date, customer, lines, inventory)
+        return jsonify({
+            'success': True,
+            'message': f'Recorded {len(lines)} items for {customer}',
+            'count': len(lines),
+            'total_price': sum(quantity * price for _, quantity, price, _, _, _ in lines),
+            'total_cost': sum(cost for _, _, _, cost, _, _ in lines),
+        })
+    
+    except Exception as e:
+        logger.error(f'Error recording basket: {str(e)}')
+        return jsonify({'success': False, 'message': f'Error recording basket: {str(e)}'}), 500
+
+@app.route('/api/jobs/import', methods=['POST'])
+def import_jobs_csv():
+    """
+    Import historical jobs from an uploaded CSV file (form field "file").
+    Bad rows are reported and skipped; set dry_run=1 to only validate.
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'message': 'Please choose a CSV file to import'}), 400
+    
+    dry_run = request.form.get('dry_run', request.args.get('dry_run', '')).lower() in ('1', 'true', 'yes', 'on')
+    try:
+        from utils.jobs_import import import_jobs, JobsImportError
+        report = import_jobs(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), dry_run=dry_run)
+    except JobsImportError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f'Error importing jobs: {str(e)}')
+        return jsonify({'success': False, 'message': f'Error importing jobs: {str(e)}'}), 500
+    
+    logger.info(f"Imported {report['imported']} of {report['rows']} jobs from {upload.filename}")
+    return jsonify(dict(report, success=True,
+                        message=f"{'Validated' if dry_run else 'Imported'} {report['imported']} of {report['rows']} rows"))
+
 @app.route('/inventory', methods=['GET', 'POST'])
 def inventory():
-    path = get_data_file_path('inventory.json')
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            inventory = json.load(f)
-    except FileNotFoundError:
-        inventory = []
+    inventory = data_store.load('inventory.json', default=[], copy_data=True)
     # Remove types list
     search_name = request.args.get('search_name', '').strip().lower()
     search_type = request.args.get('search_type', '').strip()
@@ -896,8 +781,7 @@ def inventory():
         elif action == 'remove':
             idx = int(request.form.get('idx'))
             inventory.pop(idx)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(inventory, f, indent=2, ensure_ascii=False)
+        data_store.save('inventory.json', inventory)
         return redirect(url_for('inventory'))
     filtered_inventory = inventory
     if search_name:
@@ -919,164 +803,128 @@ def format_thai_baht(amount):
     except (ValueError, TypeError):
         return '฿0.00'
 
+def query_history(filters, after=None, limit=PAGE_SIZE, with_totals=True, with_options=True):
+    """
+    One page of the job history matching filters, after the (day, row id)
+    cursor `after`: {'jobs', 'next_cursor'}, plus the totals over all matching
+    jobs and the dropdown options when asked for
+    """
+    # SQLite backend: push the filters down into indexed queries
+    if app.config.get('JOBS_BACKEND') == 'sqlite':
+        try:
+            promotion_names = catalog.promotion_names()
+            with jobs_db.history_connection() as conn:
+                jobs, last = jobs_db.history_page(conn, filters, limit, promotion_names, after)
+                result = {'jobs': jobs, 'next_cursor': encode_cursor(*last) if last else None}
+                if with_totals:
+                    result.update(jobs_db.history_totals(conn, filters, promotion_names))
+                if with_options:
+                    result.update(jobs_db.history_options(conn))
+            return result
+        except Exception as e:
+            logger.error(f"Error querying jobs database, falling back to jobs.csv: {e}")
+
+    jobs, next_cursor = history_index.page(filters, after, limit)
+    result = {'jobs': jobs, 'next_cursor': next_cursor}
+    if with_totals:
+        result.update(history_index.totals(filters))
+    if with_options:
+        result.update(history_index.options())
+    return result
+
 @app.route('/history')
 def history():
-    """Display job history with filtering options"""
-    # Get filter parameters
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
-    customer_filter = request.args.get('customer_filter', '').strip()
-    type_filter = request.args.get('type_filter', '')
-    item_filter = request.args.get('item_filter', '').strip()
-    
-    # Store filters for template
-    filters = {
-        'date_from': date_from,
-        'date_to': date_to,
-        'customer_filter': customer_filter,
-        'type_filter': type_filter,
-        'item_filter': item_filter
-    }
+    """Display job history with filtering options, one page at a time"""
+    filters = read_filters(request.args)
+    limit = read_limit(request.args.get('limit'))
+    cursor = request.args.get('cursor', '')
     
     # Default values
-    jobs = []
-    total_revenue = 0
-    total_profit = 0
-    available_customers = []
-    available_items = []
-    items_by_category = {'service': [], 'product': []}
+    result = {
+        'jobs': [],
+        'next_cursor': None,
+        'total_count': 0,
+        'total_revenue': 0,
+        'total_profit': 0,
+        'available_customers': [],
+        'available_items': [],
+        'items_by_category': {'service': [], 'product': []},
+    }
     
     try:
-        jobs_path = get_data_file_path('jobs.csv')
-        if os.path.exists(jobs_path):
-            # Load jobs data
-            jobs_df = pd.read_csv(jobs_path)
-            
-            # If dataframe is empty, return early
-            if jobs_df.empty:
-                return render_template('history.html', jobs=[], filters=filters, 
-                                      total_revenue='0.00', total_profit='0.00')
-            
-            # Gather unique customers and items for dropdown menus (before applying filters)
-            if 'customer' in jobs_df.columns:
-                available_customers = sorted(jobs_df['customer'].dropna().unique().tolist())
-            if 'item' in jobs_df.columns:
-                available_items = sorted(jobs_df['item'].dropna().unique().tolist())
-            
-            # Organize items by category for dynamic filtering
-            items_by_category = {'service': [], 'product': [], 'promotion': []}
-            if 'item' in jobs_df.columns and 'category' in jobs_df.columns:
-                for category in ['service', 'product', 'promotion']:
-                    category_items = jobs_df[jobs_df['category'] == category]['item'].dropna().unique().tolist()
-                    items_by_category[category] = sorted(category_items)
-                
-                # Convert any 'unknown' category items that match promotion names to promotion category
-                promotions_path = get_data_file_path('promotions.json')
-                promotion_names = []
-                if os.path.exists(promotions_path):
-                    try:
-                        with open(promotions_path, 'r', encoding='utf-8') as f:
-                            promotions_data = json.load(f)
-                            promotion_names = [p.get('name') for p in promotions_data if p.get('name')]
-                    except Exception as e:
-                        logger.error(f"Error reading promotions for history: {e}")
-                
-                # Update unknown categories to promotion if item name matches
-                if promotion_names:
-                    mask = jobs_df['item'].isin(promotion_names)
-                    jobs_df.loc[mask, 'category'] = 'promotion'
-            
-            # Convert columns to appropriate types
-            for col in ['price', 'quantity', 'cost']:
-                if col in jobs_df.columns:
-                    jobs_df[col] = pd.to_numeric(jobs_df[col], errors='coerce').fillna(0)
-            
-            # Parse date column and handle missing dates
-            if 'date' in jobs_df.columns:
-                try:
-                    jobs_df['date'] = pd.to_datetime(jobs_df['date'], errors='coerce')
-                    
-                    # Fill in missing dates with today's date for display
-                    if jobs_df['date'].isna().any():
-                        logger.info(f"Found {jobs_df['date'].isna().sum()} jobs with missing dates. Filling with today's date for display.")
-                        today = pd.Timestamp(datetime.now().date())
-                        jobs_df.loc[jobs_df['date'].isna(), 'date'] = today
-                except Exception as e:
-                    logger.error(f"Error parsing date: {e}")
-            
-            # Apply filters
-            # Date range filter
-            if date_from:
-                try:
-                    from_date = pd.to_datetime(date_from)
-                    jobs_df = jobs_df[jobs_df['date'] >= from_date]
-                except Exception as e:
-                    print(f"Error filtering by from_date: {e}")
-            
-            if date_to:
-                try:
-                    to_date = pd.to_datetime(date_to)
-                    jobs_df = jobs_df[jobs_df['date'] <= to_date]
-                except Exception as e:
-                    print(f"Error filtering by to_date: {e}")
-            
-            # Customer name filter (exact match for dropdown)
-            if customer_filter:
-                jobs_df = jobs_df[jobs_df['customer'] == customer_filter]
-            
-            # Item type filter (service/product)
-            if type_filter:
-                jobs_df = jobs_df[jobs_df['category'] == type_filter]
-            
-            # Item name filter (exact match for dropdown)
-            if item_filter:
-                jobs_df = jobs_df[jobs_df['item'] == item_filter]
-            
-            # Sort by date (newest first)
-            if 'date' in jobs_df.columns:
-                jobs_df = jobs_df.sort_values(by='date', ascending=False)
-            
-            # Calculate totals
-            if not jobs_df.empty:
-                # Add revenue column
-                jobs_df['revenue'] = jobs_df['price'] * jobs_df['quantity']
-                
-                # Use total_profit from CSV if available, otherwise calculate it
-                if 'total_profit' in jobs_df.columns:
-                    jobs_df['profit'] = jobs_df['total_profit']
-                else:
-                    # Calculate profit: (price - cost) * quantity (cost is unit cost)
-                    jobs_df['profit'] = (jobs_df['price'] - jobs_df['cost']) * jobs_df['quantity']
-                
-                total_revenue = jobs_df['revenue'].sum()
-                total_profit = jobs_df['profit'].sum()
-            
-            # Convert datetime columns back to string format for display
-            if 'date' in jobs_df.columns:
-                if pd.api.types.is_datetime64_any_dtype(jobs_df['date']):
-                    # Handle NaT (Not a Time) values by replacing with empty string
-                    jobs_df['date'] = jobs_df['date'].dt.strftime('%Y-%m-%d').fillna('')
-                else:
-                    # If not datetime, ensure no NaN values are displayed
-                    jobs_df['date'] = jobs_df['date'].fillna('')
-            
-            # Convert to list of dictionaries for the template
-            jobs = jobs_df.to_dict('records')
+        result.update(query_history(filters, decode_cursor(cursor), limit))
     except Exception as e:
         print(f"Error processing jobs data: {e}")
     
-    # Format totals for display
-    formatted_revenue = format_thai_baht(total_revenue)
-    formatted_profit = format_thai_baht(total_profit)
-    
-    return render_template('history.html', jobs=jobs, filters=filters, 
-                          total_revenue=formatted_revenue, total_profit=formatted_profit,
-                          available_customers=available_customers, available_items=available_items,
-                          items_by_category=items_by_category)
+    return render_template('history.html', jobs=result['jobs'], filters=filters,
+                          total_revenue=format_thai_baht(result['total_revenue']),
+                          total_profit=format_thai_baht(result['total_profit']),
+                          total_count=result['total_count'], next_cursor=result['next_cursor'],
+                          cursor=cursor, page_size=limit, xlsx_available=xlsx_available(),
+                          available_customers=result['available_customers'],
+                          available_items=result['available_items'],
+                          items_by_category=result['items_by_category'])
+
+@app.route('/api/history')
+def history_api():
+    """
+    Job history as JSON for infinite scrolling: the /history filters plus
+    `cursor` (the next_cursor of the previous page) and `limit`. The totals
+    over all matching jobs are only included with the first page.
+    """
+    filters = read_filters(request.args)
+    after = decode_cursor(request.args.get('cursor'))
+    try:
+        result = query_history(filters, after, read_limit(request.args.get('limit')),
+                               with_totals=after is None, with_options=False)
+    except Exception as e:
+        logger.error(f"Error reading job history: {e}")
+        return jsonify({'error': 'Could not read the job history'}), 500
+    return jsonify(result)
+
+@app.route('/history/export')
+def history_export():
+    """
+    Download the jobs matching the /history filters as CSV (default) or, with
+    format=xlsx and openpyxl installed, as an Excel workbook. Rows are read and
+    sent one page at a time, so the download starts at once and memory use
+    does not grow with the size of the export.
+    """
+    filters = read_filters(request.args)
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': f"Unknown export format '{export_format}', use csv or xlsx"}), 400
+    if export_format == 'xlsx' and not xlsx_available():
+        return jsonify({'error': 'XLSX export needs openpyxl (pip install openpyxl); use format=csv'}), 400
+
+    def fetch_page(after, limit):
+        result = query_history(filters, after, limit, with_totals=False, with_options=False)
+        return result['jobs'], result['next_cursor']
+
+    def generate():
+        try:
+            pages = iter_pages(fetch_page)
+            yield from (csv_export(pages) if export_format == 'csv' else xlsx_export(pages))
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated download
+            logger.error(f"Error exporting job history: {e}")
+            raise
+
+    filename = f"job-history-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    mimetype = ('text/csv' if export_format == 'csv'
+                else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 # Route to serve files from data directory
 @app.route('/data/<path:filename>')
 def serve_data(filename):
+    # Journaled files (inventory.json) are only current with their journal replayed on top
+    if data_store.is_journaled(filename):
+        data = data_store.load(filename)
+        if data is None:
+            abort(404)
+        return Response(json.dumps(data, indent=2, ensure_ascii=False), mimetype='application/json')
     return send_from_directory('data', filename)
 
 @app.route('/clean-cookies')
@@ -1096,110 +944,34 @@ def clean_cookies():
 def get_price_suggestions(item_name):
     """Get intelligent price suggestions based on historical data"""
     try:
-        jobs_file = get_data_file_path('jobs.csv')
-        
-        # Read historical data
-        df = pd.read_csv(jobs_file)
-        
-        # Filter data for the specific item
-        item_data = df[df['item'].str.lower() == item_name.lower()]
-        
-        if item_data.empty:
-            return jsonify({
-                'success': True,
-                'suggestions': [],
-                'message': 'No historical data available for this item'
-            })
+        stats = item_stats.price_stats([item_name])
+        return jsonify(build_suggestions(stats.get(item_name.lower()), elasticity_model.details(item_name)))
         
-        # Calculate statistics
-        avg_price = item_data['price'].mean()
-        min_price = item_data['price'].min()
-        max_price = item_data['price'].max()
-        avg_cost = item_data['cost'].mean()
-        total_sales = len(item_data)
-        
-        # Calculate suggested promotional prices
-        suggestions = []
-        
-        # Conservative discount (10-15%)
-        conservative_price = avg_price * 0.85
-        if conservative_price > avg_cost:
-            profit_retention = round(((conservative_price - avg_cost) / (avg_price - avg_cost)) * 100, 1)
-            suggestions.append({
-                'type': 'conservative',
-                'price': round(conservative_price, 2),
-                'discount_percent': 15,
-                'description': 'Safe discount maintaining good profit',
-                'explanation': f'Retains {profit_retention}% of original profit while offering attractive 15% discount. Low risk strategy.',
-                'profit_margin': round(((conservative_price - avg_cost) / conservative_price) * 100, 1),
-                'profit_retention': profit_retention,
-                'risk_level': 'Low'
-            })
-        
-        # Moderate discount (20-25%)
-        moderate_price = avg_price * 0.75
-        if moderate_price > avg_cost:
-            profit_retention = round(((moderate_price - avg_cost) / (avg_price - avg_cost)) * 100, 1)
-            customer_savings = round(avg_price - moderate_price, 2)
-            suggestions.append({
-                'type': 'moderate',
-                'price': round(moderate_price, 2),
-                'discount_percent': 25,
-                'description': 'Attractive discount for customer appeal',
-                'explanation': f'Customers save ฿{customer_savings} per item. Retains {profit_retention}% profit while being competitive.',
-                'profit_margin': round(((moderate_price - avg_cost) / moderate_price) * 100, 1),
-                'profit_retention': profit_retention,
-                'risk_level': 'Medium'
-            })
-        
-        # Aggressive discount (30-35%)
-        aggressive_price = avg_price * 0.65
-        if aggressive_price > avg_cost:
-            profit_retention = round(((aggressive_price - avg_cost) / (avg_price - avg_cost)) * 100, 1)
-            customer_savings = round(avg_price - aggressive_price, 2)
-            suggestions.append({
-                'type': 'aggressive',
-                'price': round(aggressive_price, 2),
-                'discount_percent': 35,
-                'description': 'High discount for maximum customer attraction',
-                'explanation': f'Major ฿{customer_savings} savings per item. {profit_retention}% profit retention. Best for clearing inventory or attracting new customers.',
-                'profit_margin': round(((aggressive_price - avg_cost) / aggressive_price) * 100, 1),
-                'profit_retention': profit_retention,
-                'risk_level': 'High'
-            })
-        
-        # Most popular price (mode)
-        if total_sales > 1:
-            popular_price = item_data['price'].mode().iloc[0] if not item_data['price'].mode().empty else avg_price
-            popular_discount = round((1 - (popular_price * 0.8) / avg_price) * 100)
-            if popular_price * 0.8 > avg_cost:
-                profit_retention = round(((popular_price * 0.8 - avg_cost) / (popular_price - avg_cost)) * 100, 1)
-                frequency = len(item_data[item_data['price'] == popular_price])
-                suggestions.append({
-                    'type': 'popular',
-                    'price': round(popular_price * 0.8, 2),
-                    'discount_percent': popular_discount,
-                    'description': f'Based on most popular historical price (฿{popular_price})',
-                    'explanation': f'This price was used {frequency} times out of {total_sales} sales. Proven customer acceptance with {profit_retention}% profit retention.',
-                    'profit_margin': round(((popular_price * 0.8 - avg_cost) / (popular_price * 0.8)) * 100, 1),
-                    'profit_retention': profit_retention,
-                    'risk_level': 'Low'
-                })
+    except Exception as e:
+        logger.error(f'Error getting price suggestions: {str(e)}')
+        return jsonify({
+            'success': False,
+            'message': f'Error analyzing historical data: {str(e)}'
+        })
+
+@app.route('/api/price-suggestions', methods=['POST'])
+def get_batch_price_suggestions():
+    """Price suggestions for several items at once"""
+    try:
+        items = (request.get_json(silent=True) or {}).get('items')
+        if not isinstance(items, list):
+            return jsonify({'success': False, 'message': 'A list of items is required'}), 400
         
+        item_names = [str(name) for name in items]
+        stats = item_stats.price_stats(item_names)
         return jsonify({
             'success': True,
-            'suggestions': suggestions,
-            'historical_data': {
-                'avg_price': round(avg_price, 2),
-                'min_price': round(min_price, 2),
-                'max_price': round(max_price, 2),
-                'avg_cost': round(avg_cost, 2),
-                'total_sales': total_sales
-            }
+            'results': {name: build_suggestions(stats.get(name.lower()), elasticity_model.details(name))
+                        for name in item_names}
         })
         
     except Exception as e:
-        logger.error(f'Error getting price suggestions: {str(e)}')
+        logger.error(f'Error getting batch price suggestions: {str(e)}')
         return jsonify({
             'success': False,
             'message': f'Error analyzing historical data: {str(e)}'
@@ -1220,11 +992,9 @@ def promotion():
                 return jsonify({'success': False, 'message': 'Name and promotion items are required'})
             
             # Load existing promotions or create new list
-            promotions_file = get_data_file_path('promotions.json')
             try:
-                with open(promotions_file, 'r', encoding='utf-8') as f:
-                    promotions = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
+                promotions = data_store.load('promotions.json', default=[], copy_data=True)
+            except json.JSONDecodeError:
                 promotions = []
             
             # Add new promotion with ID
@@ -1232,8 +1002,7 @@ def promotion():
             promotions.append(promotion_data)
             
             # Save to file
-            with open(promotions_file, 'w', encoding='utf-8') as f:
-                json.dump(promotions, f, indent=2, ensure_ascii=False)
+            data_store.save('promotions.json', promotions)
             
             logger.info(f'New promotion created: {promotion_data["name"]}')
             return jsonify({'success': True, 'message': 'Promotion created successfully'})
@@ -1246,11 +1015,9 @@ def promotion():
 def get_promotions():
     """Return all promotions as JSON"""
     try:
-        promotions_file = get_data_file_path('promotions.json')
         try:
-            with open(promotions_file, 'r', encoding='utf-8') as f:
-                promotions = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            promotions = data_store.load('promotions.json', default=[])
+        except json.JSONDecodeError:
             promotions = []
         
         logger.info(f'Retrieved {len(promotions)} promotions')
@@ -1264,11 +1031,9 @@ def get_promotions():
 def get_promotion(promotion_id):
     """Return a specific promotion by ID"""
     try:
-        promotions_file = get_data_file_path('promotions.json')
         try:
-            with open(promotions_file, 'r', encoding='utf-8') as f:
-                promotions = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            promotions = data_store.load('promotions.json', default=[])
+        except json.JSONDecodeError:
             promotions = []
         
         # Find the promotion with the given ID
@@ -1297,11 +1062,9 @@ def update_promotion(promotion_id):
             return jsonify({'success': False, 'message': 'Name and promotion items are required'}), 400
         
         # Load existing promotions
-        promotions_file = get_data_file_path('promotions.json')
         try:
-            with open(promotions_file, 'r', encoding='utf-8') as f:
-                promotions = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            promotions = data_store.load('promotions.json', default=[], copy_data=True)
+        except json.JSONDecodeError:
             promotions = []
         
         # Find the promotion with the given ID
@@ -1315,8 +1078,7 @@ def update_promotion(promotion_id):
         promotions[promotion_index] = promotion_data
         
         # Save to file
-        with open(promotions_file, 'w', encoding='utf-8') as f:
-            json.dump(promotions, f, indent=2, ensure_ascii=False)
+        data_store.save('promotions.json', promotions)
         
         logger.info(f'Updated promotion with ID {promotion_id}')
         return jsonify({'success': True, 'message': 'Promotion updated successfully'})
@@ -1330,11 +1092,9 @@ def delete_promotion(promotion_id):
     """Delete a promotion by ID"""
     try:
         # Load existing promotions
-        promotions_file = get_data_file_path('promotions.json')
         try:
-            with open(promotions_file, 'r', encoding='utf-8') as f:
-                promotions = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            promotions = data_store.load('promotions.json', default=[], copy_data=True)
+        except json.JSONDecodeError:
             promotions = []
         
         # Find the promotion with the given ID
@@ -1347,8 +1107,7 @@ def delete_promotion(promotion_id):
         removed_promotion = promotions.pop(promotion_index)
         
         # Save to file
-        with open(promotions_file, 'w', encoding='utf-8') as f:
-            json.dump(promotions, f, indent=2, ensure_ascii=False)
+        data_store.save('promotions.json', promotions)
         
         logger.info(f'Deleted promotion with ID {promotion_id}: {removed_promotion["name"]}')
         return jsonify({'success': True, 'message': 'Promotion deleted successfully'})
@@ -1357,6 +1116,40 @@ def delete_promotion(promotion_id):
         logger.error(f'Error deleting promotion {promotion_id}: {str(e)}')
         return jsonify({'success': False, 'message': 'Failed to delete promotion', 'error': str(e)})
 
+def warm_up_caches():
+    """
+    Load everything the first dashboard view needs (jobs table, default KPIs,
+    rollups and the default pie chart) so the first page is as fast as later ones
+    """
+    started = datetime.now()
+    try:
+        jobs_table.refresh()
+        if app.config['JOBS_BACKEND'] == 'sqlite':
+            jobs_db.sync()
+        compute_dashboard(jobs_index.window(None))
+
+        from utils.graph_utils import render_report_chart
+        render_report_chart('total_profit', 'pie', output='png')
+
+        seconds = (datetime.now() - started).total_seconds()
+        logger.info(f'Caches warmed up in {seconds:.2f}s')
+        readiness.mark('warmup', rows=len(jobs_table.frame(copy=False)))
+    except Exception as e:
+        # A failed warm-up only costs speed; never keep the app from reporting ready
+        logger.error(f'Error warming up caches: {e}')
+        readiness.mark('warmup', error=str(e))
+
+def start_warm_up(use_reloader=False):
+    """Warm the caches in a background thread, once per serving process"""
+    # With the reloader enabled only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if use_reloader and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    readiness.require('warmup')
+    threading.Thread(target=warm_up_caches, name='cache-warmup', daemon=True).start()
+
 if __name__ == '__main__':
     logger.info('Starting Flask application')
+    if app.config['WARMUP_ENABLED']:
+        # debug=True runs the app under the reloader
+        start_warm_up(use_reloader=True)
     app.run(host='0.0.0.0', debug=True)
\ No newline at end of file
@@ -173,6 +173,21 @@ def migrate_jobs_csv():
         print(f"❌ Error during jobs.csv migration: {e}")
         print("   Please check your jobs.csv file manually")
 
+def import_jobs_to_sqlite():
+    """Mirror jobs.csv into the SQLite jobs database when the sqlite backend is enabled"""
+    if os.environ.get('SALON_JOBS_BACKEND', 'csv') != 'sqlite':
+        return
+
+    try:
+        from utils import jobs_db
+        # Full import on first run or after a migration rewrote jobs.csv, otherwise only new rows
+        print("Syncing jobs.csv into the SQLite jobs database...")
+        jobs_db.sync()
+    except ImportError:
+        print("⚠️  pandas not available, skipping SQLite import")
+    except Exception as e:
+        print(f"❌ Error importing jobs into SQLite: {e}")
+
 def close_browser_tabs():
     """Close any browser tabs with 127.0.0.1:500 in the URL"""
     try:
@@ -323,15 +338,42 @@ def update_version_json(remote_version):
         print(f"Error updating version file: {e}")
         return False
 
+def wait_for_app(url='http://127.0.0.1:5000/healthz', timeout=120, started=None):
+    """
+    Poll the app's readiness endpoint with exponential backoff.
+    Returns the seconds it took the app to become ready, or None on timeout.
+    """
+    started = started or time.time()
+    delay = 0.05
+    while time.time() - started < timeout:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return time.time() - started
+        except requests.RequestException:
+            pass  # Not listening yet
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return None
+
+def open_browser_when_ready(started):
+    """Open the browser as soon as the app reports ready"""
+    elapsed = wait_for_app(started=started)
+    if elapsed is None:
+        print("⚠️  App did not report ready in time, opening the browser anyway")
+    else:
+        print(f"✅ App ready in {elapsed:.2f}s")
+    webbrowser.open('http://127.0.0.1:5000/')
+
 def run_app():
     """Run the app.py file"""
     try:
         print("Starting app.py...")
+        started = time.time()
         # Start app.py in a new process and detach it
         subprocess.Popen([sys.executable, "app.py"], creationflags=subprocess.CREATE_NEW_CONSOLE)
  
-        # Open browser after a short delay
-        threading.Thread(target=lambda: (time.sleep(2), webbrowser.open('http://127.0.0.1:5000/'))).start()
+        # Open browser once the app answers its readiness probe
+        threading.Thread(target=open_browser_when_ready, args=(started,)).start()
         
         print("Application started!")
         return True
@@ -397,6 +439,9 @@ def main():
             # Migrate jobs.csv to new format if needed
             migrate_jobs_csv()
             
+            # Rebuild the SQLite jobs mirror from the migrated file
+            import_jobs_to_sqlite()
+            
             # Update requirements.txt packages
             update_requirements()
             
@@ -408,6 +453,7 @@ def main():
         # No updates available, but still check for data migration
         print("No updates available")
         migrate_jobs_csv()
+        import_jobs_to_sqlite()
     
     # Run the application
     run_app()
@@ -22,57 +22,102 @@ def get_base_path():
     
     return base_path
 
-def get_data_path():
-    """
-    Get the path to the data directory
-    For executables, this is next to the executable file
-    """
+class DataDir:
+    """Resolved location of the data directory, computed once per process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._files = {}
+
+    def file(self, filename):
+        """Return the full path of a file inside the data directory (no filesystem access)"""
+        full_path = self._files.get(filename)
+        if full_path is None:
+            full_path = os.path.join(self.path, filename)
+            self._files[filename] = full_path
+        return full_path
+
+
+# Cached DataDir instance, filled by init_data_dir() or on first lookup
+_data_dir = None
+
+def _resolve_data_dir():
+    """Work out where the data directory lives for the current run mode"""
     if getattr(sys, 'frozen', False):
         # We're running as an executable
         # Use the directory where the executable is located
         base_dir = os.path.dirname(sys.executable)
-        print(f"Running in executable mode. Base directory: {base_dir}")
     else:
         # We're running in development mode
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        print(f"Running in development mode. Base directory: {base_dir}")
-    
+
     # Data directory is inside the base directory
-    data_dir = os.path.join(base_dir, 'data')
-    print(f"Data directory path: {data_dir}")
-    
+    return os.path.join(base_dir, 'data')
+
+def init_data_dir(sync=True):
+    """
+    Resolve the data directory once at startup, create it if needed and
+    merge the bundled default data into it when the bundle is newer.
+    Later calls return the cached DataDir without touching the filesystem.
+    """
+    global _data_dir
+    if _data_dir is not None:
+        return _data_dir
+
+    data_dir = _resolve_data_dir()
+    if getattr(sys, 'frozen', False):
+        print(f"Running in executable mode. Data directory path: {data_dir}")
+    else:
+        print(f"Running in development mode. Data directory path: {data_dir}")
+
     # Ensure the data directory exists
     if not os.path.exists(data_dir):
         try:
             os.makedirs(data_dir)
             print(f"Created data directory: {data_dir}")
-            
-            # Copy default data files if they exist in the package
-            default_data_path = os.path.join(get_base_path(), 'data')
-            print(f"Looking for default data in: {default_data_path}")
-            
-            # Always try to sync customers.json since this is where the issue is occurring
-            try:
-                sync_data_files(default_data_path, data_dir)
-            except Exception as e:
-                print(f"Error syncing data files: {e}")
         except Exception as e:
             print(f"Error creating data directory: {e}")
-    else:
-        # Check if we need to sync data files even if directory exists
+
+    if sync:
+        # Copy default data files if they exist in the package
         default_data_path = os.path.join(get_base_path(), 'data')
         try:
             sync_data_files(default_data_path, data_dir)
         except Exception as e:
-            print(f"Error syncing data files for existing directory: {e}")
-            
-    return data_dir
+            print(f"Error syncing data files: {e}")
+
+    _data_dir = DataDir(data_dir)
+    return _data_dir
+
+def get_data_dir():
+    """Return the cached DataDir, resolving it (without syncing) if startup has not done so"""
+    if _data_dir is None:
+        return init_data_dir(sync=False)
+    return _data_dir
+
+def get_data_path():
+    """
+    Get the path to the data directory
+    For executables, this is next to the executable file
+    """
+    return get_data_dir().path
+
+def _is_newer(src_file, dst_file):
+    """True when src_file was modified after dst_file"""
+    try:
+        return os.path.getmtime(src_file) > os.path.getmtime(dst_file)
+    except OSError:
+        return False
 
 def sync_data_files(src_dir, dest_dir):
     """Synchronize data files between source and destination directories"""
     if not os.path.exists(src_dir):
         print(f"Source directory does not exist: {src_dir}")
         return
+
+    # In development mode the bundle and the data directory are the same folder
+    if os.path.exists(dest_dir) and os.path.samefile(src_dir, dest_dir):
+        return
     
     print(f"Syncing data from {src_dir} to {dest_dir}")
     
@@ -80,8 +125,8 @@ def sync_data_files(src_dir, dest_dir):
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir)
     
-    # Copy default files only if they don't exist in the destination
-    # or if the source file is newer
+    # Copy default files only if they don't exist in the destination,
+    # customers.json is merged only when the bundled copy is newer
     for filename in os.listdir(src_dir):
         src_file = os.path.join(src_dir, filename)
         dst_file = os.path.join(dest_dir, filename)
@@ -89,6 +134,8 @@ def sync_data_files(src_dir, dest_dir):
         if os.path.isfile(src_file):
             # For customers.json, we need to merge data rather than replace
             if filename == 'customers.json':
+                if os.path.exists(dst_file) and not _is_newer(src_file, dst_file):
+                    continue
                 if os.path.exists(dst_file):
                     try:
                         # Load both files and merge customers
@@ -126,4 +173,4 @@ def sync_data_files(src_dir, dest_dir):
 
 def get_data_file_path(filename):
     """Get the full path to a file in the data directory"""
-    return os.path.join(get_data_path(), filename)
+    return get_data_dir().file(filename)
@@ -0,0 +1,181 @@
+"""
+Golden-output test for the analyst dashboard numbers
+
+Runs compute_dashboard() on a fixed jobs fixture and checks it against the
+values the dashboard showed before the KPIs were moved into utils.analytics
+(computed by the original analyst() route on the same data). The total cost
+keeps that route's catalog cost x quantity squared. The chart series are read
+from /charts/<report_type>.json, which draws on the persisted daily rollup.
+
+Run with: python -m pytest tests
+"""
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import path_fix
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+
+SERVICES = [
+    {"name": "Cut", "cost": 100, "price": 400},
+    {"name": "Color", "cost": 300, "price": 1200},
+]
+INVENTORY = [
+    {"name": "Shampoo", "cost": 150, "retail_price": 300, "current_quantity": 20},
+    {"name": "Serum", "cost": 200, "retail_price": 500, "current_quantity": 10},
+]
+JOBS_CSV = """date,customer,item,quantity,price,cost,category,promotion_id
+01/03/2026,Ann,Cut,1,400,100,service,
+02/03/2026,Ben,Color,1,1200,300,service,
+03/03/2026,Ann,Shampoo,2,300,300,product,
+04/03/2026,Cho,Cut,1,450,100,service,
+05/03/2026,Ben,Serum,1,500,200,product,
+06/03/2026,Dee,Cut,2,400,200,service,
+07/03/2026,Eve,Color,1,1300,300,service,
+08/03/2026,Ann,Serum,3,480,600,product,
+09/03/2026,Fay,Shampoo,1,320,150,product,
+10/03/2026,Cho,Cut,1,400,100,service,
+11/03/2026,Gus,Mystery,1,250,0,unknown,
+12/03/2026,Dee,Color,2,1250,600,service,
+"""
+
+_data_dir = None
+_previous_data_dir = None
+
+
+def setUpModule():
+    global _data_dir, _previous_data_dir
+    _data_dir = tempfile.mkdtemp()
+    for filename, data in [('services.json', SERVICES), ('inventory.json', INVENTORY), ('promotions.json', [])]:
+        with open(os.path.join(_data_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    with open(os.path.join(_data_dir, 'jobs.csv'), 'w', encoding='utf-8') as f:
+        f.write(JOBS_CSV)
+    _previous_data_dir = path_fix._data_dir
+    path_fix._data_dir = path_fix.DataDir(_data_dir)
+
+
+def tearDownModule():
+    path_fix._data_dir = _previous_data_dir
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+def fixture_jobs():
+    from utils.jobs_cache import prepare_jobs
+    return prepare_jobs(pd.read_csv(io.StringIO(JOBS_CSV)))
+
+
+class DashboardGoldenTest(unittest.TestCase):
+
+    def setUp(self):
+        from utils.analytics import compute_dashboard
+        self.metrics = compute_dashboard(fixture_jobs())
+
+    def test_totals(self):
+        m = self.metrics
+        self.assertEqual(m.job_count, 12)
+        self.assertAlmostEqual(m.total_revenue, 10160.0)
+        # Catalog unit cost x quantity, times quantity again, as the original dashboard did
+        self.assertAlmostEqual(m.total_cost, 5250.0)
+        self.assertAlmostEqual(m.net_profit, 4910.0)
+
+    def test_categories(self):
+        m = self.metrics
+        self.assertAlmostEqual(m.service_revenue, 7050.0)
+        self.assertAlmostEqual(m.service_cost, 1700.0)
+        self.assertAlmostEqual(m.service_profit, 5350.0)
+        self.assertAlmostEqual(m.product_revenue, 2860.0)
+        self.assertAlmostEqual(m.product_cost, 1250.0)
+        self.assertAlmostEqual(m.product_profit, 1610.0)
+        self.assertAlmostEqual(m.service_percentage, 7050 / 10160 * 100)
+        self.assertAlmostEqual(m.product_percentage, 2860 / 10160 * 100)
+
+    def test_customers_and_items(self):
+        m = self.metrics
+        self.assertEqual(m.customer_count, 7)
+        self.assertAlmostEqual(m.average_price, 7250 / 12)
+        self.assertEqual(m.best_profit_item, 'Color')
+        self.assertAlmostEqual(m.best_profit_amount, 3200.0)
+
+    def test_growth_rates(self):
+        # First six jobs by date against the last six
+        m = self.metrics
+        self.assertAlmostEqual(m.customer_growth_rate, 50.0)
+        self.assertAlmostEqual(m.service_growth_rate, (4200 - 2850) / 2850 * 100)
+        self.assertAlmostEqual(m.product_growth_rate, 60.0)
+
+    def test_empty_jobs(self):
+        from utils.analytics import compute_dashboard
+        m = compute_dashboard(fixture_jobs().iloc[0:0])
+        self.assertEqual(m.job_count, 0)
+        self.assertEqual(m.total_revenue, 0.0)
+        self.assertEqual(m.best_profit_item, 'N/A')
+
+
+class ChartSeriesGoldenTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from app import app
+        from utils.rollups import rollup_store
+        # The shared rollup may still hold another data directory's jobs
+        rollup_store.rebuild()
+        cls.client = app.test_client()
+
+    def series(self, report_type):
+        response = self.client.get(f'/charts/{report_type}.json')
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        return result['labels'], result['series']
+
+    def test_daily_revenue(self):
+        labels, series = self.series('total_profit')
+        self.assertEqual(labels, [f'2026-03-{day:02d}' for day in range(1, 13)])
+        self.assertEqual(series['revenue'], [400.0, 1200.0, 600.0, 450.0, 500.0, 800.0,
+                                             1300.0, 1440.0, 320.0, 400.0, 250.0, 2500.0])
+
+    def test_profit_per_item(self):
+        labels, series = self.series('profit_per_item')
+        self.assertEqual(labels, ['Shampoo', 'Serum'])
+        self.assertEqual(series, {'quantity': [3.0, 4.0], 'revenue': [920.0, 1940.0],
+                                  'cost': [450.0, 800.0], 'profit': [170.0, -60.0]})
+
+    def test_profit_per_service(self):
+        labels, series = self.series('profit_per_service')
+        self.assertEqual(labels, ['Color', 'Cut'])
+        self.assertEqual(series, {'quantity': [4.0, 5.0], 'revenue': [5000.0, 2050.0],
+                                  'cost': [1200.0, 500.0], 'profit': [3200.0, 1350.0]})
+
+    def test_category_comparison(self):
+        labels, series = self.series('category_comparison')
+        self.assertEqual(labels, ['service', 'product'])
+        self.assertEqual(series, {'revenue': [7050.0, 2860.0], 'cost': [1700.0, 1250.0],
+                                  'profit': [4550.0, 110.0]})
+
+    def test_category_comparison_promotions(self):
+        # The PNG chart draws the categories of the JSON series, promotions included
+        from utils.graph_utils import chart_series, _category_totals
+        rollup = pd.DataFrame({
+            'date': ['2026-03-01'] * 4,
+            'item': ['Cut', 'Summer Deal', 'Mystery', 'Serum'],
+            'category': ['service', 'promotion', 'unknown', 'product'],
+            'quantity': [1.0, 1.0, 1.0, 1.0],
+            'revenue': [400.0, 900.0, 250.0, 500.0],
+            'cost': [100.0, 300.0, 0.0, 200.0],
+            'profit': [300.0, 600.0, 250.0, 300.0],
+        })
+        result = chart_series('category_comparison', rollup=rollup)
+        self.assertEqual(result['labels'], ['service', 'product', 'promotion'])
+        self.assertEqual(result['series']['revenue'], [400.0, 500.0, 900.0])
+        self.assertEqual(list(_category_totals(rollup).index), result['labels'])
+
+
+if __name__ == '__main__':
+    unittest.main()
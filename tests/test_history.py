@@ -0,0 +1,115 @@
+"""
+The /history export against the /history table
+
+Renders /history and downloads /history/export for the same fixture through
+the Flask test client, on both jobs backends, and checks that the export has
+the rows and figures the table shows.
+
+Run with: python -m pytest tests
+"""
+import io
+import os
+import re
+import sys
+import csv
+import html
+import json
+import shutil
+import tempfile
+import unittest
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import path_fix
+
+JOBS_CSV = """date,customer,item,quantity,price,cost,category,promotion_id
+01/03/2026,Ann,Cut,1,400,100,service,
+03/03/2026,Ann,Shampoo,2,300,300,product,
+06/03/2026,Dee,Cut,2,400,200,service,
+08/03/2026,Ann,Serum,3,480,600,product,
+11/03/2026,Gus,Mystery,1,250,0,unknown,
+12/03/2026,Dee,Color,2,1250,600,service,
+"""
+
+_data_dir = None
+_previous_data_dir = None
+
+
+def setUpModule():
+    global _data_dir, _previous_data_dir
+    _data_dir = tempfile.mkdtemp()
+    for filename in ['services.json', 'inventory.json', 'promotions.json']:
+        with open(os.path.join(_data_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump([], f)
+    with open(os.path.join(_data_dir, 'jobs.csv'), 'w', encoding='utf-8') as f:
+        f.write(JOBS_CSV)
+    _previous_data_dir = path_fix._data_dir
+    path_fix._data_dir = path_fix.DataDir(_data_dir)
+
+
+def tearDownModule():
+    path_fix._data_dir = _previous_data_dir
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+def _cell_text(cell):
+    return html.unescape(re.sub(r'<[^>]+>', '', cell)).strip()
+
+
+class HistoryExportTest(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        self.app = app
+        self.client = app.test_client()
+        self.backend = app.config['JOBS_BACKEND']
+
+    def tearDown(self):
+        self.app.config['JOBS_BACKEND'] = self.backend
+
+    def page_rows(self):
+        """Date, customer, item, quantity, cost, price, total and profit of each row on /history"""
+        response = self.client.get('/history?limit=500')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        tbody = body.split('id="historyRows">', 1)[1].split('</tbody>', 1)[0]
+        rows = []
+        for row in re.findall(r'<tr>(.*?)</tr>', tbody, re.S):
+            cells = [_cell_text(cell) for cell in re.findall(r'<td[^>]*>(.*?)</td>', row, re.S)]
+            del cells[3]  # category badge
+            rows.append([cells[0], cells[1], cells[2], int(cells[3])] +
+                        [f"{float(cell.lstrip('฿')):.2f}" for cell in cells[4:]])
+        return rows
+
+    def export_rows(self):
+        """The same columns of each row of the CSV export"""
+        response = self.client.get('/history/export?format=csv')
+        self.assertEqual(response.status_code, 200)
+        reader = csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('﻿')))
+        header = next(reader)
+        self.assertEqual(header[-1], 'Profit')
+        rows = []
+        for row in reader:
+            record = dict(zip(header, row))
+            rows.append([record['Date'], record['Customer'], record['Item'], int(float(record['Quantity']))] +
+                        [f"{float(record[name]):.2f}" for name in ['Cost', 'Price', 'Total', 'Profit']])
+        return rows
+
+    def check_backend(self, backend):
+        self.app.config['JOBS_BACKEND'] = backend
+        page_rows = self.page_rows()
+        self.assertEqual(len(page_rows), 6)
+        self.assertEqual(self.export_rows(), page_rows)
+        # Serum: 3 x 480 less a line cost of 600
+        serum = [row for row in page_rows if row[2] == 'Serum'][0]
+        self.assertEqual(serum[-1], '840.00')
+
+    def test_export_matches_page_csv_backend(self):
+        self.check_backend('csv')
+
+    def test_export_matches_page_sqlite_backend(self):
+        self.check_backend('sqlite')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+"""
+Analytics aggregation engine for the analyst dashboard
+
+All dashboard KPIs are derived from one grouped aggregation of the jobs in
+the selected window, keyed by (half, date, category, item), which has one row
+per item per day instead of one row per job. The charts do not use it: they
+are drawn from the persisted daily rollup in utils.rollups, which is kept up
+to date with jobs.csv across requests and costs jobs at their recorded cost,
+while the KPI cards use catalog unit costs.
+
+Date windows (last 30 days, this quarter, ...) are cut from a copy of the jobs
+table sorted by day with a binary search, so a narrower window means fewer
+rows to aggregate.
+"""
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+from utils.enrichment import enrich_jobs
+from utils.jobs_cache import jobs_table
+
+ROLLUP_KEYS = ['half', 'date', 'category', 'item']
+
+# Time periods offered on the dashboard, in display order
+DATE_RANGES = {
+    'all': 'All Time',
+    'last_7': 'Last 7 Days',
+    'last_30': 'Last 30 Days',
+    'last_90': 'Last 90 Days',
+    'month': 'This Month',
+    'quarter': 'This Quarter',
+    'year': 'This Year',
+}
+
+COMPARISONS = {
+    'none': 'No Comparison',
+    'prev_period': 'Previous Period',
+    'prev_year': 'Previous Year',
+}
+
+
+@dataclass
+class DashboardMetrics:
+    """KPIs shown on the analyst dashboard"""
+    total_revenue: float = 0.0
+    total_cost: float = 0.0
+    net_profit: float = 0.0
+    service_revenue: float = 0.0
+    service_cost: float = 0.0
+    service_profit: float = 0.0
+    product_revenue: float = 0.0
+    product_cost: float = 0.0
+    product_profit: float = 0.0
+    customer_count: int = 0
+    average_price: float = 0.0
+    best_profit_item: str = "N/A"
+    best_profit_amount: float = 0.0
+    customer_growth_rate: float = 0.0
+    service_growth_rate: float = 0.0
+    product_growth_rate: float = 0.0
+    job_count: int = 0
+
+    @property
+    def service_percentage(self):
+        return (self.service_revenue / self.total_revenue * 100) if self.total_revenue > 0 else 0
+
+    @property
+    def product_percentage(self):
+        return (self.product_revenue / self.total_revenue * 100) if self.total_revenue > 0 else 0
+
+
+def _growth(first, second):
+    return ((second - first) / first) * 100 if first > 0 else 0
+
+
+def _halves(jobs_df):
+    """Half (0 or 1) of every job when the jobs are ordered by date, for the growth rates"""
+    mid_point = len(jobs_df) // 2
+    first_half = jobs_df.sort_values('date').index[:mid_point]
+    return pd.Series((~jobs_df.index.isin(first_half)).astype(int), index=jobs_df.index)
+
+
+def build_rollup(jobs_df, half=None):
+    """
+    Aggregate a jobs frame into the KPI rollup.
+
+    Costs (the kpi_* columns) use the catalog unit cost of each item, as the
+    dashboard cards always have.
+    """
+    if jobs_df.empty:
+        return pd.DataFrame(columns=ROLLUP_KEYS + ['quantity', 'revenue', 'kpi_cost', 'kpi_total_cost',
+                                                   'kpi_profit', 'price_sum', 'rows'])
+
+    jobs_df = enrich_jobs(jobs_df)
+    kpi_cost = jobs_df['catalog_cost'] * jobs_df['quantity']
+    if 'total_profit' in jobs_df.columns:
+        kpi_profit = jobs_df['total_profit']
+    else:
+        kpi_profit = (jobs_df['price'] - kpi_cost) * jobs_df['quantity']
+
+    if half is None:
+        half = _halves(jobs_df)
+
+    frame = pd.DataFrame({
+        'half': half,
+        'date': jobs_df['date'],
+        'category': jobs_df['category'] if 'category' in jobs_df.columns else jobs_df['catalog_category'],
+        'item': jobs_df['item'],
+        'quantity': jobs_df['quantity'],
+        'revenue': jobs_df['revenue'],
+        'kpi_cost': kpi_cost,
+        'kpi_total_cost': kpi_cost * jobs_df['quantity'],
+        'kpi_profit': kpi_profit,
+        'price_sum': jobs_df['price'],
+        'rows': 1,
+    }, index=jobs_df.index)
+    return frame.groupby(ROLLUP_KEYS, dropna=False, sort=False).sum().reset_index()
+
+
+def compute_dashboard(jobs_df, comparison_df=None):
+    """
+    Compute every dashboard KPI from one aggregation of jobs_df
+
+    Growth rates compare jobs_df against comparison_df when one is given,
+    otherwise the first half of the jobs (by date) against the second half.
+    """
+    metrics = DashboardMetrics(job_count=len(jobs_df))
+    half = _halves(jobs_df) if not jobs_df.empty else None
+    rollup = build_rollup(jobs_df, half)
+    if rollup.empty:
+        return metrics
+
+    metrics.total_revenue = rollup['revenue'].sum()
+    metrics.total_cost = rollup['kpi_total_cost'].sum()
+    metrics.net_profit = rollup['kpi_profit'].sum()
+
+    by_category = rollup.groupby('category')[['revenue', 'kpi_cost']].sum()
+    if 'service' in by_category.index:
+        metrics.service_revenue = by_category.at['service', 'revenue']
+        metrics.service_cost = by_category.at['service', 'kpi_cost']
+        metrics.service_profit = metrics.service_revenue - metrics.service_cost
+    if 'product' in by_category.index:
+        metrics.product_revenue = by_category.at['product', 'revenue']
+        metrics.product_cost = by_category.at['product', 'kpi_cost']
+        metrics.product_profit = metrics.product_revenue - metrics.product_cost
+
+    # Customer counts cannot be summed across groups, so they come from the jobs directly
+    customers = jobs_df['customer'].dropna()
+    metrics.customer_count = customers.nunique()
+
+    rows = rollup['rows'].sum()
+    metrics.average_price = rollup['price_sum'].sum() / rows if rows else 0
+
+    item_profits = rollup.groupby('item')['kpi_profit'].sum().sort_values(ascending=False)
+    if not item_profits.empty:
+        metrics.best_profit_item = item_profits.index[0]
+        metrics.best_profit_amount = item_profits.iloc[0]
+
+    if comparison_df is not None:
+        previous = compute_dashboard(comparison_df)
+        metrics.customer_growth_rate = _growth(previous.customer_count, metrics.customer_count)
+        metrics.service_growth_rate = _growth(previous.service_revenue, metrics.service_revenue)
+        metrics.product_growth_rate = _growth(previous.product_revenue, metrics.product_revenue)
+    elif len(jobs_df) // 2 > 0:
+        halves = rollup[rollup['half'] == 0], rollup[rollup['half'] == 1]
+        customer_halves = customers.groupby(half[customers.index]).nunique()
+        metrics.customer_growth_rate = _growth(customer_halves.get(0, 0), customer_halves.get(1, 0))
+        for category in ['service', 'product']:
+            first, second = (h.loc[h['category'] == category, 'revenue'].sum() for h in halves)
+            setattr(metrics, f'{category}_growth_rate', _growth(first, second))
+
+    return metrics
+
+
+
+def date_window(date_range, today=None):
+    """
+    (start, end) days, both inclusive, covered by a DATE_RANGES key;
+    None for all time or an unknown key.
+    """
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    if date_range in ('last_7', 'last_30', 'last_90'):
+        days = int(date_range.split('_')[1])
+        return today - pd.Timedelta(days=days - 1), today
+    if date_range == 'month':
+        return today.replace(day=1), today
+    if date_range == 'quarter':
+        return today.replace(month=3 * ((today.month - 1) // 3) + 1, day=1), today
+    if date_range == 'year':
+        return today.replace(month=1, day=1), today
+    return None
+
+
+def comparison_window(window, comparison):
+    """The window to compare against: the equally long period just before it, or the same days a year earlier"""
+    if window is None:
+        return None
+    start, end = window
+    if comparison == 'prev_period':
+        length = end - start + pd.Timedelta(days=1)
+        return start - length, end - length
+    if comparison == 'prev_year':
+        return start - pd.DateOffset(years=1), end - pd.DateOffset(years=1)
+    return None
+
+
+class JobsTimeIndex:
+    """Jobs table sorted by day, sliced into date windows with binary search"""
+
+    def __init__(self, table=jobs_table):
+        self.table = table
+        self._version = None
+        self._sorted = None
+        self._days = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        jobs_df = self.table.frame(copy=False)
+        if self._version != self.table.version:
+            if 'day' in jobs_df.columns:
+                # Jobs without a parsable date sort last and never fall inside a window
+                sorted_df = jobs_df.sort_values('day', kind='stable', na_position='last').reset_index(drop=True)
+                days = sorted_df['day'].dropna().to_numpy(dtype='datetime64[ns]')
+            else:
+                sorted_df, days = jobs_df.iloc[0:0], np.array([], dtype='datetime64[ns]')
+            self._sorted, self._days, self._version = sorted_df, days, self.table.version
+        return jobs_df
+
+    def window(self, window):
+        """Jobs whose day falls inside window; the whole jobs table for None"""
+        with self._lock:
+            jobs_df = self._refresh()
+            if window is None:
+                return jobs_df
+            start, end = window
+            lo = np.searchsorted(self._days, np.datetime64(start, 'ns'), side='left')
+            hi = np.searchsorted(self._days, np.datetime64(end + pd.Timedelta(days=1), 'ns'), side='left')
+            return self._sorted.iloc[lo:hi]
+
+
+# Shared time index over the jobs table
+jobs_index = JobsTimeIndex()
@@ -0,0 +1,94 @@
+"""
+Start-up time benchmark for the Anyada Salon application
+
+Imports app.py in a fresh interpreter with `python -X importtime` and reports
+the total import time and the cost of each top-level module, so regressions
+in start-up time (such as a heavy library imported at module level) are easy
+to spot. The heavy libraries that were loaded eagerly are listed at the end.
+
+Usage:
+    python -m utils.benchmark_startup [--top N] [--runs N]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only be imported by the routes that need them
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'plotly']
+
+# Prints which heavy libraries were really imported: a lazily imported package
+# sits in sys.modules, but its submodules only appear once it is first used
+PROBE = (
+    "import sys, app\n"
+    "heavy = {heavy!r}\n"
+    "loaded = [m for m in heavy if any(k.startswith(m + '.') for k in sys.modules)]\n"
+    "sys.__stderr__.write('loaded: ' + ','.join(loaded) + '\\n')\n"
+)
+
+
+def run_import():
+    """Import app in a new interpreter; returns (wall seconds, importtime stderr lines)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app failed:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr.splitlines()
+
+
+def parse_importtime(lines):
+    """
+    Return {module: cumulative microseconds} for the modules app.py (and the
+    interpreter) import directly, and the list of heavy modules loaded
+    """
+    modules = {}
+    loaded = []
+    for line in lines:
+        if line.startswith('loaded: '):
+            loaded = [m for m in line[len('loaded: '):].split(',') if m]
+            continue
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            cumulative = int(cumulative)
+        except ValueError:
+            continue  # header line
+        # Nesting is shown by two spaces of indentation per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            top = name.strip().split('.')[0] if depth == 1 else name.strip()
+            modules[top] = modules.get(top, 0) + cumulative
+    return modules, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app start-up (import) time')
+    parser.add_argument('--top', type=int, default=15, help='number of modules to list')
+    parser.add_argument('--runs', type=int, default=3, help='number of runs; the fastest is reported')
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(max(1, args.runs)):
+        elapsed, lines = run_import()
+        if best is None or elapsed < best[0]:
+            best = (elapsed, lines)
+
+    elapsed, lines = best
+    modules, loaded = parse_importtime(lines)
+    print(f"import app: {elapsed * 1000:.0f} ms wall time (best of {max(1, args.runs)}, includes interpreter start)")
+    print(f"{'module':<30}{'cumulative ms':>15}")
+    for name, micros in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<30}{micros / 1000:>15.1f}")
+    print(f"Heavy libraries imported at start-up: {', '.join(loaded) if loaded else 'none'}")
+
+
+if __name__ == '__main__':
+    main()
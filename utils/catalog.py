@@ -0,0 +1,157 @@
+"""
+Item catalog of the Anyada Salon application
+
+One index from item name to its category, unit cost, price and promotion id,
+built from services.json, inventory.json and promotions.json. Names resolve
+in the job form's order: a service first, then an inventory product, then a
+promotion. The index is rebuilt only when one of the three files changes
+(data_store hands out the same parsed object until then), so every lookup is
+a single dict access instead of a scan of the three lists.
+"""
+import os
+import sys
+import math
+import threading
+from collections import namedtuple
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+from utils.data_store import data_store
+
+# price is None when the source has no usable (finite, non-negative) price
+CatalogEntry = namedtuple('CatalogEntry', ['category', 'cost', 'price', 'promotion_id'])
+
+# Category of items found in none of the sources
+UNKNOWN = 'unknown'
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_price(value):
+    """Price as a float, or None if it is missing, unparsable, infinite or negative"""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) and price >= 0 else None
+
+
+def build_index(services, inventory, promotions):
+    """{name: CatalogEntry} for the three source lists"""
+    index = {}
+    for service in services:
+        index.setdefault(service.get('name'), CatalogEntry(
+            'service', _to_float(service.get('cost', 0)), _to_price(service.get('price')), None))
+    for item in inventory:
+        index.setdefault(item.get('name'), CatalogEntry(
+            'product', _to_float(item.get('cost', 0)), _to_price(item.get('retail_price')), None))
+    for promo in promotions:
+        index.setdefault(promo.get('name'), CatalogEntry(
+            'promotion', _to_float(promo.get('total_promotion_cost', 0)),
+            _to_price(promo.get('total_promotion_price')), promo.get('id')))
+    index.pop(None, None)
+    return index
+
+
+def build_catalog_frame(services, inventory, promotions):
+    """
+    Build a frame indexed by item name with catalog_cost, catalog_category and
+    catalog_promotion_id columns, used to enrich jobs for the KPIs.
+
+    Inventory costs override service costs of the same name, while the category
+    follows the job form's lookup order: services, then inventory, then promotions.
+    Promotions are costed through their items, so a promotion's own catalog_cost is 0.
+    """
+    costs = {}
+    categories = {}
+    promotion_ids = {}
+    for service in services:
+        costs[service.get('name')] = _to_float(service.get('cost', 0))
+        categories.setdefault(service.get('name'), 'service')
+    for item in inventory:
+        costs[item.get('name')] = _to_float(item.get('cost', 0))
+        categories.setdefault(item.get('name'), 'product')
+    for promo in promotions:
+        categories.setdefault(promo.get('name'), 'promotion')
+        promotion_ids.setdefault(promo.get('name'), promo.get('id'))
+
+    names = [name for name in categories if name is not None]
+    return pd.DataFrame({
+        'catalog_cost': [costs.get(name, 0.0) for name in names],
+        'catalog_category': [categories[name] for name in names],
+        'catalog_promotion_id': [promotion_ids.get(name) for name in names],
+    }, index=pd.Index(names, name='item'))
+
+
+class Catalog:
+    """Name index over services, inventory and promotions, rebuilt when they change"""
+
+    def __init__(self, store=data_store):
+        self.store = store
+        self._sources = None
+        self._index = {}
+        self._frame = None
+        self._promotion_names = []
+        self._lock = threading.Lock()
+
+    def _load_sources(self):
+        services = self.store.load('services.json', default=[])
+        inventory = self.store.load('inventory.json', default=[])
+        try:
+            promotions = self.store.load('promotions.json', default=[])
+        except ValueError as e:
+            print(f"Error reading promotions for the catalog: {e}")
+            promotions = []
+        return services, inventory, promotions
+
+    def _current(self):
+        """Rebuild the index if any source file changed since the last build"""
+        sources = self._load_sources()
+        with self._lock:
+            if self._sources is None or not all(a is b for a, b in zip(self._sources, sources)):
+                self._index = build_index(*sources)
+                self._promotion_names = [p.get('name') for p in sources[2] if p.get('name')]
+                self._frame = None
+                # Keep the source lists alive so the identity check above stays valid
+                self._sources = sources
+            return self
+
+    def index(self):
+        """{name: CatalogEntry} of every catalog item; do not modify"""
+        return self._current()._index
+
+    def get(self, name):
+        """CatalogEntry of an item, or None if it is not in the catalog"""
+        return self._current()._index.get(name)
+
+    def resolve(self, names):
+        """{name: (category, promotion_id)}, with category 'unknown' for items not in the catalog"""
+        index = self.index()
+        resolved = {}
+        for name in names:
+            entry = index.get(name)
+            resolved[name] = (entry.category, entry.promotion_id) if entry else (UNKNOWN, None)
+        return resolved
+
+    def promotion_names(self):
+        """Names of all promotions"""
+        return self._current()._promotion_names
+
+    def frame(self):
+        """Catalog frame for enriching jobs (see build_catalog_frame); do not modify"""
+        self._current()
+        with self._lock:
+            if self._frame is None:
+                self._frame = build_catalog_frame(*self._sources)
+            return self._frame
+
+
+# Shared catalog used by the routes and the jobs enrichment
+catalog = Catalog()
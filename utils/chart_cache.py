@@ -0,0 +1,80 @@
+"""
+In-process LRU cache for rendered dashboard charts
+
+Rendering a chart (drawing the matplotlib figure, laying it out, saving and
+encoding the PNG) costs far more than serving it again. Charts are cached under
+a key that includes the jobs data version, so a new job makes older entries
+unreachable and they age out; the cache is bounded by the total size of the
+cached output, evicting the least recently used charts first.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+# Default budget for cached chart output, in bytes
+DEFAULT_MAX_BYTES = int(os.environ.get('SALON_CHART_CACHE_BYTES', 32 * 1024 * 1024))
+
+
+class ChartCache:
+    """Least recently used cache of rendered charts, bounded by total size"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value):
+        return len(value) if isinstance(value, (str, bytes)) else 0
+
+    def get(self, key):
+        """Return the cached value for key (marking it recently used), or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache value under key, evicting least recently used entries to stay within max_bytes"""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._sizeof(old)
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._sizeof(evicted)
+
+    def get_or_render(self, key, render, cacheable=lambda value: True):
+        """Return the cached value for key, calling render() and caching its result on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            if cacheable(value):
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# Shared cache for the dashboard charts
+chart_cache = ChartCache()
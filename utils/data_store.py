@@ -0,0 +1,222 @@
+"""
+In-process cache for the small JSON data files of the Anyada Salon application
+(services, inventory, customers, promotions).
+
+Parsed copies are kept in memory and revalidated against the file's mtime and
+size on every read, so steady-state reads skip both disk reads and JSON parsing.
+Writes go through save(), which replaces the file atomically and updates the
+cached copy at the same time.
+
+Small, frequent changes to a file (stock decrements for recorded jobs) can be
+journaled with append() instead of rewriting it: each change is one line
+appended to <name>.journal and replayed on top of the file when it is loaded.
+The journal starts with the MD5 of the snapshot it applies to, so a journal
+left over from before the last rewrite of the file is ignored. After
+COMPACT_EVERY changes the journal is folded back into the file.
+"""
+import os
+import sys
+import json
+import copy
+import hashlib
+import threading
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from path_fix import get_data_file_path
+from utils.journal import AppendLog, atomic_write
+
+# Journaled changes kept before they are folded back into the data file
+COMPACT_EVERY = 500
+
+
+class DataStore:
+    """Parsed JSON data files cached by filename and validated by (mtime, size)"""
+
+    def __init__(self):
+        # filename -> (signature, parsed data, snapshot MD5, journaled changes)
+        self._entries = {}
+        # filename -> (apply(data, change) -> new data, AppendLog)
+        self._journals = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _journal_path(filename):
+        return get_data_file_path(os.path.splitext(filename)[0] + '.journal')
+
+    def _full_signature(self, filename, path):
+        """Signature of the data file, plus that of its journal for journaled files"""
+        signature = self._signature(path)
+        if filename not in self._journals:
+            return signature
+        try:
+            return signature + self._signature(self._journal_path(filename))
+        except OSError:
+            return signature
+
+    def journal(self, filename, apply):
+        """
+        Journal changes to a data file: apply(data, change) returns the data
+        with one change made, without modifying data in place
+        """
+        with self._lock:
+            self._journals[filename] = (apply, AppendLog(self._journal_path(filename)))
+            self._entries.pop(filename, None)
+
+    def is_journaled(self, filename):
+        """True if changes to filename are journaled, so the file alone may be out of date"""
+        return filename in self._journals
+
+    def _replay(self, filename, data, digest):
+        """Apply the journal of filename to data; returns (data, number of changes applied)"""
+        apply = self._journals[filename][0]
+        try:
+            with open(self._journal_path(filename), 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return data, 0
+        try:
+            if not lines or json.loads(lines[0]).get('snapshot') != digest:
+                return data, 0  # Written against an older snapshot: already folded in
+        except ValueError:
+            return data, 0
+        count = 0
+        for line in lines[1:]:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                continue  # Torn last line of an interrupted write
+            data = apply(data, change)
+            count += 1
+        return data, count
+
+    def exists(self, filename):
+        """Return True if the data file exists"""
+        return os.path.isfile(get_data_file_path(filename))
+
+    def load(self, filename, default=None, copy_data=False):
+        """
+        Return the parsed contents of a data file, or default if it does not exist.
+
+        The returned object is shared with other requests and must be treated as
+        read-only; pass copy_data=True when the caller is going to modify it.
+        JSON decoding errors are propagated to the caller.
+        """
+        path = get_data_file_path(filename)
+        with self._lock:
+            try:
+                signature = self._full_signature(filename, path)
+            except OSError:
+                self._entries.pop(filename, None)
+                return default
+
+            entry = self._entries.get(filename)
+            if entry is not None and entry[0] == signature:
+                data = entry[1]
+            else:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw.decode('utf-8'))
+                digest = hashlib.md5(raw).hexdigest()
+                count = 0
+                if filename in self._journals:
+                    data, count = self._replay(filename, data, digest)
+                self._entries[filename] = (signature, data, digest, count)
+
+        return copy.deepcopy(data) if copy_data else data
+
+    def save(self, filename, data):
+        """Atomically replace a data file with data and refresh the cached copy"""
+        path = get_data_file_path(filename)
+        raw = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+        digest = hashlib.md5(raw).hexdigest()
+        with self._lock:
+            atomic_write(path, raw)
+            if filename in self._journals:
+                # Start a new, empty journal for the new snapshot
+                self._journals[filename][1].flush()
+                atomic_write(self._journal_path(filename), self._journal_header(digest))
+            self._entries[filename] = (self._full_signature(filename, path), data, digest, 0)
+
+    @staticmethod
+    def _journal_header(digest):
+        return (json.dumps({'snapshot': digest}) + '\n').encode('utf-8')
+
+    def append(self, filename, changes):
+        """
+        Record changes (a list) to a journaled data file in one write, without
+        rewriting it. Returns False (and records nothing) if the data file does not exist.
+        """
+        with self._lock:
+            data = self.load(filename)
+            if data is None:
+                return False
+            signature, _, digest, count = self._entries[filename]
+            apply, log = self._journals[filename]
+            journal_path = self._journal_path(filename)
+            if count == 0 and (len(signature) == 2 or not self._has_header(journal_path, digest)):
+                log.flush()
+                atomic_write(journal_path, self._journal_header(digest))
+            log.append(''.join(json.dumps(change, ensure_ascii=False) + '\n' for change in changes).encode('utf-8'))
+
+            for change in changes:
+                data = apply(data, change)
+            count += len(changes)
+            path = get_data_file_path(filename)
+            self._entries[filename] = (self._full_signature(filename, path), data, digest, count)
+            if count >= COMPACT_EVERY:
+                self.compact(filename)
+            return True
+
+    def _has_header(self, journal_path, digest):
+        """True if the journal exists and applies to the snapshot with this digest"""
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                return json.loads(f.readline()).get('snapshot') == digest
+        except (OSError, ValueError):
+            return False
+
+    def compact(self, filename):
+        """Fold the journal of a data file back into the file"""
+        with self._lock:
+            data = self.load(filename)
+            if data is not None:
+                self.save(filename, data)
+
+    def invalidate(self, filename=None):
+        """Drop the cached copy of one file, or of every file when filename is None"""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(filename, None)
+
+
+def apply_stock_change(inventory, change):
+    """
+    Apply a journaled stock change ({'name', 'quantity', 'date'}) to the
+    inventory list: adjust current_quantity and set last_date_sell of the item
+    """
+    for index, item in enumerate(inventory):
+        if item.get('name') == change.get('name'):
+            try:
+                updated = dict(item)
+                updated['current_quantity'] = int(item.get('current_quantity', 0)) + change['quantity']
+                updated['last_date_sell'] = change.get('date')
+            except Exception:
+                return inventory
+            inventory = list(inventory)
+            inventory[index] = updated
+            break
+    return inventory
+
+
+# Shared store used by all routes
+data_store = DataStore()
+# Stock changes from recorded jobs are journaled rather than rewriting inventory.json
+data_store.journal('inventory.json', apply_stock_change)
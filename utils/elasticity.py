@@ -0,0 +1,221 @@
+"""
+Price elasticity of demand fitted from the jobs history
+
+Each item's daily sales form one observation: the mean price charged that day
+and the quantity sold. Elasticity is the slope of log(quantity) against
+log(price), fitted by least squares from running sums (n, Σx, Σy, Σx², Σxy)
+kept per item. Appended jobs only touch the sums of the days they fall on, so
+the model is refit incrementally as the jobs table grows.
+
+Items with too few days or too little price variation fall back to the pooled
+(within-item) elasticity of their category, and then to DEFAULT_ELASTICITY.
+Fitted values are clamped to [MIN_ELASTICITY, MAX_ELASTICITY].
+"""
+import os
+import sys
+import math
+import threading
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+from utils.jobs_cache import jobs_table
+
+# Used when neither the item nor its category has enough price variation
+DEFAULT_ELASTICITY = -0.5
+MIN_ELASTICITY = -3.0
+MAX_ELASTICITY = 0.0
+# Days of sales an item (or category) needs before its own fit is trusted
+MIN_OBSERVATIONS = 5
+# Minimum variance of log(price) across those days (about a 3% price spread)
+MIN_LOG_PRICE_VARIANCE = 1e-3
+
+
+def daily_sales(rows):
+    """Quantity and revenue per (item, day) for a frame of prepared jobs rows"""
+    needed = ['item', 'day', 'quantity', 'revenue']
+    if rows.empty or not all(col in rows.columns for col in needed):
+        return pd.DataFrame(columns=['item', 'day', 'category', 'quantity', 'revenue'])
+    rows = pd.DataFrame({
+        'item': rows['item'],
+        'day': rows['day'],
+        'category': rows['category'] if 'category' in rows.columns else None,
+        'quantity': rows['quantity'],
+        'revenue': rows['revenue'],
+    })
+    rows = rows[rows['item'].notna() & rows['day'].notna()]
+    return rows.groupby(['item', 'day'], sort=False).agg(
+        category=('category', 'last'),
+        quantity=('quantity', 'sum'),
+        revenue=('revenue', 'sum'),
+    ).reset_index()
+
+
+def _observation(quantity, revenue):
+    """(log price, log quantity) of one day's sales, or None when it cannot be logged"""
+    if quantity <= 0 or revenue <= 0:
+        return None
+    return math.log(revenue / quantity), math.log(quantity)
+
+
+def fit_elasticities(sums, groups=None):
+    """
+    Vectorized least-squares fit from an (n, 5) array of per-item sums
+    [n, Σx, Σy, Σx², Σxy], with x = log price and y = log quantity.
+
+    Returns (elasticity, source) arrays. groups (integer codes, -1 for none)
+    pools items into categories for the fallback.
+    """
+    sums = np.asarray(sums, dtype=float).reshape(-1, 5)
+    count, sx, sy, sxx, sxy = sums.T
+    safe_count = np.where(count > 0, count, 1)
+    # Centred sums: Sxx = Σ(x - x̄)², Sxy = Σ(x - x̄)(y - ȳ)
+    centred_xx = sxx - sx * sx / safe_count
+    centred_xy = sxy - sx * sy / safe_count
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        item_fit = centred_xy / centred_xx
+    item_ok = (count >= MIN_OBSERVATIONS) & (centred_xx / safe_count >= MIN_LOG_PRICE_VARIANCE)
+
+    elasticity = np.full(len(sums), DEFAULT_ELASTICITY)
+    source = np.full(len(sums), 'default', dtype=object)
+
+    if groups is not None and len(sums):
+        groups = np.asarray(groups)
+        grouped = groups >= 0
+        size = int(groups.max()) + 1 if grouped.any() else 0
+        codes = groups[grouped]
+        # Within-category slope: pool every item's centred sums
+        group_count = np.bincount(codes, weights=count[grouped], minlength=size)
+        group_xx = np.bincount(codes, weights=centred_xx[grouped], minlength=size)
+        group_xy = np.bincount(codes, weights=centred_xy[grouped], minlength=size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            group_fit = group_xy / group_xx
+        group_ok = (group_count >= MIN_OBSERVATIONS) & (group_xx / np.maximum(group_count, 1) >= MIN_LOG_PRICE_VARIANCE)
+        use_group = np.zeros(len(sums), dtype=bool)
+        use_group[grouped] = group_ok[codes]
+        elasticity[use_group] = group_fit[groups[use_group]]
+        source[use_group] = 'category'
+
+    elasticity[item_ok] = item_fit[item_ok]
+    source[item_ok] = 'item'
+    return np.clip(elasticity, MIN_ELASTICITY, MAX_ELASTICITY), source
+
+
+class ElasticityModel:
+    """Per-item price elasticity of the jobs table, refit as jobs are appended"""
+
+    def __init__(self, table=jobs_table):
+        self.table = table
+        self._days = {}        # (item, day) -> [quantity, revenue]
+        self._sums = {}        # item -> [n, Σx, Σy, Σx², Σxy]
+        self._categories = {}  # item -> last seen category
+        self._version = None
+        self._fitted = None
+        self._fitted_lower = {}
+        self._lock = threading.RLock()
+        table.add_listener(self._on_jobs_changed)
+
+    def _on_jobs_changed(self, rows, reset):
+        with self._lock:
+            if reset:
+                self._rebuild(rows, self.table.version)
+            elif self._version == self.table.version - 1:
+                self._add(daily_sales(rows))
+                self._version = self.table.version
+            # Otherwise the model is already stale and is rebuilt on next use
+
+    def _rebuild(self, jobs_df, version):
+        days = daily_sales(jobs_df)
+        self._days = {
+            (item, day): [quantity, revenue]
+            for item, day, quantity, revenue in zip(days['item'], days['day'], days['quantity'], days['revenue'])
+        }
+        self._categories = {item: category for item, category in zip(days['item'], days['category'])
+                            if isinstance(category, str)}
+
+        # Whole-table sums in one pass: log price and log quantity of every sales day
+        valid = (days['quantity'] > 0) & (days['revenue'] > 0)
+        x = np.log(days['revenue'][valid] / days['quantity'][valid])
+        y = np.log(days['quantity'][valid].astype(float))
+        terms = pd.DataFrame({'item': days['item'][valid], 'n': 1.0, 'x': x, 'y': y, 'xx': x * x, 'xy': x * y})
+        sums = terms.groupby('item', sort=False)[['n', 'x', 'y', 'xx', 'xy']].sum()
+        self._sums = {item: list(values) for item, values in zip(sums.index, sums.to_numpy())}
+        for item in days['item'].unique():
+            self._sums.setdefault(item, [0.0] * 5)
+        self._version = version
+        self._fitted = None
+
+    def _add(self, days):
+        """Fold new (item, day) sales in, replacing the old observation of any day already seen"""
+        for item, day, category, quantity, revenue in days.itertuples(index=False):
+            sums = self._sums.setdefault(item, [0.0] * 5)
+            cell = self._days.get((item, day))
+            if cell is None:
+                cell = self._days[(item, day)] = [0, 0.0]
+            else:
+                self._apply(sums, _observation(*cell), -1)
+            cell[0] += quantity
+            cell[1] += revenue
+            self._apply(sums, _observation(*cell), 1)
+            if isinstance(category, str):
+                self._categories[item] = category
+        self._fitted = None
+
+    @staticmethod
+    def _apply(sums, observation, sign):
+        if observation is None:
+            return
+        x, y = observation
+        for i, term in enumerate((1.0, x, y, x * x, x * y)):
+            sums[i] += sign * term
+
+    def sync(self):
+        """Make sure the model reflects the current jobs table"""
+        # Refresh outside our lock: appended rows reach the model through the listener
+        self.table.refresh()
+        version = self.table.version
+        if self._version != version:
+            jobs_df = self.table.frame(copy=False)
+            with self._lock:
+                if self._version != version:
+                    self._rebuild(jobs_df, version)
+
+    def _fit(self):
+        """{item: (elasticity, source)} for every item, cached until the sums change"""
+        if self._fitted is None:
+            names = list(self._sums)
+            categories = sorted({self._categories.get(name) for name in names} - {None})
+            codes = {category: i for i, category in enumerate(categories)}
+            groups = [codes.get(self._categories.get(name), -1) for name in names]
+            values, sources = fit_elasticities([self._sums[name] for name in names], groups)
+            self._fitted = {name: (float(value), source) for name, value, source in zip(names, values, sources)}
+            self._fitted_lower = {}
+            for name in names:
+                self._fitted_lower.setdefault(str(name).lower(), self._fitted[name])
+        return self._fitted
+
+    def elasticities(self, item_names):
+        """Elasticity of each item (case-insensitive), DEFAULT_ELASTICITY for unknown items, as an array"""
+        self.sync()
+        with self._lock:
+            fitted = self._fit()
+            return np.array([
+                fitted.get(name, self._fitted_lower.get(str(name).lower(), (DEFAULT_ELASTICITY, 'default')))[0]
+                for name in item_names
+            ], dtype=float)
+
+    def details(self, item_name):
+        """{'elasticity', 'source'} of one item; source is item, category or default"""
+        self.sync()
+        with self._lock:
+            fitted = self._fit()
+            value, source = fitted.get(item_name, self._fitted_lower.get(str(item_name).lower(),
+                                                                         (DEFAULT_ELASTICITY, 'default')))
+            return {'elasticity': round(value, 3), 'source': source}
+
+
+# Shared elasticity model, kept in step with the shared jobs table
+elasticity_model = ElasticityModel()
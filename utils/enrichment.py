@@ -0,0 +1,64 @@
+"""
+Vectorized enrichment of jobs with item catalog data
+
+Joins the item-catalog frame (see utils.catalog) onto a jobs frame in a single
+pass, adding the catalog unit cost, category and promotion id of every job.
+"""
+import os
+import sys
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+from utils.catalog import catalog
+
+CATALOG_COLUMNS = ['catalog_cost', 'catalog_category', 'catalog_promotion_id']
+
+
+def get_catalog_frame():
+    """Return the catalog frame for the current data files, rebuilt only when they change"""
+    return catalog.frame()
+
+
+def enrich_jobs(jobs_df, catalog_df=None):
+    """
+    Return jobs_df with the catalog columns joined on by item name.
+    Items missing from the catalog get a cost of 0 and the 'unknown' category.
+    """
+    if catalog_df is None:
+        catalog_df = get_catalog_frame()
+
+    jobs_df = jobs_df.drop(columns=[c for c in CATALOG_COLUMNS if c in jobs_df.columns])
+    if 'item' not in jobs_df.columns:
+        for col in CATALOG_COLUMNS:
+            jobs_df[col] = None
+        return jobs_df
+
+    # One hash lookup per job for all catalog columns at once
+    mapped = catalog_df.reindex(jobs_df['item'].to_numpy(dtype=object))
+    mapped.index = jobs_df.index
+    enriched = pd.concat([jobs_df, mapped], axis=1)
+    enriched['catalog_cost'] = enriched['catalog_cost'].fillna(0.0)
+    enriched['catalog_category'] = enriched['catalog_category'].fillna('unknown')
+    return enriched
+
+
+def fill_catalog_columns(jobs_df):
+    """
+    Fill in the cost and category columns of a prepared jobs frame from the
+    catalog when jobs.csv was written without them (older ledger layouts).
+    """
+    if 'cost' in jobs_df.columns and 'category' in jobs_df.columns:
+        return jobs_df
+
+    jobs_df = enrich_jobs(jobs_df)
+    if 'cost' not in jobs_df.columns:
+        jobs_df['cost'] = jobs_df['catalog_cost'] * jobs_df['quantity']
+        # Profit was calculated without a cost column
+        if 'total_profit' not in jobs_df.columns:
+            jobs_df['profit'] = (jobs_df['price'] - jobs_df['cost']) * jobs_df['quantity']
+
+    if 'category' not in jobs_df.columns:
+        jobs_df['category'] = jobs_df['catalog_category']
+    return jobs_df
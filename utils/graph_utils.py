@@ -1,5 +1,4 @@
 import pandas as pd
-import plotly.express as px
 import matplotlib.pyplot as plt
 import matplotlib
 import matplotlib.patheffects as patheffects
@@ -14,104 +13,27 @@ import sys
 # Import path handling utilities
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from path_fix import get_data_path, get_data_file_path
+from utils.data_store import data_store
+from utils.jobs_cache import jobs_table
+from utils.enrichment import fill_catalog_columns
+from utils.rollups import rollup_store
+from utils.chart_cache import chart_cache
 
 # Thai Baht symbol
 BAHT_SYMBOL = '฿'
 
+# Pie slice colors of the category comparison, in category order (service, product, promotion, ...)
+CATEGORY_COLORS = ['#5a189a', '#7b2cbf', '#764ba2', '#9d4edd', '#c77dff']
+
 # Helper function to load jobs data safely
 def load_jobs_data():
-    """Load jobs data from jobs.csv with fallbacks for different formats"""
+    """Load jobs data from the shared jobs table, filling in cost and category if missing"""
     try:
-        # Try to load with headers first
-        jobs_path = get_data_file_path('jobs.csv')
-        print(f"Looking for jobs file at: {jobs_path}")
-        try:
-            jobs_df = pd.read_csv(jobs_path)
-            print("Loaded jobs.csv with headers")
-        except Exception as e1:
-            print(f"Error loading with headers: {e1}")
-            # Try different column configurations
-            try:
-                jobs_df = pd.read_csv(jobs_path, header=None,
-                              names=['timestamp', 'date', 'customer', 'item', 'quantity', 'price', 'cost', 'category'])
-                print("Loaded jobs.csv with 8 columns")
-            except Exception as e2:
-                print(f"Error loading with 8 columns: {e2}")
-                try:
-                    jobs_df = pd.read_csv(jobs_path, header=None,
-                                  names=['timestamp', 'date', 'customer', 'item', 'quantity', 'price', 'cost'])
-                    print("Loaded jobs.csv with 7 columns")
-                except Exception as e3:
-                    print(f"Error loading with 7 columns: {e3}")
-                    jobs_df = pd.read_csv('data/jobs.csv', header=None,
-                                 names=['timestamp', 'date', 'customer', 'item', 'quantity', 'price'])
-                    print("Loaded jobs.csv with 6 columns")
-                    
-        # Ensure numeric columns
-        for col in ['quantity', 'price']:
-            if col in jobs_df.columns:
-                jobs_df[col] = pd.to_numeric(jobs_df[col], errors='coerce').fillna(0)
-                if col == 'quantity':
-                    jobs_df[col] = jobs_df[col].astype(int)
-                    
-        # Add cost if missing but we have the mapping
-        if 'cost' not in jobs_df.columns:
-            # Load cost data from services and inventory
-            cost_map = {}
-            if os.path.exists('data/services.json'):
-                with open('data/services.json', 'r') as f:
-                    services = json.load(f)
-                    for service in services:
-                        cost_map[service.get('name')] = float(service.get('cost', 0))
-                        
-            if os.path.exists('data/inventory.json'):
-                with open('data/inventory.json', 'r') as f:
-                    inventory = json.load(f)
-                    for item in inventory:
-                        cost_map[item.get('name')] = float(item.get('cost', 0))
-                        
-            # Calculate costs
-            costs = []
-            for _, row in jobs_df.iterrows():
-                item_name = row['item']
-                quantity = row['quantity']
-                cost = cost_map.get(item_name, 0) * quantity
-                costs.append(cost)
-                
-            jobs_df['cost'] = costs
-        else:
-            # Ensure cost is numeric
-            jobs_df['cost'] = pd.to_numeric(jobs_df['cost'], errors='coerce').fillna(0)
-            
-        # Add category if missing
-        if 'category' not in jobs_df.columns:
-            # Create category mapping
-            category_map = {}
-            services_path = get_data_file_path('services.json')
-            if os.path.exists(services_path):
-                with open(services_path, 'r') as f:
-                    services_data = json.load(f)
-                    service_costs = {service['name']: service.get('cost', 0) for service in services_data}
-            
-            inventory_path = get_data_file_path('inventory.json')
-            if os.path.exists(inventory_path):
-                with open(inventory_path, 'r') as f:
-                    inventory = json.load(f)
-                    for item in inventory:
-                        category_map[item.get('name')] = "product"
-                        
-            # Assign categories
-            jobs_df['category'] = jobs_df['item'].map(category_map).fillna("unknown")
-            
-        # Calculate revenue and profit
-        jobs_df['revenue'] = jobs_df['price'] * jobs_df['quantity']
-        
-        # Use total_profit from CSV if available, otherwise calculate it
-        if 'total_profit' in jobs_df.columns:
-            jobs_df['profit'] = jobs_df['total_profit']
-        else:
-            # Calculate profit: (price - cost) * quantity (cost is unit cost)
-            jobs_df['profit'] = (jobs_df['price'] - jobs_df['cost']) * jobs_df['quantity']
+        # Typed jobs table with revenue and profit already calculated
+        jobs_df = jobs_table.frame()
+
+        # Add cost and category from the item catalog if missing
+        jobs_df = fill_catalog_columns(jobs_df)
         
         return jobs_df
         
@@ -124,6 +46,8 @@ def load_jobs_data():
 
 def generate_profit_chart():
     """Generate profit trend chart using jobs.csv data"""
+    # plotly is only needed here, import it on first use
+    import plotly.express as px
     try:
         # Load jobs data
         jobs_df = load_jobs_data()
@@ -160,21 +84,32 @@ def generate_profit_chart():
         print(f"Error generating profit chart: {e}")
         return "<div class='alert alert-danger'>Error generating profit chart</div>"
 
-def generate_daily_revenue_chart(chart_type='bar'):
+def load_chart_rollup(rollup=None):
+    """Return the given rollup, or the persisted daily rollup kept up to date with jobs.csv"""
+    if rollup is None:
+        rollup = rollup_store.daily()
+    return rollup
+
+def generate_daily_revenue_chart(chart_type='bar', rollup=None, output='html', render='server'):
     """Generate chart for total daily revenue with different visualization types
     
     Args:
         chart_type: Type of chart to generate ('bar', 'line', or 'pie')
+        rollup: Pre-aggregated jobs (see utils.rollups); the persisted daily rollup if omitted
+        output: 'html' for an <img> tag, or 'png' for the raw PNG bytes
+        render: 'server' to draw the chart here, or 'client' for just the aggregated series (see chart_series)
     """
     try:
-        # Load jobs data using our helper
-        jobs_df = load_jobs_data()
+        # Aggregated jobs data (one row per date, category and item)
+        rollup = load_chart_rollup(rollup)
+        if render == 'client':
+            return chart_series('total_profit', chart_type, rollup=rollup)
         
-        if jobs_df.empty:
+        if rollup.empty:
             return "<div class='alert alert-info'>No data available for analysis</div>"
         
         # Group by date
-        daily_revenue = jobs_df.groupby('date')['revenue'].sum()
+        daily_revenue = rollup.groupby('date')['revenue'].sum()
         avg_revenue = daily_revenue.mean()
         
         # Create chart with improved styling
@@ -264,74 +199,46 @@ def generate_daily_revenue_chart(chart_type='bar'):
         plt.close(fig)  # Explicitly close the figure to free memory
         buffer.close()
         
+        if output == 'png':
+            return image_png
+        
         chart = base64.b64encode(image_png).decode('utf-8')
         return f'<img src="data:image/png;base64,{chart}" alt="Daily Revenue Chart" style="width:100%;">'  
     except Exception as e:
         print(f"Error generating daily revenue chart ({chart_type}): {e}")
         return f"<div class='alert alert-danger'>Error generating {chart_type} chart for daily revenue: {e}</div>"
 
-def generate_item_profit_chart(chart_type='pie'):
+def generate_item_profit_chart(chart_type='pie', rollup=None, output='html', render='server'):
     """Generate chart for profit per inventory item with different visualization types
     
     Args:
         chart_type: Type of chart to generate ('bar', 'line', 'pie', or 'table')
+        rollup: Pre-aggregated jobs (see utils.rollups); the persisted daily rollup if omitted
+        output: 'html' for an <img> tag, or 'png' for the raw PNG bytes
+        render: 'server' to draw the chart here, or 'client' for just the aggregated series (see chart_series)
     """
     try:
-        # Load jobs data
-        jobs_df = load_jobs_data()
+        # Aggregated jobs data (one row per date, category and item)
+        rollup = load_chart_rollup(rollup)
+        if render == 'client':
+            return chart_series('profit_per_item', chart_type, rollup=rollup)
         
-        if jobs_df.empty:
+        if rollup.empty:
             return "<div class='alert alert-info'>No data available for analysis</div>"
             
         # Filter to only show inventory items (products), not services
-        if 'category' in jobs_df.columns:
-            # Use category column if available to filter for products only
-            products_df = jobs_df[jobs_df['category'] == 'product']
+        products_df = rollup[rollup['category'] == 'product']
+        
+        if products_df.empty:
+            return "<div class='alert alert-info'>No inventory items data available for analysis</div>"
             
-            if products_df.empty:
-                return "<div class='alert alert-info'>No inventory items data available for analysis</div>"
-                
-            # Group by inventory item
-            item_profit = products_df.groupby('item').agg({
-                'quantity': 'sum',
-                'revenue': 'sum',
-                'cost': 'sum',
-                'profit': 'sum'
-            }).sort_values('profit', ascending=False)
-        else:
-            # If no category column, try to determine products by loading inventory data
-            inventory_items = []
-            try:
-                inventory_path = get_data_file_path('inventory.json')
-                if os.path.exists(inventory_path):
-                    with open(inventory_path, 'r') as f:
-                        inventory = json.load(f)
-                        inventory_items = [item.get('name') for item in inventory]
-            except Exception as e:
-                print(f"Error loading inventory data: {e}")
-                
-            if not inventory_items:
-                # If no inventory data, just group by item
-                item_profit = jobs_df.groupby('item').agg({
-                    'quantity': 'sum',
-                    'revenue': 'sum',
-                    'cost': 'sum',
-                    'profit': 'sum'
-                }).sort_values('profit', ascending=False)
-            else:
-                # Filter jobs to only include inventory items
-                products_df = jobs_df[jobs_df['item'].isin(inventory_items)]
-                
-                if products_df.empty:
-                    return "<div class='alert alert-info'>No inventory items data available for analysis</div>"
-                    
-                # Group by inventory item
-                item_profit = products_df.groupby('item').agg({
-                    'quantity': 'sum',
-                    'revenue': 'sum',
-                    'cost': 'sum',
-                    'profit': 'sum'
-                }).sort_values('profit', ascending=False)
+        # Group by inventory item
+        item_profit = products_df.groupby('item').agg({
+            'quantity': 'sum',
+            'revenue': 'sum',
+            'cost': 'sum',
+            'profit': 'sum'
+        }).sort_values('profit', ascending=False)
         
         # Handle empty dataset
         if item_profit.empty:
@@ -487,6 +394,9 @@ def generate_item_profit_chart(chart_type='pie'):
         plt.close(fig)
         buffer.close()
         
+        if output == 'png':
+            return image_png
+        
         chart = base64.b64encode(image_png).decode('utf-8')
         # Add CSS classes for responsive behavior while maintaining readability
         return f'<img src="data:image/png;base64,{chart}" alt="Item Profit Chart" class="img-fluid chart-img" style="max-width:100%; width:auto; margin:0 auto; display:block;">'  
@@ -494,26 +404,26 @@ def generate_item_profit_chart(chart_type='pie'):
         print(f"Error generating item profit chart ({chart_type}): {e}")
         return f"<div class='alert alert-danger'>Error generating {chart_type} chart for item profit: {e}</div>"
 
-def generate_service_profit_chart(chart_type='bar'):
+def generate_service_profit_chart(chart_type='bar', rollup=None, output='html', render='server'):
     """Generate chart for profit per service type with different visualization types
     
     Args:
         chart_type: Type of chart to generate ('bar', 'line', or 'pie')
+        rollup: Pre-aggregated jobs (see utils.rollups); the persisted daily rollup if omitted
+        output: 'html' for an <img> tag, or 'png' for the raw PNG bytes
+        render: 'server' to draw the chart here, or 'client' for just the aggregated series (see chart_series)
     """
     try:
-        # Load jobs data
-        jobs_df = load_jobs_data()
+        # Aggregated jobs data (one row per date, category and item)
+        rollup = load_chart_rollup(rollup)
+        if render == 'client':
+            return chart_series('profit_per_service', chart_type, rollup=rollup)
         
-        if jobs_df.empty:
+        if rollup.empty:
             return "<div class='alert alert-info'>No data available for analysis</div>"
         
         # Get jobs that are services
-        if 'category' in jobs_df.columns:
-            # If we have category column, filter by it
-            services_df = jobs_df[jobs_df['category'] == 'service']
-        else:
-            # Otherwise, assume all are services (can be refined with better logic if needed)
-            services_df = jobs_df
+        services_df = rollup[rollup['category'] == 'service']
         
         if services_df.empty:
             return "<div class='alert alert-info'>No service data available for analysis</div>"
@@ -629,42 +539,41 @@ def generate_service_profit_chart(chart_type='bar'):
         plt.close(fig)
         buffer.close()
         
+        if output == 'png':
+            return image_png
+        
         chart = base64.b64encode(image_png).decode('utf-8')
         return f'<img src="data:image/png;base64,{chart}" alt="Service Profit Chart" style="width:100%;">'
     except Exception as e:
         print(f"Error generating service profit chart ({chart_type}): {e}")
         return f"<div class='alert alert-danger'>Error generating {chart_type} chart for service profit: {e}</div>"
 
-def generate_category_comparison_chart(chart_type='bar'):
-    """Generate chart comparing revenue and profit by category (service vs product)
+def generate_category_comparison_chart(chart_type='bar', rollup=None, output='html', render='server'):
+    """Generate chart comparing revenue and profit by category (services, products and promotions)
     
     Args:
         chart_type: Type of chart to generate ('bar', 'line', 'pie', or 'stacked')
+        rollup: Pre-aggregated jobs (see utils.rollups); the persisted daily rollup if omitted
+        output: 'html' for an <img> tag, or 'png' for the raw PNG bytes
+        render: 'server' to draw the chart here, or 'client' for just the aggregated series (see chart_series)
     """
     try:
-        # Load jobs data
-        jobs_df = load_jobs_data()
+        # Aggregated jobs data (one row per date, category and item)
+        rollup = load_chart_rollup(rollup)
+        if render == 'client':
+            return chart_series('category_comparison', chart_type, rollup=rollup)
         
-        if jobs_df.empty or 'category' not in jobs_df.columns:
+        if rollup.empty:
             return "<div class='alert alert-info'>No category data available for analysis</div>"
         
-        # Group by category
-        category_metrics = jobs_df.groupby('category').agg({
-            'revenue': 'sum',
-            'cost': 'sum',
-            'profit': 'sum'
-        })
-        
-        # Filter out unknown category if present
-        if 'unknown' in category_metrics.index:
-            category_metrics = category_metrics.drop('unknown')
-        
-        # Focus on service and product
-        if 'service' not in category_metrics.index:
-            category_metrics.loc['service'] = {'revenue': 0, 'cost': 0, 'profit': 0}
-            
-        if 'product' not in category_metrics.index:
-            category_metrics.loc['product'] = {'revenue': 0, 'cost': 0, 'profit': 0}
+        # Same categories and totals as the JSON series of this report
+        category_metrics = _category_totals(rollup)
+        category_names = list(category_metrics.index)
+        categories = [name.title() for name in category_names]
+        revenues = category_metrics['revenue'].tolist()
+        costs = category_metrics['cost'].tolist()
+        profits = category_metrics['profit'].tolist()
+        colors = [CATEGORY_COLORS[i % len(CATEGORY_COLORS)] for i in range(len(categories))]
         
         # Create appropriate chart based on type
         plt.style.use('ggplot')
@@ -674,14 +583,9 @@ def generate_category_comparison_chart(chart_type='bar'):
             fig, ax = plt.subplots(figsize=(10, 6), dpi=100)
             
             # Data preparation
-            categories = ['Service', 'Product']
             x = np.arange(len(categories))
             width = 0.35
             
-            # Extract values
-            revenues = [category_metrics.loc['service', 'revenue'], category_metrics.loc['product', 'revenue']]
-            profits = [category_metrics.loc['service', 'profit'], category_metrics.loc['product', 'profit']]
-            
             # Create bars
             revenue_bars = ax.bar(x - width/2, revenues, width, label=f'Revenue ({BAHT_SYMBOL})', color='#5a189a')
             profit_bars = ax.bar(x + width/2, profits, width, label=f'Profit ({BAHT_SYMBOL})', color='#7b2cbf')
@@ -709,29 +613,28 @@ def generate_category_comparison_chart(chart_type='bar'):
             add_value_labels(profit_bars)
             
         elif chart_type == 'pie':
-            # Create a pie chart comparing service vs product revenue
+            # Create a pie chart comparing revenue per category
             fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7), dpi=100)
+            pie_labels = [f'{category}s' for category in categories]
             
             # Revenue pie chart
-            revenue_data = [category_metrics.loc['service', 'revenue'], category_metrics.loc['product', 'revenue']]
             wedges1, texts1, autotexts1 = ax1.pie(
-                revenue_data,
-                labels=['Services', 'Products'],
+                revenues,
+                labels=pie_labels,
                 autopct='%1.1f%%',
                 startangle=90,
-                colors=['#5a189a', '#7b2cbf'],
+                colors=colors,
                 wedgeprops={'edgecolor': 'w', 'linewidth': 1}
             )
             ax1.set_title('Revenue Distribution', fontsize=14, fontweight='bold')
             
             # Profit pie chart
-            profit_data = [category_metrics.loc['service', 'profit'], category_metrics.loc['product', 'profit']]
             wedges2, texts2, autotexts2 = ax2.pie(
-                profit_data,
-                labels=['Services', 'Products'],
+                profits,
+                labels=pie_labels,
                 autopct='%1.1f%%',
                 startangle=90,
-                colors=['#5a189a', '#7b2cbf'],
+                colors=colors,
                 wedgeprops={'edgecolor': 'w', 'linewidth': 1}
             )
             ax2.set_title('Profit Distribution', fontsize=14, fontweight='bold')
@@ -754,27 +657,17 @@ def generate_category_comparison_chart(chart_type='bar'):
             # Create a line chart showing trends between categories
             fig, ax = plt.subplots(figsize=(10, 6), dpi=100)
             
-            # Extract data points
-            categories = ['Service', 'Product']
-            metrics = ['Revenue', 'Cost', 'Profit']
-            
             # Plot multiple metrics as lines
             x = np.arange(len(categories))
             
             # Plot each metric
-            ax.plot(x, [category_metrics.loc['service', 'revenue'], category_metrics.loc['product', 'revenue']], 
-                   marker='o', linestyle='-', linewidth=2, label=f'Revenue ({BAHT_SYMBOL})', color='#5a189a')
-            
-            ax.plot(x, [category_metrics.loc['service', 'cost'], category_metrics.loc['product', 'cost']], 
-                   marker='s', linestyle='--', linewidth=2, label=f'Cost ({BAHT_SYMBOL})', color='#e63946')
-            
-            ax.plot(x, [category_metrics.loc['service', 'profit'], category_metrics.loc['product', 'profit']], 
-                   marker='^', linestyle='-.', linewidth=2, label=f'Profit ({BAHT_SYMBOL})', color='#7b2cbf')
+            ax.plot(x, revenues, marker='o', linestyle='-', linewidth=2, label=f'Revenue ({BAHT_SYMBOL})', color='#5a189a')
+            ax.plot(x, costs, marker='s', linestyle='--', linewidth=2, label=f'Cost ({BAHT_SYMBOL})', color='#e63946')
+            ax.plot(x, profits, marker='^', linestyle='-.', linewidth=2, label=f'Profit ({BAHT_SYMBOL})', color='#7b2cbf')
             
             # Add data point labels
-            for i, metric in enumerate(['revenue', 'cost', 'profit']):
-                for j, category in enumerate(['service', 'product']):
-                    value = category_metrics.loc[category, metric]
+            for metric, values in [('revenue', revenues), ('cost', costs), ('profit', profits)]:
+                for j, value in enumerate(values):
                     # Adjust y-offset to prevent overlap
                     y_offset = 10 if metric == 'revenue' else (-10 if metric == 'cost' else 0)
                     ax.annotate(f'{BAHT_SYMBOL}{value:,.0f}', 
@@ -798,13 +691,8 @@ def generate_category_comparison_chart(chart_type='bar'):
             fig, ax = plt.subplots(figsize=(10, 6), dpi=100)
             
             # Data preparation
-            categories = ['Service', 'Product']
             x = np.arange(len(categories))
             
-            # Extract values
-            profits = [category_metrics.loc['service', 'profit'], category_metrics.loc['product', 'profit']]
-            costs = [category_metrics.loc['service', 'cost'], category_metrics.loc['product', 'cost']]
-            
             # Create stacked bars
             profit_bars = ax.bar(x, profits, label=f'Profit ({BAHT_SYMBOL})', color='#5a189a')
             cost_bars = ax.bar(x, costs, bottom=profits, label=f'Cost ({BAHT_SYMBOL})', color='#e63946')
@@ -835,8 +723,7 @@ def generate_category_comparison_chart(chart_type='bar'):
                            color='white', fontweight='bold')
                            
             # Add revenue annotations
-            for i, category in enumerate(['service', 'product']):
-                revenue = category_metrics.loc[category, 'revenue']
+            for i, revenue in enumerate(revenues):
                 ax.annotate(f'Revenue: {BAHT_SYMBOL}{revenue:,.0f}',
                            xy=(i, revenue + 10),
                            ha='center', va='bottom',
@@ -851,8 +738,92 @@ def generate_category_comparison_chart(chart_type='bar'):
         plt.close(fig)
         buffer.close()
         
+        if output == 'png':
+            return image_png
+        
         chart = base64.b64encode(image_png).decode('utf-8')
         return f'<img src="data:image/png;base64,{chart}" alt="Category Comparison Chart" style="width:100%;">'
     except Exception as e:
         print(f"Error generating category comparison chart ({chart_type}): {e}")
-        return f"<div class='alert alert-danger'>Error generating {chart_type} chart for category comparison: {e}</div>"
\ No newline at end of file
+        return f"<div class='alert alert-danger'>Error generating {chart_type} chart for category comparison: {e}</div>"
+
+# Dashboard reports: report_type -> (chart generator, report title)
+REPORTS = {
+    'total_profit': (generate_daily_revenue_chart, 'Daily Revenue Analysis'),
+    'profit_per_item': (generate_item_profit_chart, 'Profit Analysis - Inventory Products Only'),
+    'profit_per_service': (generate_service_profit_chart, 'Profit Per Service Type'),
+    'category_comparison': (generate_category_comparison_chart, 'Services vs Products Analysis'),
+}
+
+def render_report_chart(report_type, chart_type, window=None, output='html'):
+    """Render a dashboard report for a (start, end) day window, or all time if window is None
+
+    Rendered charts are served from the chart cache until the jobs data version
+    changes (every recorded job bumps it). With output='png' the raw PNG bytes
+    are returned, or an HTML message when there is nothing to draw.
+    """
+    generate, _ = REPORTS[report_type]
+    rollup_store.sync()
+    window_key = tuple(day.strftime('%Y-%m-%d') for day in window) if window else None
+    key = (report_type, chart_type, window_key, output, rollup_store.version)
+
+    def render():
+        rollup = rollup_store.daily_between(*window) if window else None
+        return generate(chart_type=chart_type, rollup=rollup, output=output)
+
+    # Error messages are not cached so the next request tries again
+    return chart_cache.get_or_render(
+        key, render, cacheable=lambda chart: isinstance(chart, bytes) or 'alert-danger' not in chart)
+
+def render_report_series(report_type, chart_type, window=None):
+    """Aggregated series of a dashboard report, from its generator's render='client' mode"""
+    generate, _ = REPORTS[report_type]
+    rollup = rollup_store.daily_between(*window) if window else None
+    return generate(chart_type=chart_type, rollup=rollup, render='client')
+
+def _category_totals(rollup):
+    """
+    Revenue, cost and profit per category for the category comparison: service
+    and product always, then any other recorded category (such as promotion);
+    jobs of unknown category are left out
+    """
+    table = rollup.groupby('category')[['revenue', 'cost', 'profit']].sum()
+    others = sorted(name for name in table.index if name not in ('service', 'product', 'unknown'))
+    return table.reindex(['service', 'product'] + others, fill_value=0)
+
+def _grouped_series(rollup, category, limit=None):
+    """Per-item totals for one category, highest profit first"""
+    grouped = rollup[rollup['category'] == category].groupby('item')[['quantity', 'revenue', 'cost', 'profit']].sum()
+    grouped = grouped.sort_values('profit', ascending=False)
+    return grouped.head(limit) if limit else grouped
+
+def chart_series(report_type, chart_type='bar', window=None, rollup=None):
+    """
+    Numbers behind a dashboard report for drawing it in the browser: a small
+    JSON-serialisable dict of labels and one list per series. 'value' names the
+    series a single-series chart (pie) should show.
+    """
+    if rollup is None:
+        rollup = rollup_store.daily_between(*window) if window else rollup_store.daily()
+
+    value = 'revenue' if report_type in ('total_profit', 'category_comparison') else 'profit'
+    if rollup.empty:
+        table = pd.DataFrame(columns=[value])
+    elif report_type == 'total_profit':
+        table = rollup.groupby('date')[['revenue']].sum()
+    elif report_type == 'profit_per_item':
+        # Same top 10 inventory products as the chart
+        table = _grouped_series(rollup, 'product', limit=10)
+    elif report_type == 'profit_per_service':
+        table = _grouped_series(rollup, 'service')
+    else:
+        table = _category_totals(rollup)
+
+    return {
+        'report_type': report_type,
+        'chart_type': chart_type,
+        'value': value,
+        'title': REPORTS[report_type][1],
+        'labels': [str(label) for label in table.index],
+        'series': {col: [round(float(v), 2) for v in table[col]] for col in table.columns},
+    }
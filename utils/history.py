@@ -0,0 +1,354 @@
+"""
+Paged job history for /history
+
+Jobs are listed newest day first and, within a day, in reverse order of entry.
+Pages are addressed with a keyset cursor, the (day, row id) of the last job
+shown, so fetching the next page is a binary search and a slice instead of
+skipping over all the rows before it. Totals over the filtered jobs are
+computed separately from the rows, once per filter combination.
+
+The index follows the shared jobs table: the sort order is rebuilt once per
+table version, and the filtered row lists of the most recent filter
+combinations are kept until the next change, so scrolling through a filtered
+history only costs the rows on each page. Jobs without a parsable date count
+as today, and items named like a promotion are reported as 'promotion', in
+both the CSV and the SQLite backend.
+
+Exports walk the same pages and write them out one page at a time, so an
+export of the whole ledger never holds more than a page of formatted rows.
+CSV is streamed as it is produced; XLSX (when openpyxl is installed) is
+written row by row to a temporary file and streamed from there.
+"""
+import io
+import os
+import sys
+import csv
+import tempfile
+import threading
+import importlib.util
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+from utils.catalog import catalog
+from utils.jobs_cache import jobs_table
+
+# Jobs per page, and the most a client may ask for
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+FILTER_FIELDS = ['date_from', 'date_to', 'customer_filter', 'type_filter', 'item_filter']
+CATEGORIES = ['service', 'product', 'promotion']
+
+# Filter combinations whose matching rows are kept between requests
+CACHED_QUERIES = 16
+
+# Jobs read per page while exporting
+EXPORT_PAGE_SIZE = 1000
+# Exported columns: (job field, heading); Profit is the one the history table shows
+EXPORT_COLUMNS = [('date', 'Date'), ('customer', 'Customer'), ('item', 'Item'), ('category', 'Category'),
+                  ('quantity', 'Quantity'), ('cost', 'Cost'), ('price', 'Price'), ('revenue', 'Total'),
+                  ('row_profit', 'Profit')]
+# Bytes of a finished XLSX file sent at a time
+XLSX_CHUNK_SIZE = 64 * 1024
+
+# Row ids are packed below the day in one int64 sort key
+_ID_BITS = 32
+_EPOCH = date(1970, 1, 1)
+
+
+def read_filters(args):
+    """The /history filters from request arguments, with blanks for the ones not given"""
+    filters = {name: args.get(name, '') for name in FILTER_FIELDS}
+    for name in ['customer_filter', 'item_filter']:
+        filters[name] = filters[name].strip()
+    return filters
+
+
+def read_limit(value):
+    """Page size from a request argument, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(day, row_id):
+    """Cursor pointing after the job of row_id on day ('YYYY-MM-DD')"""
+    return f'{day}.{row_id}'
+
+
+def decode_cursor(cursor):
+    """(day, row id) of a cursor; None for a missing or malformed cursor (the first page)"""
+    if not cursor:
+        return None
+    day, _, row_id = cursor.partition('.')
+    try:
+        datetime.strptime(day, '%Y-%m-%d')
+        return day, int(row_id)
+    except ValueError:
+        return None
+
+
+def today():
+    """Today as 'YYYY-MM-DD', the day of jobs without a parsable date"""
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def _ordinal(day):
+    """Days since 1970-01-01 of a 'YYYY-MM-DD' string"""
+    return (datetime.strptime(day, '%Y-%m-%d').date() - _EPOCH).days
+
+
+def _date_bound(value, upper):
+    """Day ordinal bounding a date filter value, or None if it cannot be parsed"""
+    try:
+        bound = pd.to_datetime(value)
+    except Exception as e:
+        print(f"Error filtering by {'to' if upper else 'from'}_date: {e}")
+        return None
+    day = bound.normalize()
+    ordinal = (day.date() - _EPOCH).days
+    # A bound with a time of day only admits the days fully on its side
+    return ordinal + 1 if not upper and bound != day else ordinal
+
+
+def date_filter_bounds(filters):
+    """
+    (first day, last day) admitted by the date filters as 'YYYY-MM-DD', with
+    None for a side that is not set or cannot be parsed; for the SQL backend
+    """
+    bounds = []
+    for field, upper in [('date_from', False), ('date_to', True)]:
+        ordinal = _date_bound(filters[field], upper) if filters.get(field) else None
+        bounds.append(None if ordinal is None else (_EPOCH + timedelta(days=ordinal)).isoformat())
+    return tuple(bounds)
+
+
+class HistoryIndex:
+    """Jobs table in history order, filtered and paged by keyset cursor"""
+
+    def __init__(self, table=jobs_table, items=catalog):
+        self.table = table
+        self.catalog = items
+        self._state = None
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _current(self):
+        """(jobs frame, sorted state) for the current jobs table, day and promotions"""
+        jobs_df = self.table.frame(copy=False)
+        key = (self.table.version, today())
+        promotion_names = self.catalog.promotion_names()
+        with self._lock:
+            state = self._state
+            if state is None or state['key'] != key or state['promotion_names'] is not promotion_names:
+                state = self._build(jobs_df, key, promotion_names)
+                self._state = state
+                self._queries.clear()
+            return jobs_df, state
+
+    @staticmethod
+    def _build(jobs_df, key, promotion_names):
+        n = len(jobs_df)
+        today_ordinal = _ordinal(key[1])
+        if 'day' in jobs_df.columns:
+            days = jobs_df['day'].to_numpy(dtype='datetime64[D]')
+            undated = np.isnat(days)
+            days = days.astype('int64')
+            days[undated] = today_ordinal
+        else:
+            days = np.full(n, today_ordinal, dtype='int64')
+
+        # Newest day first, later entries first within a day
+        keys = (days << _ID_BITS) + np.arange(n, dtype='int64')
+        order = np.argsort(keys, kind='stable')[::-1]
+
+        def column(name):
+            if name in jobs_df.columns:
+                return jobs_df[name].to_numpy(dtype=object)[order]
+            return np.full(n, None, dtype=object)
+
+        category = jobs_df['category'] if 'category' in jobs_df.columns else pd.Series(None, index=jobs_df.index)
+        # Dropdown options are built from the whole ledger, before filtering
+        options = {
+            'available_customers': sorted(jobs_df['customer'].dropna().unique().tolist()) if 'customer' in jobs_df.columns else [],
+            'available_items': sorted(jobs_df['item'].dropna().unique().tolist()) if 'item' in jobs_df.columns else [],
+            'items_by_category': {
+                name: sorted(jobs_df.loc[category == name, 'item'].dropna().unique().tolist())
+                if 'item' in jobs_df.columns else []
+                for name in CATEGORIES
+            },
+        }
+        if promotion_names and 'item' in jobs_df.columns:
+            category = category.where(~jobs_df['item'].isin(promotion_names), 'promotion')
+
+        return {
+            'key': key,
+            'promotion_names': promotion_names,
+            'sort_keys': keys[order],
+            'days': days[order],
+            'customer': column('customer'),
+            'item': column('item'),
+            'category': category.to_numpy(dtype=object)[order],
+            'revenue': jobs_df['revenue'].to_numpy(dtype=float)[order] if 'revenue' in jobs_df.columns else np.zeros(n),
+            'profit': jobs_df['profit'].to_numpy(dtype=float)[order] if 'profit' in jobs_df.columns else np.zeros(n),
+            'order': order,
+            'options': options,
+        }
+
+    def _query(self, filters):
+        """Sorted positions, negated sort keys and totals of the jobs matching filters"""
+        jobs_df, state = self._current()
+        query_key = tuple(filters.get(name, '') for name in FILTER_FIELDS)
+        with self._lock:
+            if self._state is state and query_key in self._queries:
+                self._queries.move_to_end(query_key)
+                return jobs_df, state, self._queries[query_key]
+
+        mask = np.ones(len(state['order']), dtype=bool)
+        if filters.get('date_from'):
+            bound = _date_bound(filters['date_from'], upper=False)
+            if bound is not None:
+                mask &= state['days'] >= bound
+        if filters.get('date_to'):
+            bound = _date_bound(filters['date_to'], upper=True)
+            if bound is not None:
+                mask &= state['days'] <= bound
+        for field, column in [('customer_filter', 'customer'), ('type_filter', 'category'), ('item_filter', 'item')]:
+            if filters.get(field):
+                mask &= state[column] == filters[field]
+
+        query = {
+            'positions': np.flatnonzero(mask),
+            'keys': -state['sort_keys'][mask],
+            'count': int(mask.sum()),
+            'total_revenue': float(state['revenue'][mask].sum()),
+            'total_profit': float(state['profit'][mask].sum()),
+        }
+        with self._lock:
+            if self._state is state:
+                self._queries[query_key] = query
+                while len(self._queries) > CACHED_QUERIES:
+                    self._queries.popitem(last=False)
+        return jobs_df, state, query
+
+    def page(self, filters, after=None, limit=PAGE_SIZE):
+        """
+        Up to limit jobs matching filters that come after the (day, row id)
+        cursor `after`, as (list of job dicts, cursor of the next page or None)
+        """
+        jobs_df, state, query = self._query(filters)
+        start = 0
+        if after is not None:
+            after_key = (_ordinal(after[0]) << _ID_BITS) + after[1]
+            start = int(np.searchsorted(query['keys'], -after_key, side='right'))
+        positions = query['positions'][start:start + limit]
+        if not len(positions):
+            return [], None
+
+        rows = state['order'][positions]
+        page = jobs_df.iloc[rows]
+        # Build the page column by column; per-cell access would dominate large pages
+        columns = {
+            'id': rows.tolist(),
+            'date': state['days'][positions].astype('datetime64[D]').astype(str).tolist(),
+        }
+        for name in ['customer', 'item', 'category']:
+            values = pd.Series(state[name][positions], dtype=object)
+            columns[name] = values.where(values.notna(), None).tolist()
+        for name in ['quantity', 'price', 'cost', 'revenue', 'profit']:
+            columns[name] = page[name].tolist() if name in page.columns else [0] * len(rows)
+        jobs = [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+        next_cursor = None
+        if start + limit < query['count']:
+            next_cursor = encode_cursor(jobs[-1]['date'], jobs[-1]['id'])
+        return jobs, next_cursor
+
+    def totals(self, filters):
+        """Number of jobs, revenue and profit over all jobs matching filters"""
+        _, _, query = self._query(filters)
+        return {
+            'total_count': query['count'],
+            'total_revenue': query['total_revenue'],
+            'total_profit': query['total_profit'],
+        }
+
+    def options(self):
+        """Customers, items and items per category for the filter dropdowns"""
+        return self._current()[1]['options']
+
+
+def iter_pages(fetch_page, page_size=EXPORT_PAGE_SIZE):
+    """
+    Yield every page of jobs, where fetch_page(after, limit) returns
+    (jobs, next cursor) like HistoryIndex.page
+    """
+    after = None
+    while True:
+        jobs, next_cursor = fetch_page(after, page_size)
+        if jobs:
+            yield jobs
+        after = decode_cursor(next_cursor)
+        if after is None:
+            return
+
+
+def row_profit(job):
+    """Profit of a job as the history table shows it: price x quantity less cost"""
+    return (job.get('price') or 0) * int(job.get('quantity') or 0) - (job.get('cost') or 0)
+
+
+def _export_row(job):
+    job = dict(job, row_profit=row_profit(job))
+    return [job.get(field) for field, _ in EXPORT_COLUMNS]
+
+
+def csv_export(pages):
+    """Yield a UTF-8 CSV file (with a BOM so spreadsheet programs detect the encoding) page by page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([heading for _, heading in EXPORT_COLUMNS])
+    yield '\ufeff' + buffer.getvalue()
+    for jobs in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_export_row(job) for job in jobs)
+        yield buffer.getvalue()
+
+
+def xlsx_available():
+    """True if openpyxl is installed, so exports can be written as XLSX"""
+    return importlib.util.find_spec('openpyxl') is not None
+
+
+def xlsx_export(pages):
+    """Yield an XLSX workbook of the pages in chunks of bytes"""
+    from openpyxl import Workbook
+
+    with tempfile.TemporaryFile() as f:
+        # Write-only mode streams rows to disk instead of keeping them in the workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('History')
+        sheet.append([heading for _, heading in EXPORT_COLUMNS])
+        for jobs in pages:
+            for job in jobs:
+                sheet.append(_export_row(job))
+        workbook.save(f)
+
+        f.seek(0)
+        while True:
+            chunk = f.read(XLSX_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+# Shared history index over the jobs table
+history_index = HistoryIndex()
@@ -0,0 +1,216 @@
+"""
+Per-item sales statistics maintained alongside the jobs table
+
+For every item the index keeps running totals (sales count, quantity,
+revenue, profit, price and cost sums), the lowest and highest price, a
+histogram of prices for the most common price and the set of customers.
+The index listens to the shared jobs table, so appended jobs are folded in
+as they are read and price suggestions and the simulator never rescan the
+whole ledger.
+"""
+import os
+import sys
+import threading
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+from utils.jobs_cache import jobs_table
+
+SUM_FIELDS = ['count', 'quantity', 'revenue', 'profit', 'price_sum', 'cost_sum']
+
+
+class ItemStats:
+    """Running statistics of one item"""
+    __slots__ = SUM_FIELDS + ['price_min', 'price_max', 'price_counts', 'customers']
+
+    def __init__(self):
+        for name in SUM_FIELDS:
+            setattr(self, name, 0)
+        self.price_min = None
+        self.price_max = None
+        self.price_counts = {}
+        self.customers = set()
+
+    def merge(self, other):
+        for name in SUM_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.price_min is not None:
+            self.price_min = other.price_min if self.price_min is None else min(self.price_min, other.price_min)
+            self.price_max = other.price_max if self.price_max is None else max(self.price_max, other.price_max)
+        for price, count in other.price_counts.items():
+            self.price_counts[price] = self.price_counts.get(price, 0) + count
+        self.customers |= other.customers
+
+    def popular_price(self):
+        """Most common price and how often it was used; ties go to the lowest price"""
+        return min(self.price_counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _column(rows, name, default=0):
+    return rows[name] if name in rows.columns else pd.Series(default, index=rows.index)
+
+
+def aggregate_items(rows):
+    """Per-item ItemStats for a frame of prepared jobs rows"""
+    if rows.empty or 'item' not in rows.columns:
+        return {}
+    rows = pd.DataFrame({
+        'item': rows['item'],
+        'customer': _column(rows, 'customer', None),
+        'quantity': _column(rows, 'quantity'),
+        'revenue': _column(rows, 'revenue'),
+        'profit': _column(rows, 'profit'),
+        'price': _column(rows, 'price'),
+        'cost': _column(rows, 'cost'),
+    })
+    rows = rows[rows['item'].notna()]
+
+    grouped = rows.groupby('item', sort=False).agg(
+        count=('price', 'size'),
+        quantity=('quantity', 'sum'),
+        revenue=('revenue', 'sum'),
+        profit=('profit', 'sum'),
+        price_sum=('price', 'sum'),
+        cost_sum=('cost', 'sum'),
+        price_min=('price', 'min'),
+        price_max=('price', 'max'),
+    )
+    price_counts = rows.groupby(['item', 'price'], sort=False).size()
+    customers = rows[rows['customer'].notna()].groupby('item', sort=False)['customer'].unique()
+
+    items = {}
+    for name, row in zip(grouped.index, grouped.itertuples(index=False)):
+        stats = ItemStats()
+        stats.count = int(row.count)
+        stats.quantity = int(row.quantity)
+        for field in ['revenue', 'profit', 'price_sum', 'cost_sum', 'price_min', 'price_max']:
+            setattr(stats, field, float(getattr(row, field)))
+        items[name] = stats
+    for (name, price), count in price_counts.items():
+        items[name].price_counts[float(price)] = int(count)
+    for name, values in customers.items():
+        items[name].customers = set(values)
+    return items
+
+
+class ItemStatsIndex:
+    """Per-item statistics of the jobs table, updated as jobs are appended"""
+
+    def __init__(self, table=jobs_table):
+        self.table = table
+        self._items = {}
+        self._lower = {}
+        self._version = None
+        self._metrics = None
+        self._lock = threading.RLock()
+        table.add_listener(self._on_jobs_changed)
+
+    def _on_jobs_changed(self, rows, reset):
+        with self._lock:
+            if reset:
+                self._rebuild(rows, self.table.version)
+            elif self._version == self.table.version - 1:
+                self._add(aggregate_items(rows))
+                self._version = self.table.version
+            # Otherwise the index is already stale and is rebuilt on next use
+
+    def _rebuild(self, jobs_df, version):
+        self._items = {}
+        self._lower = {}
+        self._add(aggregate_items(jobs_df))
+        self._version = version
+
+    def _add(self, items):
+        for name, stats in items.items():
+            current = self._items.get(name)
+            if current is None:
+                self._items[name] = stats
+                self._lower.setdefault(str(name).lower(), set()).add(name)
+            else:
+                current.merge(stats)
+        self._metrics = None
+
+    def sync(self):
+        """Make sure the index reflects the current jobs table"""
+        # Refresh outside our lock: appended rows reach the index through the listener
+        self.table.refresh()
+        version = self.table.version
+        if self._version != version:
+            jobs_df = self.table.frame(copy=False)
+            with self._lock:
+                if self._version != version:
+                    self._rebuild(jobs_df, version)
+
+    def price_stats(self, item_names):
+        """
+        Price statistics for each requested item, matched case-insensitively.
+
+        Returns {lowercased item name: stats dict}; items without any sales are left out.
+        """
+        self.sync()
+        result = {}
+        with self._lock:
+            for key in {str(name).lower() for name in item_names}:
+                names = self._lower.get(key)
+                if not names:
+                    continue
+                stats = ItemStats()
+                for name in names:
+                    stats.merge(self._items[name])
+                popular_price, popular_count = stats.popular_price()
+                result[key] = {
+                    'avg_price': stats.price_sum / stats.count,
+                    'min_price': stats.price_min,
+                    'max_price': stats.price_max,
+                    'avg_cost': stats.cost_sum / stats.count,
+                    'total_sales': stats.count,
+                    'popular_price': popular_price,
+                    'popular_count': popular_count,
+                }
+        return result
+
+    def item_metrics(self):
+        """
+        One row per item (sorted by name) with total quantity, revenue and profit,
+        mean price and cost and the number of distinct customers. Do not modify.
+        """
+        self.sync()
+        with self._lock:
+            if self._metrics is None:
+                names = sorted(self._items, key=str)
+                self._metrics = pd.DataFrame({
+                    'item': names,
+                    'quantity': [self._items[n].quantity for n in names],
+                    'revenue': [self._items[n].revenue for n in names],
+                    'profit': [self._items[n].profit for n in names],
+                    'price': [self._items[n].price_sum / self._items[n].count for n in names],
+                    'cost': [self._items[n].cost_sum / self._items[n].count for n in names],
+                    'customer': [len(self._items[n].customers) for n in names],
+                })
+            return self._metrics
+
+    def summary(self):
+        """Overall average price, customer count and the most requested item with its average price"""
+        self.sync()
+        with self._lock:
+            count = sum(stats.count for stats in self._items.values())
+            if not count:
+                return None
+            customers = set()
+            for stats in self._items.values():
+                customers |= stats.customers
+            # First item by name wins a tie, as idxmax over a sorted groupby does
+            top = max(sorted(self._items, key=str), key=lambda name: self._items[name].quantity)
+            top_stats = self._items[top]
+            return {
+                'avg_price': sum(stats.price_sum for stats in self._items.values()) / count,
+                'customer_count': len(customers),
+                'most_requested_item': top,
+                'most_requested_price': top_stats.price_sum / top_stats.count,
+            }
+
+
+# Shared item statistics, kept in step with the shared jobs table
+item_stats = ItemStatsIndex()
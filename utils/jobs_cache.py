@@ -0,0 +1,324 @@
+"""
+Shared in-memory jobs table for the Anyada Salon application
+
+jobs.csv is parsed once, numeric columns are coerced, dates are parsed and
+revenue/profit are precomputed. Since jobs are only ever appended, later
+refreshes read just the bytes added after the last known offset instead of
+reparsing the whole ledger.
+"""
+import os
+import sys
+import io
+import csv
+import threading
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+from path_fix import get_data_file_path
+from utils.journal import AppendLog
+
+# Columns written by the job form
+DEFAULT_COLUMNS = ['date', 'customer', 'item', 'quantity', 'price', 'cost', 'category']
+# Header of a jobs.csv created by the job form
+NEW_FILE_COLUMNS = DEFAULT_COLUMNS + ['promotion_id']
+
+# Fallback column layouts for files written without a header row
+LEGACY_LAYOUTS = [
+    ['timestamp', 'date', 'customer', 'item', 'quantity', 'price', 'cost', 'category'],
+    ['timestamp', 'date', 'customer', 'item', 'quantity', 'price', 'cost'],
+    ['timestamp', 'date', 'customer', 'item', 'quantity', 'price'],
+]
+
+
+def prepare_jobs(jobs_df):
+    """Coerce types and add the derived columns (day, revenue, profit) in place"""
+    if 'quantity' in jobs_df.columns:
+        jobs_df['quantity'] = pd.to_numeric(jobs_df['quantity'], errors='coerce').fillna(0).astype(int)
+    for col in ['price', 'cost', 'total_profit']:
+        if col in jobs_df.columns:
+            jobs_df[col] = pd.to_numeric(jobs_df[col], errors='coerce').fillna(0)
+
+    # Dates are written as DD/MM/YYYY by the job form
+    if 'date' in jobs_df.columns:
+        jobs_df['day'] = pd.to_datetime(jobs_df['date'], dayfirst=True, errors='coerce')
+
+    if 'price' in jobs_df.columns and 'quantity' in jobs_df.columns:
+        jobs_df['revenue'] = jobs_df['price'] * jobs_df['quantity']
+
+        # Use total_profit from CSV if available, otherwise calculate it
+        if 'total_profit' in jobs_df.columns:
+            jobs_df['profit'] = jobs_df['total_profit']
+        elif 'cost' in jobs_df.columns:
+            # Calculate profit: (price - cost) * quantity (cost is unit cost)
+            jobs_df['profit'] = (jobs_df['price'] - jobs_df['cost']) * jobs_df['quantity']
+        else:
+            jobs_df['profit'] = jobs_df['revenue']
+    return jobs_df
+
+
+def empty_jobs_frame(columns=None):
+    """Return an empty, typed jobs frame"""
+    return prepare_jobs(pd.DataFrame(columns=columns or DEFAULT_COLUMNS))
+
+
+def read_jobs_csv(path):
+    """
+    Parse a whole jobs CSV file (with the legacy header-less fallbacks)
+
+    Returns (raw jobs DataFrame, byte offset read up to, header line bytes, column names);
+    the column names are None when the file is empty.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    end = len(data)
+    header_end = data.find(b'\n') + 1 or end
+    header = data[:header_end]
+
+    if not data.strip():
+        return pd.DataFrame(columns=DEFAULT_COLUMNS), end, header, None
+
+    try:
+        jobs_df = pd.read_csv(io.BytesIO(data))
+    except Exception as e1:
+        print(f"Error loading jobs.csv with headers: {e1}")
+        jobs_df = None
+        for names in LEGACY_LAYOUTS:
+            try:
+                jobs_df = pd.read_csv(io.BytesIO(data), header=None, names=names)
+                print(f"Loaded jobs.csv with {len(names)} columns")
+                break
+            except Exception as e2:
+                print(f"Error loading with {len(names)} columns: {e2}")
+        if jobs_df is None:
+            jobs_df = pd.DataFrame(columns=DEFAULT_COLUMNS)
+
+    return jobs_df, end, header, list(jobs_df.columns)
+
+
+def read_jobs_tail(path, offset, header, columns):
+    """
+    Parse the complete rows appended to a jobs CSV file after offset
+
+    Returns (raw rows DataFrame, new offset), or None when the file no longer
+    matches what was read before (different header, offset not on a row boundary)
+    and must be read in full.
+    """
+    with open(path, 'rb') as f:
+        # Make sure this is still the same file: same header, row boundary at the offset
+        if header:
+            if f.read(len(header)) != header:
+                return None
+        if offset > 0:
+            f.seek(offset - 1)
+            if f.read(1) != b'\n':
+                return None
+        f.seek(offset)
+        tail = f.read()
+
+    # Only consume complete lines; a half-written row is picked up next time
+    end = tail.rfind(b'\n') + 1
+    if end == 0:
+        return pd.DataFrame(columns=columns or DEFAULT_COLUMNS), offset
+
+    if columns is None:
+        # What was read before was an empty file, the new bytes include the header
+        return None
+
+    new_rows = pd.read_csv(io.BytesIO(tail[:end]), header=None, names=columns)
+    return new_rows, offset + end
+
+
+class JobsTable:
+    """Typed copy of jobs.csv that follows appends by byte offset"""
+
+    def __init__(self, filename='jobs.csv'):
+        self.filename = filename
+        self.version = 0
+        self._df = None
+        self._signature = None
+        self._offset = 0
+        self._header = b''
+        self._columns = None
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def add_listener(self, listener):
+        """
+        Call listener(rows, reset) whenever the table changes: with the whole
+        table and reset=True after a full load, or with just the appended rows
+        and reset=False after new jobs were read from the end of jobs.csv
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _notify(self, rows, reset):
+        for listener in self._listeners:
+            try:
+                listener(rows, reset)
+            except Exception as e:
+                print(f"Error in jobs table listener {listener!r}: {e}")
+
+    @property
+    def path(self):
+        return get_data_file_path(self.filename)
+
+    def frame(self, copy=True):
+        """
+        Return the current jobs table, absorbing any rows appended since the last call.
+        Pass copy=False only when the caller will not modify the frame.
+        """
+        with self._lock:
+            self.refresh()
+            return self._df.copy() if copy else self._df
+
+    def refresh(self):
+        """Bring the cached table in line with jobs.csv; returns True if it changed"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                if self._signature is None and self._df is not None:
+                    return False
+                self._reset(empty_jobs_frame(), None, 0, b'', None)
+                return True
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return False
+
+            version = self.version
+            if self._df is not None and self._signature is not None and stat.st_size >= self._offset:
+                try:
+                    if self._absorb_tail(signature):
+                        return self.version != version
+                except Exception as e:
+                    print(f"Could not read appended jobs, reloading jobs.csv: {e}")
+
+            self._load_full()
+            return True
+
+    def _reset(self, jobs_df, signature, offset, header, columns):
+        self._df = jobs_df
+        self._signature = signature
+        self._offset = offset
+        self._header = header
+        self._columns = columns
+        self.version += 1
+        self._notify(jobs_df, True)
+
+    def _load_full(self):
+        """Parse the whole of jobs.csv"""
+        path = self.path
+        stat = os.stat(path)
+        jobs_df, offset, header, columns = read_jobs_csv(path)
+        self._reset(prepare_jobs(jobs_df), (stat.st_mtime_ns, stat.st_size), offset, header, columns)
+        print(f"Loaded jobs table with {len(jobs_df)} rows")
+
+    def _absorb_tail(self, signature):
+        """Parse only the bytes appended after the last offset; False if a full reload is needed"""
+        result = read_jobs_tail(self.path, self._offset, self._header, self._columns)
+        if result is None:
+            return False
+
+        new_rows, self._offset = result
+        self._signature = signature
+        if not new_rows.empty:
+            new_rows = prepare_jobs(new_rows)
+            if self._df.empty:
+                self._df = new_rows
+            else:
+                self._df = pd.concat([self._df, new_rows], ignore_index=True)
+            self.version += 1
+            self._notify(new_rows, False)
+        return True
+
+
+class JobsWriter:
+    """
+    Appends jobs to jobs.csv. Each call is a single append under a lock (see
+    utils.journal.AppendLog), and the header is read once per file rather
+    than on every write.
+    """
+
+    def __init__(self, filename='jobs.csv'):
+        self.filename = filename
+        self._log = None
+        self._columns = None
+        self._file_state = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return get_data_file_path(self.filename)
+
+    def _append_log(self):
+        path = self.path
+        if self._log is None or self._log.path != path:
+            self._log = AppendLog(path)
+        return self._log
+
+    @staticmethod
+    def _encode(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b'\n', b'\r')
+
+    def columns(self):
+        """Column names in the header of jobs.csv, which is created with NEW_FILE_COLUMNS if missing"""
+        with self._lock:
+            return self._read_columns()
+
+    def _read_columns(self):
+        path = self.path
+        if not os.path.exists(path):
+            self._append_log().append(self._encode([NEW_FILE_COLUMNS]))
+        stat = os.stat(path)
+        # Same file, not truncated since the header was read: the header is unchanged
+        if (self._file_state is not None and self._file_state[:2] == (stat.st_dev, stat.st_ino)
+                and stat.st_size >= self._file_state[2]):
+            return self._columns
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            self._columns = next(csv.reader(f), None) or []
+        # Size is unknown (-1) until our own first append: check the last line break then
+        self._file_state = (stat.st_dev, stat.st_ino, -1)
+        return self._columns
+
+    def append(self, rows):
+        """Append rows (lists of values) to jobs.csv in one write"""
+        self._append_bytes(self._encode(rows))
+
+    def append_frame(self, frame):
+        """Append the rows of a DataFrame, whose columns follow the jobs.csv header, in one write"""
+        if frame.empty:
+            return
+        buffer = io.StringIO()
+        frame.to_csv(buffer, header=False, index=False, lineterminator='\r\n')
+        self._append_bytes(buffer.getvalue().encode('utf-8'))
+
+    def _append_bytes(self, data):
+        with self._lock:
+            self._read_columns()
+            path = self.path
+            if self._file_state[2] != os.path.getsize(path) and not self._ends_with_newline(path):
+                # Written by something else without a final line break (e.g. a header-only file)
+                data = b'\r\n' + data
+            size = self._append_log().append(data)
+            self._file_state = self._file_state[:2] + (size,)
+
+
+# Shared jobs table used by the routes and chart generators
+jobs_table = JobsTable()
+# Shared writer for recording jobs
+jobs_writer = JobsWriter()
@@ -0,0 +1,322 @@
+"""
+Optional SQLite storage backend for jobs
+
+jobs.csv stays the file the job form appends to. This module mirrors it into an
+indexed `jobs` table (data/jobs.db) so /history filters run as SQL queries whose
+cost follows the size of the result instead of the size of the ledger, and
+each page of the history is read with a keyset query that walks an index.
+
+The mirror remembers how far into jobs.csv it has read, so keeping it current
+only costs a stat call until new rows are appended.
+
+Usage:
+    python -m utils.jobs_db import    # one-shot (re)import of jobs.csv
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from path_fix import get_data_file_path
+from utils.jobs_cache import read_jobs_csv, read_jobs_tail, prepare_jobs
+from utils.history import date_filter_bounds
+
+DB_FILENAME = 'jobs.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    day TEXT,
+    customer TEXT,
+    item TEXT,
+    quantity INTEGER,
+    price REAL,
+    cost REAL,
+    category TEXT,
+    promotion_id TEXT,
+    revenue REAL,
+    profit REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_day ON jobs(day);
+CREATE INDEX IF NOT EXISTS idx_jobs_customer ON jobs(customer, day);
+CREATE INDEX IF NOT EXISTS idx_jobs_item ON jobs(item, day);
+CREATE INDEX IF NOT EXISTS idx_jobs_category ON jobs(category, day);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+INSERT_SQL = """
+INSERT INTO jobs (day, customer, item, quantity, price, cost, category, promotion_id, revenue, profit)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Serialises imports so two requests never append the same rows twice
+_sync_lock = threading.Lock()
+# Databases whose schema was created by this process
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def get_db_path():
+    """Path of the SQLite jobs database in the data directory"""
+    return get_data_file_path(DB_FILENAME)
+
+
+def connect():
+    """Open a connection to the jobs database, creating the schema on first use"""
+    path = get_db_path()
+    if not os.path.exists(path):
+        _schema_ready.discard(path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    if path not in _schema_ready:
+        with _schema_lock:
+            conn.executescript(SCHEMA)
+            _schema_ready.add(path)
+    return conn
+
+
+@contextmanager
+def history_connection():
+    """One connection for the queries of a /history request, with the jobs table synced once"""
+    with closing(connect()) as conn:
+        sync(conn=conn)
+        yield conn
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return json.loads(row['value']) if row else None
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+
+def _to_records(jobs_df):
+    """Convert raw jobs rows into tuples for INSERT_SQL"""
+    jobs_df = prepare_jobs(jobs_df)
+    if jobs_df.empty:
+        return []
+
+    def column(name, default=None):
+        if name in jobs_df.columns:
+            return jobs_df[name].astype(object).where(jobs_df[name].notna(), default)
+        return [default] * len(jobs_df)
+
+    days = jobs_df['day'].dt.strftime('%Y-%m-%d') if 'day' in jobs_df.columns else None
+    return list(zip(
+        column('day') if days is None else days.astype(object).where(days.notna(), None),
+        column('customer'),
+        column('item'),
+        column('quantity', 0),
+        column('price', 0.0),
+        column('cost', 0.0),
+        column('category', 'unknown'),
+        [None if v is None else str(v) for v in column('promotion_id')],
+        column('revenue', 0.0),
+        column('profit', 0.0),
+    ))
+
+
+def import_jobs_csv(csv_path=None):
+    """
+    One-shot import: rebuild the jobs table from the whole of jobs.csv.
+
+    Accepts the same layouts launcher.migrate_jobs_csv() handles: the legacy
+    timestamp column is ignored and total_profit is used for profit when present.
+    """
+    csv_path = csv_path or get_data_file_path('jobs.csv')
+    with _sync_lock, closing(connect()) as conn:
+        return _import_all(conn, csv_path)
+
+
+def _import_all(conn, csv_path):
+    jobs_df, offset, header, columns = read_jobs_csv(csv_path)
+    records = _to_records(jobs_df)
+    with conn:
+        conn.execute("DELETE FROM jobs")
+        conn.executemany(INSERT_SQL, records)
+        _set_meta(conn, 'csv_offset', offset)
+        _set_meta(conn, 'csv_header', header.decode('utf-8', errors='replace'))
+        _set_meta(conn, 'csv_columns', columns)
+    print(f"Imported {len(records)} jobs into {get_db_path()}")
+    return len(records)
+
+
+def sync(csv_path=None, conn=None):
+    """
+    Bring the jobs table up to date with jobs.csv, importing only appended
+    rows; uses conn when given, otherwise a connection of its own
+    """
+    csv_path = csv_path or get_data_file_path('jobs.csv')
+    if not os.path.exists(csv_path):
+        return 0
+
+    if conn is None:
+        with closing(connect()) as conn:
+            return sync(csv_path, conn)
+
+    size = os.path.getsize(csv_path)
+    with _sync_lock:
+        offset = _get_meta(conn, 'csv_offset')
+        if offset == size:
+            return 0
+        if offset is None or size < offset:
+            return _import_all(conn, csv_path)
+
+        header = (_get_meta(conn, 'csv_header') or '').encode('utf-8')
+        columns = _get_meta(conn, 'csv_columns')
+        result = read_jobs_tail(csv_path, offset, header, columns)
+        if result is None:
+            return _import_all(conn, csv_path)
+
+        new_rows, new_offset = result
+        records = _to_records(new_rows)
+        with conn:
+            conn.executemany(INSERT_SQL, records)
+            _set_meta(conn, 'csv_offset', new_offset)
+        return len(records)
+
+
+def _history_filters(filters, promotion_names):
+    """
+    (category SQL expression, its parameters, WHERE clauses and parameters for
+    the customer, type and item filters) of the /history filters
+    """
+    promotion_names = list(promotion_names)
+    if promotion_names:
+        promo_marks = ', '.join('?' for _ in promotion_names)
+        category_sql = f"CASE WHEN item IN ({promo_marks}) THEN 'promotion' ELSE category END"
+        category_params = promotion_names
+    else:
+        category_sql = "category"
+        category_params = []
+
+    where = []
+    params = []
+    if filters.get('customer_filter'):
+        where.append("customer = ?")
+        params.append(filters['customer_filter'])
+    if filters.get('type_filter'):
+        # Written as plain comparisons on category and item so idx_jobs_category/idx_jobs_item apply
+        type_filter = filters['type_filter']
+        if promotion_names and type_filter == 'promotion':
+            where.append(f"(category = ? OR item IN ({promo_marks}))")
+            params += [type_filter] + promotion_names
+        elif promotion_names:
+            where.append(f"category = ? AND (item IS NULL OR item NOT IN ({promo_marks}))")
+            params += [type_filter] + promotion_names
+        else:
+            where.append("category = ?")
+            params.append(type_filter)
+    if filters.get('item_filter'):
+        where.append("item = ?")
+        params.append(filters['item_filter'])
+    return category_sql, category_params, where, params
+
+
+def history_page(conn, filters, limit, promotion_names=(), after=None):
+    """
+    One page of the /history jobs as indexed keyset queries: up to limit jobs
+    after the (day, id) cursor `after`, newest day first and later entries first
+    within a day. Returns (list of job dicts, (day, id) of the last job or None
+    when there are no more jobs).
+
+    Jobs without a parsable date count as today. Dated and undated jobs are
+    read with one query each, so both walk an index instead of sorting every
+    matching row, and merged here. conn comes from history_connection().
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    date_from, date_to = date_filter_bounds(filters)
+    category_sql, category_params, where, params = _history_filters(filters, promotion_names)
+    columns = f"id, customer, item, {category_sql} AS category, quantity, price, cost, revenue, profit"
+    dated_where = ["day IS NOT NULL"] + where
+    dated_params = list(params)
+    undated_where = ["day IS NULL"] + where
+    undated_params = list(params)
+    if after:
+        dated_where.append("(day, id) < (?, ?)")
+        dated_params += list(after)
+        undated_where.append("(?, id) < (?, ?)")
+        undated_params += [today] + list(after)
+    if date_from:
+        dated_where.append("day >= ?")
+        dated_params.append(date_from)
+    if date_to:
+        dated_where.append("day <= ?")
+        dated_params.append(date_to)
+
+    rows = [dict(row) for row in conn.execute(
+        f"""SELECT day AS date, {columns} FROM jobs
+            WHERE {' AND '.join(dated_where)}
+            ORDER BY day DESC, id DESC LIMIT ?""",
+        category_params + dated_params + [limit + 1])]
+
+    # Undated jobs only match when today is inside the date range
+    if (date_from or today) <= today <= (date_to or today):
+        rows += [dict(row) for row in conn.execute(
+            f"""SELECT ? AS date, {columns} FROM jobs
+                WHERE {' AND '.join(undated_where)}
+                ORDER BY id DESC LIMIT ?""",
+            [today] + category_params + undated_params + [limit + 1])]
+
+    rows.sort(key=lambda row: (row['date'], row['id']), reverse=True)
+    jobs = rows[:limit]
+    last = (jobs[-1]['date'], jobs[-1]['id']) if len(rows) > limit else None
+    return jobs, last
+
+
+def history_totals(conn, filters, promotion_names=()):
+    """Number of jobs, revenue and profit over all jobs matching the /history filters"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    date_from, date_to = date_filter_bounds(filters)
+    category_sql, category_params, where, params = _history_filters(filters, promotion_names)
+    date_where = []
+    date_params = []
+    if date_from:
+        date_where.append("COALESCE(day, ?) >= ?")
+        date_params += [today, date_from]
+    if date_to:
+        date_where.append("COALESCE(day, ?) <= ?")
+        date_params += [today, date_to]
+    where = date_where + where
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    totals = conn.execute(
+        f"SELECT COUNT(*), COALESCE(SUM(revenue), 0), COALESCE(SUM(profit), 0) FROM jobs {where_sql}",
+        date_params + params
+    ).fetchone()
+    return {'total_count': totals[0], 'total_revenue': totals[1], 'total_profit': totals[2]}
+
+
+def history_options(conn):
+    """Customers, items and items per category of the whole ledger, for the /history dropdowns"""
+    available_customers = [r[0] for r in conn.execute(
+        "SELECT DISTINCT customer FROM jobs WHERE customer IS NOT NULL ORDER BY customer")]
+    available_items = [r[0] for r in conn.execute(
+        "SELECT DISTINCT item FROM jobs WHERE item IS NOT NULL ORDER BY item")]
+    items_by_category = {}
+    for category in ['service', 'product', 'promotion']:
+        items_by_category[category] = [r[0] for r in conn.execute(
+            "SELECT DISTINCT item FROM jobs WHERE category = ? AND item IS NOT NULL ORDER BY item",
+            (category,))]
+
+    return {
+        'available_customers': available_customers,
+        'available_items': available_items,
+        'items_by_category': items_by_category,
+    }
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'import':
+        import_jobs_csv()
+    else:
+        print(__doc__)
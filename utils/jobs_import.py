@@ -0,0 +1,191 @@
+"""
+Bulk import of historical jobs from a CSV file
+
+The file is parsed in chunks and every chunk is validated with column-wide
+(vectorized) checks: a readable date, a positive whole quantity,
+non-negative numeric price and cost, and an item name. Categories are resolved
+against the item catalog; items that are not in the catalog keep the category
+given in the file, or 'unknown'. Bad rows are reported by line number and the
+good rows of the whole file are appended to jobs.csv in a single write, after
+which the jobs table, its indexes and the rollups pick them up incrementally.
+
+Imported jobs are history: stock levels in inventory.json are not changed.
+
+Expected columns (header names, any order): date, item, quantity, price and
+optionally customer, cost (total cost of the row; defaults to the catalog
+unit cost times quantity) and category. Dates may be DD/MM/YYYY or YYYY-MM-DD
+and are written as DD/MM/YYYY, like the job form does.
+
+Usage:
+    python -m utils.jobs_import FILE.csv [--dry-run] [--chunksize N]
+"""
+import os
+import sys
+import json
+import argparse
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+from utils.catalog import catalog, UNKNOWN
+from utils.jobs_cache import jobs_table, jobs_writer
+from utils.rollups import rollup_store
+
+REQUIRED_COLUMNS = ['date', 'item', 'quantity', 'price']
+OPTIONAL_COLUMNS = ['customer', 'cost', 'category']
+CATEGORIES = {'service', 'product', 'promotion', UNKNOWN}
+
+# Rows parsed and validated at a time
+CHUNK_SIZE = 50_000
+# Bad rows listed in the report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d']
+
+
+class JobsImportError(ValueError):
+    """The file cannot be imported at all (unreadable, missing columns)"""
+
+
+def _parse_dates(values):
+    """Parse date strings in any of DATE_FORMATS; NaT where none matches"""
+    parsed = pd.to_datetime(values, format=DATE_FORMATS[0], errors='coerce')
+    for date_format in DATE_FORMATS[1:]:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=date_format, errors='coerce')
+    return parsed
+
+
+def validate_chunk(chunk, categories, unit_costs):
+    """
+    Validate one chunk of raw (string) rows.
+
+    Returns (frame of the good rows with date, customer, item, quantity,
+    price, cost and category columns, {row index: [error messages]}).
+    """
+    text = {col: chunk[col].str.strip() if col in chunk.columns else pd.Series('', index=chunk.index)
+            for col in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+
+    dates = _parse_dates(text['date'])
+    quantity = pd.to_numeric(text['quantity'], errors='coerce')
+    price = pd.to_numeric(text['price'], errors='coerce')
+    cost_given = text['cost'] != ''
+    cost = pd.to_numeric(text['cost'].where(cost_given), errors='coerce')
+
+    checks = [
+        (text['item'] == '', 'item is missing'),
+        (dates.isna(), 'date is not DD/MM/YYYY or YYYY-MM-DD'),
+        (quantity.isna() | (quantity < 1) | (quantity % 1 != 0), 'quantity must be a whole number of at least 1'),
+        (price.isna() | ~np.isfinite(price) | (price < 0), 'price must be a number of at least 0'),
+        (cost_given & (cost.isna() | ~np.isfinite(cost) | (cost < 0)), 'cost must be a number of at least 0'),
+    ]
+    bad = pd.Series(False, index=chunk.index)
+    for mask, _ in checks:
+        bad |= mask
+    errors = {}
+    if bad.any():
+        for mask, message in checks:
+            for row in mask[mask].index:
+                errors.setdefault(row, []).append(message)
+
+    good = ~bad
+    items = text['item'][good]
+    quantity = quantity[good].astype(int)
+    # Catalog category wins; otherwise a valid category from the file, else 'unknown'
+    given = text['category'][good].str.lower()
+    category = items.map(categories)
+    category = category.fillna(given.where(given.isin(CATEGORIES))).fillna(UNKNOWN)
+    catalog_cost = items.map(unit_costs).fillna(0.0) * quantity
+    clean = pd.DataFrame({
+        'date': dates[good].dt.strftime('%d/%m/%Y'),
+        'customer': text['customer'][good],
+        'item': items,
+        'quantity': quantity,
+        'price': price[good].astype(float),
+        'cost': cost[good].where(cost_given[good], catalog_cost).astype(float),
+        'category': category,
+    })
+    return clean, errors
+
+
+def import_jobs(source, chunksize=CHUNK_SIZE, dry_run=False):
+    """
+    Validate a CSV file (path or text file object) of jobs and append its good rows to jobs.csv.
+
+    Returns a report: rows read, rows imported, number of bad rows and the
+    first MAX_REPORTED_ERRORS of them as {'line', 'errors'} (line 1 is the header).
+    """
+    index = catalog.index()
+    categories = {name: entry.category for name, entry in index.items()}
+    unit_costs = {name: entry.cost for name, entry in index.items()}
+    promotion_ids = {name: entry.promotion_id for name, entry in index.items() if entry.promotion_id is not None}
+
+    try:
+        reader = pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunksize,
+                             skipinitialspace=True, encoding='utf-8-sig' if isinstance(source, str) else None)
+    except (ValueError, OSError) as e:
+        raise JobsImportError(f'Cannot read the file: {e}')
+
+    frames = []
+    report = {'rows': 0, 'imported': 0, 'error_count': 0, 'errors': []}
+    try:
+        for chunk in reader:
+            chunk.columns = [str(col).strip().lower() for col in chunk.columns]
+            missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing:
+                raise JobsImportError(f"Missing required column(s): {', '.join(missing)}")
+
+            clean, errors = validate_chunk(chunk, categories, unit_costs)
+            frames.append(clean)
+            report['error_count'] += len(errors)
+            for row in sorted(errors):
+                if len(report['errors']) >= MAX_REPORTED_ERRORS:
+                    break
+                # Row index counts data rows from 0; line 1 is the header
+                report['errors'].append({'line': int(row) + 2, 'errors': errors[row]})
+            report['rows'] += len(chunk)
+    except pd.errors.ParserError as e:
+        raise JobsImportError(f'Cannot parse the file: {e}')
+
+    good = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    report['imported'] = len(good)
+    if dry_run or good.empty:
+        if dry_run:
+            report['dry_run'] = True
+        return report
+
+    good['promotion_id'] = [promotion_ids.get(name) for name in good['item']]
+    # Lay the rows out like the existing jobs.csv header; unknown columns stay blank
+    columns = jobs_writer.columns()
+    jobs_writer.append_frame(good.reindex(columns=columns))
+
+    # Absorb the new rows (and update the indexes listening to the table) and the rollups
+    jobs_table.refresh()
+    try:
+        rollup_store.sync()
+    except Exception as e:
+        print(f"Error updating rollups after import: {e}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import historical jobs from a CSV file into jobs.csv')
+    parser.add_argument('file', help='CSV file with date, item, quantity, price [, customer, cost, category] columns')
+    parser.add_argument('--dry-run', action='store_true', help='only validate and report, do not import')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help='rows validated at a time')
+    args = parser.parse_args()
+
+    try:
+        report = import_jobs(args.file, chunksize=args.chunksize, dry_run=args.dry_run)
+    except JobsImportError as e:
+        print(f"Import failed: {e}")
+        sys.exit(1)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Deferred imports for heavy libraries
+
+pandas and numpy take a large share of the application's start-up time, yet
+many routes (customers, services, the job form) never touch them. Modules bind
+them with lazy_import() instead of `import`, and the real import happens the
+first time an attribute of the module is used.
+
+The import goes through the regular import system, which holds a per-module
+lock, so threads touching the module for the first time at the same moment
+(a request and the warm-up thread) all get the fully initialised module.
+importlib.util.LazyLoader offers no such guarantee before Python 3.12.
+"""
+import sys
+import types
+import importlib
+import importlib.util
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported when one of its attributes is first used"""
+
+    def __getattr__(self, attr):
+        # Only called for attributes not yet copied over from the real module
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name):
+    """Return module `name`, imported on first attribute access"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return _LazyModule(name)
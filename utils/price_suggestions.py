@@ -0,0 +1,125 @@
+"""
+Promotional price suggestions from historical job prices
+
+Turns an item's price statistics (mean/min/max/most common price, average
+cost and number of sales, see utils.item_stats) into conservative, moderate,
+aggressive and popular-price suggestions. Given the item's price elasticity
+(see utils.elasticity) each suggestion also projects the change in volume and
+in total profit against selling at the average price.
+"""
+
+
+def project_demand(suggestions, avg_price, avg_cost, elasticity):
+    """Add expected volume and demand-adjusted profit changes (%) to each suggestion in place"""
+    for suggestion in suggestions:
+        volume = (suggestion['price'] / avg_price) ** elasticity
+        suggestion['expected_volume_change'] = round((volume - 1) * 100, 1)
+        if avg_price > avg_cost:
+            profit = (suggestion['price'] - avg_cost) * volume / (avg_price - avg_cost)
+            suggestion['projected_profit_change'] = round((profit - 1) * 100, 1)
+
+
+def build_suggestions(stats, elasticity=None):
+    """
+    Suggestion payload, as returned by /api/price-suggestions, for one item's
+    stats (None when it has no sales) and optional elasticity details
+    ({'elasticity', 'source'} from the elasticity model)
+    """
+    if not stats:
+        return {
+            'success': True,
+            'suggestions': [],
+            'message': 'No historical data available for this item'
+        }
+
+    avg_price = stats['avg_price']
+    min_price = stats['min_price']
+    max_price = stats['max_price']
+    avg_cost = stats['avg_cost']
+    total_sales = stats['total_sales']
+
+    # Calculate suggested promotional prices
+    suggestions = []
+
+    # Conservative discount (10-15%)
+    conservative_price = avg_price * 0.85
+    if conservative_price > avg_cost:
+        profit_retention = round(((conservative_price - avg_cost) / (avg_price - avg_cost)) * 100, 1)
+        suggestions.append({
+            'type': 'conservative',
+            'price': round(conservative_price, 2),
+            'discount_percent': 15,
+            'description': 'Safe discount maintaining good profit',
+            'explanation': f'Retains {profit_retention}% of original profit while offering attractive 15% discount. Low risk strategy.',
+            'profit_margin': round(((conservative_price - avg_cost) / conservative_price) * 100, 1),
+            'profit_retention': profit_retention,
+            'risk_level': 'Low'
+        })
+
+    # Moderate discount (20-25%)
+    moderate_price = avg_price * 0.75
+    if moderate_price > avg_cost:
+        profit_retention = round(((moderate_price - avg_cost) / (avg_price - avg_cost)) * 100, 1)
+        customer_savings = round(avg_price - moderate_price, 2)
+        suggestions.append({
+            'type': 'moderate',
+            'price': round(moderate_price, 2),
+            'discount_percent': 25,
+            'description': 'Attractive discount for customer appeal',
+            'explanation': f'Customers save ฿{customer_savings} per item. Retains {profit_retention}% profit while being competitive.',
+            'profit_margin': round(((moderate_price - avg_cost) / moderate_price) * 100, 1),
+            'profit_retention': profit_retention,
+            'risk_level': 'Medium'
+        })
+
+    # Aggressive discount (30-35%)
+    aggressive_price = avg_price * 0.65
+    if aggressive_price > avg_cost:
+        profit_retention = round(((aggressive_price - avg_cost) / (avg_price - avg_cost)) * 100, 1)
+        customer_savings = round(avg_price - aggressive_price, 2)
+        suggestions.append({
+            'type': 'aggressive',
+            'price': round(aggressive_price, 2),
+            'discount_percent': 35,
+            'description': 'High discount for maximum customer attraction',
+            'explanation': f'Major ฿{customer_savings} savings per item. {profit_retention}% profit retention. Best for clearing inventory or attracting new customers.',
+            'profit_margin': round(((aggressive_price - avg_cost) / aggressive_price) * 100, 1),
+            'profit_retention': profit_retention,
+            'risk_level': 'High'
+        })
+
+    # Most popular price (mode)
+    if total_sales > 1:
+        popular_price = stats['popular_price']
+        popular_discount = round((1 - (popular_price * 0.8) / avg_price) * 100)
+        if popular_price * 0.8 > avg_cost:
+            profit_retention = round(((popular_price * 0.8 - avg_cost) / (popular_price - avg_cost)) * 100, 1)
+            frequency = stats['popular_count']
+            suggestions.append({
+                'type': 'popular',
+                'price': round(popular_price * 0.8, 2),
+                'discount_percent': popular_discount,
+                'description': f'Based on most popular historical price (฿{popular_price})',
+                'explanation': f'This price was used {frequency} times out of {total_sales} sales. Proven customer acceptance with {profit_retention}% profit retention.',
+                'profit_margin': round(((popular_price * 0.8 - avg_cost) / (popular_price * 0.8)) * 100, 1),
+                'profit_retention': profit_retention,
+                'risk_level': 'Low'
+            })
+
+    historical_data = {
+        'avg_price': round(avg_price, 2),
+        'min_price': round(min_price, 2),
+        'max_price': round(max_price, 2),
+        'avg_cost': round(avg_cost, 2),
+        'total_sales': total_sales
+    }
+    if elasticity and avg_price > 0:
+        project_demand(suggestions, avg_price, avg_cost, elasticity['elasticity'])
+        historical_data['elasticity'] = elasticity['elasticity']
+        historical_data['elasticity_source'] = elasticity['source']
+
+    return {
+        'success': True,
+        'suggestions': suggestions,
+        'historical_data': historical_data
+    }
@@ -0,0 +1,107 @@
+"""
+Vectorized pricing scenarios for the simulator
+
+Every scenario is a percentage price change. For n items and m scenarios the
+new prices, revenue, profit and profit change are computed as (n, m) NumPy
+arrays in one go, so sweeping a whole grid of price changes across the
+catalog costs about as much as evaluating a single one.
+
+By default the quantity sold is assumed not to change. Given per-item price
+elasticities (see utils.elasticity) the quantity is scaled by
+(new price / price) ** elasticity instead.
+"""
+import os
+import sys
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+np = lazy_import('numpy')
+
+# Profit margin bands for the suggested increase: below 20% -> +15%, below 35% -> +10%, below 50% -> +5%
+MARGIN_BANDS = [(20, 15), (35, 10), (50, 5)]
+
+
+def suggested_increase(margins):
+    """Suggested price increase (%) for each profit margin (%)"""
+    margins = np.asarray(margins, dtype=float)
+    conditions = [margins < limit for limit, _ in MARGIN_BANDS]
+    return np.select(conditions, [increase for _, increase in MARGIN_BANDS], default=0)
+
+
+def price_grid(item_metrics, changes, round_prices=True, elasticities=None):
+    """
+    Evaluate percentage price changes for every item.
+
+    item_metrics needs price, cost (per unit), quantity and profit columns.
+    changes is either a list of m percentages applied to every item, or an
+    (n, 1) array with one percentage per item. Returns a dict of (n, m) arrays:
+    price, quantity, revenue, profit and profit_increase. Without elasticities
+    (one per item) the same quantity is assumed to be sold.
+    """
+    prices = item_metrics['price'].to_numpy(dtype=float)[:, None]
+    costs = item_metrics['cost'].to_numpy(dtype=float)[:, None]
+    quantities = item_metrics['quantity'].to_numpy(dtype=float)[:, None]
+    base_profit = item_metrics['profit'].to_numpy(dtype=float)[:, None]
+
+    changes = np.asarray(changes, dtype=float)
+    if changes.ndim == 1:
+        changes = changes[None, :]
+
+    new_prices = prices * (1 + changes / 100)
+    if round_prices:
+        new_prices = np.round(new_prices, 0)
+    if elasticities is None:
+        quantities = np.broadcast_to(quantities, new_prices.shape)
+    else:
+        elasticities = np.asarray(elasticities, dtype=float)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(prices > 0, new_prices / prices, 1.0)
+        quantities = quantities * np.power(np.maximum(ratio, 0), elasticities)
+    revenue = quantities * new_prices
+    profit = revenue - costs * quantities
+    return {
+        'price': new_prices,
+        'quantity': quantities,
+        'revenue': revenue,
+        'profit': profit,
+        'profit_increase': profit - base_profit,
+    }
+
+
+def sweep(item_metrics, changes, round_prices=True, elasticities=None):
+    """
+    Profit curve of every item over a grid of price changes, with the best
+    change per item and the catalog-wide total curve.
+    """
+    changes = np.asarray(changes, dtype=float)
+    if changes.ndim != 1 or not changes.size:
+        raise ValueError("changes must be a non-empty list of percentages")
+
+    grid = price_grid(item_metrics, changes, round_prices, elasticities)
+    profit = grid['profit']
+    best = profit.argmax(axis=1)
+    rows = np.arange(len(profit))
+    best_prices = grid['price'][rows, best]
+    best_profits = profit[rows, best]
+
+    items = []
+    for i, name in enumerate(item_metrics['item']):
+        item = {
+            'item': name,
+            'price': float(item_metrics['price'].iat[i]),
+            'profit': float(item_metrics['profit'].iat[i]),
+            'profit_curve': profit[i].round(2).tolist(),
+            'best_change_pct': float(changes[best[i]]),
+            'best_price': float(best_prices[i]),
+            'best_profit': round(float(best_profits[i]), 2),
+        }
+        if elasticities is not None:
+            item['elasticity'] = round(float(elasticities[i]), 3)
+        items.append(item)
+
+    return {
+        'changes': changes.tolist(),
+        'total_profit_curve': profit.sum(axis=0).round(2).tolist(),
+        'items': items,
+    }
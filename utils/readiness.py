@@ -0,0 +1,51 @@
+"""
+Start-up readiness tracking for the /healthz endpoint
+
+Start-up steps (resolving the data directory, warming caches, ...) mark
+themselves done here. The application is ready once every required step is
+done; optional steps are only reported.
+"""
+import time
+import threading
+
+
+class Readiness:
+    """Named start-up checks, some of which must pass before the app is ready"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._checks = {}
+        self._required = set()
+        self._lock = threading.Lock()
+
+    def require(self, name):
+        """Add a check that must be marked ready before the app reports ready"""
+        with self._lock:
+            self._required.add(name)
+            self._checks.setdefault(name, {'ready': False})
+
+    def mark(self, name, ready=True, **details):
+        """Record the state of a check, with optional details for the report"""
+        with self._lock:
+            self._checks[name] = dict(details, ready=ready,
+                                      seconds=round(time.time() - self.started, 3))
+
+    def is_ready(self):
+        with self._lock:
+            return all(self._checks.get(name, {}).get('ready') for name in self._required)
+
+    def report(self, extra=None):
+        """Readiness summary: overall state, uptime and each check"""
+        with self._lock:
+            checks = {name: dict(check, required=name in self._required)
+                      for name, check in self._checks.items()}
+        checks.update(extra or {})
+        return {
+            'ready': self.is_ready(),
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'checks': checks,
+        }
+
+
+# Shared readiness state of this process
+readiness = Readiness()
@@ -0,0 +1,285 @@
+"""
+Persisted daily rollups of jobs.csv
+
+The chart reports only need totals per day, item and category, so those totals
+are kept in data/rollups.json instead of being recomputed from every job on
+every request. Like the SQLite mirror, the rollup remembers how far into
+jobs.csv it has read: new jobs are folded in incrementally and the dashboard
+reads a table whose size follows the number of days and items, not the number
+of transactions. Monthly totals are summed from the daily rows when asked for.
+
+Folding in new jobs only updates the rollup in memory, so recording a job
+never rewrites the file. The file is written when the rollup is rebuilt, at
+most once every SAVE_INTERVAL seconds while jobs come in, and at exit. It holds
+the jobs.csv offset it reflects, so jobs appended after the last write are
+simply read again from jobs.csv the next time the rollup is loaded.
+
+Usage:
+    python -m utils.rollups rebuild    # recreate the rollups from jobs.csv
+"""
+import os
+import sys
+import atexit
+import threading
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+from path_fix import get_data_file_path
+from utils.data_store import data_store
+from utils.jobs_cache import read_jobs_csv, read_jobs_tail, prepare_jobs
+from utils.enrichment import fill_catalog_columns
+
+ROLLUP_FILENAME = 'rollups.json'
+
+# Seconds new jobs may stay only in memory (SALON_ROLLUP_SAVE_INTERVAL, 0 = write on every change)
+SAVE_INTERVAL = float(os.environ.get('SALON_ROLLUP_SAVE_INTERVAL', '30'))
+
+# Daily rows are keyed by ISO day (YYYY-MM-DD), monthly rows by month (YYYY-MM)
+KEY_COLUMNS = ['date', 'item', 'category']
+VALUE_COLUMNS = ['quantity', 'revenue', 'cost', 'profit']
+
+
+def _day_keys(jobs_df):
+    """ISO day of every job; dates that cannot be parsed keep their original text"""
+    raw = jobs_df['date'].astype(object).where(jobs_df['date'].notna(), None)
+    return jobs_df['day'].dt.strftime('%Y-%m-%d').astype(object).where(jobs_df['day'].notna(), raw)
+
+
+def aggregate_jobs(raw_df):
+    """Sum raw jobs rows into {(date, item, category): [quantity, revenue, cost, profit]}"""
+    jobs_df = prepare_jobs(raw_df)
+    if jobs_df.empty or 'date' not in jobs_df.columns or 'revenue' not in jobs_df.columns:
+        return {}
+    jobs_df = fill_catalog_columns(jobs_df)
+
+    frame = pd.DataFrame({
+        'date': _day_keys(jobs_df),
+        'item': jobs_df['item'].astype(object).where(jobs_df['item'].notna(), None),
+        'category': jobs_df['category'].astype(object).where(jobs_df['category'].notna(), None),
+        'quantity': jobs_df['quantity'],
+        'revenue': jobs_df['revenue'],
+        'cost': jobs_df['cost'],
+        'profit': jobs_df['profit'],
+    })
+    grouped = frame.groupby(KEY_COLUMNS, dropna=False, sort=False)[VALUE_COLUMNS].sum()
+    return {
+        tuple(None if pd.isna(k) else k for k in key): [float(v) for v in values]
+        for key, values in zip(grouped.index, grouped.to_numpy())
+    }
+
+
+def _merge(totals, additions):
+    for key, values in additions.items():
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+
+def _is_iso_day(day):
+    return isinstance(day, str) and len(day) == 10 and day[4] == '-' and day[7] == '-'
+
+
+def _month_of(day):
+    """YYYY-MM for an ISO day; other date text is kept as is"""
+    return day[:7] if _is_iso_day(day) else day
+
+
+class RollupStore:
+    """Daily (day, item, category) totals of jobs.csv, persisted and updated incrementally"""
+
+    def __init__(self, filename=ROLLUP_FILENAME, source='jobs.csv', save_interval=SAVE_INTERVAL):
+        self.filename = filename
+        self.source = source
+        self.save_interval = save_interval
+        self.version = 0
+        self._daily = None
+        self._offset = None
+        self._header = b''
+        self._columns = None
+        self._frames = {}
+        # True while the in-memory rollup is ahead of rollups.json
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+
+    @property
+    def source_path(self):
+        return get_data_file_path(self.source)
+
+    def data_stamp(self):
+        """(mtime_ns, size) of jobs.csv, identifying the data the rollups reflect; None if it does not exist"""
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def daily(self):
+        """Daily rollup as a DataFrame (date, item, category, quantity, revenue, cost, profit)"""
+        with self._lock:
+            self.sync()
+            if 'daily' not in self._frames:
+                self._frames['daily'] = self._to_frame(self._daily)
+            return self._frames['daily']
+
+    def daily_between(self, start, end):
+        """Daily rollup rows from start to end (inclusive days), cut from the date-sorted table by binary search"""
+        with self._lock:
+            daily = self.daily()
+            if 'daily_sorted' not in self._frames:
+                # Rows whose date could not be parsed never fall inside a window
+                dated = daily[daily['date'].map(_is_iso_day)]
+                self._frames['daily_sorted'] = dated.sort_values('date', kind='stable').reset_index(drop=True)
+            sorted_df = self._frames['daily_sorted']
+            # ISO days sort chronologically as text
+            days = sorted_df['date'].to_numpy(dtype=str)
+            lo = np.searchsorted(days, pd.Timestamp(start).strftime('%Y-%m-%d'), side='left')
+            hi = np.searchsorted(days, pd.Timestamp(end).strftime('%Y-%m-%d'), side='right')
+            return sorted_df.iloc[lo:hi]
+
+    def monthly(self):
+        """Daily rollup summed per month; the date column holds YYYY-MM"""
+        with self._lock:
+            self.sync()
+            if 'monthly' not in self._frames:
+                self._frames['monthly'] = self._to_frame(self._monthly_totals())
+            return self._frames['monthly']
+
+    def sync(self):
+        """Fold any jobs appended to jobs.csv into the rollups; returns the number of new jobs"""
+        with self._lock:
+            if self._daily is None and not self._load():
+                return self.rebuild()
+
+            csv_path = self.source_path
+            if not os.path.exists(csv_path):
+                if self._offset or self._daily:
+                    return self.rebuild()
+                return 0
+
+            size = os.path.getsize(csv_path)
+            if size == self._offset:
+                return 0
+            if self._offset is None or size < self._offset:
+                return self.rebuild()
+
+            try:
+                result = read_jobs_tail(csv_path, self._offset, self._header, self._columns)
+            except Exception as e:
+                print(f"Could not read appended jobs, rebuilding rollups: {e}")
+                result = None
+            if result is None:
+                return self.rebuild()
+
+            new_rows, self._offset = result
+            if not new_rows.empty:
+                _merge(self._daily, aggregate_jobs(new_rows))
+                self._changed()
+            self._dirty = True
+            self._schedule_save()
+            return len(new_rows)
+
+    def rebuild(self):
+        """Recreate the rollups from the whole of jobs.csv"""
+        with self._lock:
+            csv_path = self.source_path
+            if os.path.exists(csv_path):
+                jobs_df, offset, header, columns = read_jobs_csv(csv_path)
+            else:
+                jobs_df, offset, header, columns = pd.DataFrame(), 0, b'', None
+
+            self._daily = aggregate_jobs(jobs_df)
+            self._offset = offset
+            self._header = header
+            self._columns = columns
+            self._changed()
+            self._save()
+            print(f"Rebuilt rollups from {len(jobs_df)} jobs ({len(self._daily)} daily rows)")
+            return len(jobs_df)
+
+    def _schedule_save(self):
+        """Write the rollup after save_interval seconds, together with the changes made until then"""
+        if self.save_interval <= 0:
+            self._save()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.save_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write the rollup to rollups.json if it changed since the last write"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._save()
+
+    def _changed(self):
+        self._frames = {}
+        self.version += 1
+
+    def _monthly_totals(self):
+        monthly = {}
+        for (day, item, category), values in self._daily.items():
+            _merge(monthly, {(_month_of(day), item, category): values})
+        return monthly
+
+    def _to_frame(self, totals):
+        rows = [list(key) + values for key, values in totals.items()]
+        frame = pd.DataFrame(rows, columns=KEY_COLUMNS + VALUE_COLUMNS)
+        return frame.astype({col: float for col in VALUE_COLUMNS})
+
+    def _load(self):
+        """Read the persisted rollups; False if they are missing or unreadable"""
+        try:
+            data = data_store.load(self.filename)
+            if not data:
+                return False
+            source = data['source']
+            self._daily = {
+                (row['date'], row['item'], row['category']): [float(row[col]) for col in VALUE_COLUMNS]
+                for row in data['daily']
+            }
+            self._offset = source['offset']
+            self._header = source['header'].encode('utf-8')
+            self._columns = source['columns']
+            self._changed()
+            return True
+        except Exception as e:
+            print(f"Could not read {self.filename}, rebuilding rollups: {e}")
+            return False
+
+    def _save(self):
+        try:
+            data_store.save(self.filename, {
+                'source': {
+                    'offset': self._offset,
+                    'header': self._header.decode('utf-8', errors='replace'),
+                    'columns': self._columns,
+                },
+                'daily': [dict(zip(KEY_COLUMNS + VALUE_COLUMNS, list(key) + values))
+                          for key, values in self._daily.items()],
+            })
+            self._dirty = False
+        except Exception as e:
+            print(f"Error saving {self.filename}: {e}")
+
+
+# Shared rollup tables used by the job form and the chart generators
+rollup_store = RollupStore()
+# Keep the jobs folded in since the last write for the next start
+atexit.register(rollup_store.flush)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        rollup_store.rebuild()
+    else:
+        print(__doc__)
@@ -0,0 +1,171 @@
+"""
+Pricing simulator results, cached per version of the jobs data
+
+The base results (per-item totals, margins, the fixed and suggested price
+increases and their demand-adjusted projections) only change when jobs are
+added, so they are computed once per jobs table version together with their
+display formatting. Custom prices only recompute the rows of the items they
+name; every other row is reused as is.
+"""
+import os
+import sys
+import threading
+
+# Import path handling utilities
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.lazy_imports import lazy_import
+np = lazy_import('numpy')
+from utils.item_stats import item_stats
+from utils.elasticity import elasticity_model
+from utils.pricing import price_grid, suggested_increase
+
+# Price increases (%) shown for every item in the simulator
+FIXED_SCENARIOS = [5, 10, 15]
+
+# Per-item columns of the results; custom_* columns follow the custom prices
+CUSTOM_COLUMNS = ['custom_price', 'custom_price_increase_pct', 'revenue_custom', 'profit_custom',
+                  'profit_increase_custom', 'custom_profit_margin']
+
+
+def build_item_results(item_metrics, elasticities):
+    """Base simulator columns for every item, with custom prices equal to the current prices"""
+    item_metrics = item_metrics.copy()
+
+    # Calculate profit margin and potential optimizations
+    item_metrics['profit_margin'] = (item_metrics['profit'] / item_metrics['revenue'] * 100).round(2)
+
+    # Determine suggested price increase percentage based on profit margin
+    item_metrics['suggested_increase'] = suggested_increase(item_metrics['profit_margin'])
+
+    # Evaluate the fixed price increases for all items at once (assuming same quantity sold)
+    fixed = price_grid(item_metrics, FIXED_SCENARIOS)
+    for i, pct in enumerate(FIXED_SCENARIOS):
+        item_metrics[f'price_{pct}pct'] = fixed['price'][:, i]
+        item_metrics[f'revenue_{pct}pct'] = fixed['revenue'][:, i]
+        item_metrics[f'profit_{pct}pct'] = fixed['profit'][:, i]
+        item_metrics[f'profit_increase_{pct}pct'] = fixed['profit_increase'][:, i]
+
+    # Calculate suggested price and profit, one increase per item
+    suggested = price_grid(item_metrics, item_metrics[['suggested_increase']].to_numpy())
+    item_metrics['price_suggested'] = suggested['price'][:, 0]
+    item_metrics['revenue_suggested'] = suggested['revenue'][:, 0]
+    item_metrics['profit_suggested'] = suggested['profit'][:, 0]
+    item_metrics['profit_increase_suggested'] = suggested['profit_increase'][:, 0]
+
+    # Demand-adjusted projections: quantity follows each item's fitted price elasticity
+    item_metrics['elasticity'] = np.asarray(elasticities, dtype=float).round(2)
+    adjusted = price_grid(item_metrics, item_metrics[['suggested_increase']].to_numpy(),
+                          elasticities=elasticities)
+    item_metrics['quantity_suggested_adjusted'] = adjusted['quantity'][:, 0].round(1)
+    item_metrics['profit_suggested_adjusted'] = adjusted['profit'][:, 0]
+    item_metrics['profit_increase_suggested_adjusted'] = adjusted['profit_increase'][:, 0]
+
+    item_metrics['custom_price'] = item_metrics['price']
+    return apply_custom_columns(item_metrics)
+
+
+def apply_custom_columns(frame):
+    """(Re)compute the custom profit columns of frame from its custom_price column, in place"""
+    frame['custom_price_increase_pct'] = ((frame['custom_price'] / frame['price']) - 1) * 100
+    frame['revenue_custom'] = frame['quantity'] * frame['custom_price']
+    frame['profit_custom'] = frame['revenue_custom'] - (frame['cost'] * frame['quantity'])
+    frame['profit_increase_custom'] = frame['profit_custom'] - frame['profit']
+
+    # Calculate custom profit margin: (Custom Profit / Custom Revenue) * 100
+    frame['custom_profit_margin'] = (frame['profit_custom'] / frame['revenue_custom'] * 100).round(2)
+    # Handle division by zero
+    frame['custom_profit_margin'] = frame['custom_profit_margin'].fillna(0)
+    return frame
+
+
+def format_item(item):
+    """Format one item's results for display, in place"""
+    # Format currency values
+    for key in ['price', 'cost', 'price_5pct', 'price_10pct', 'price_15pct', 'price_suggested', 'custom_price']:
+        if key in item:
+            item[key] = f'฿{item[key]:,.0f}'
+
+    for key in item:
+        if any(term in key for term in ['revenue', 'profit']) and 'pct' not in key:
+            item[key] = f'฿{item[key]:,.2f}'
+
+    # Format percentages
+    if 'custom_price_increase_pct' in item:
+        item['custom_price_increase_pct'] = f'{item["custom_price_increase_pct"]:.1f}%'
+    return item
+
+
+class SimulatorResults:
+    """Base simulator results of the current jobs data, with custom prices applied on request"""
+
+    def __init__(self, stats=item_stats, model=elasticity_model):
+        self.stats = stats
+        self.model = model
+        self._version = None
+        self._frame = None
+        self._records = None
+        self._positions = None
+        self._lock = threading.Lock()
+
+    def _base(self):
+        """(version, frame sorted by suggested profit increase, formatted records) of the current data"""
+        item_metrics = self.stats.item_metrics()
+        version = self.stats.table.version
+        with self._lock:
+            if self._version != version:
+                frame = build_item_results(item_metrics, self.model.elasticities(item_metrics['item']))
+                # Sort by potential profit increase (using suggested percentage)
+                frame = frame.sort_values('profit_increase_suggested', ascending=False, kind='stable')
+                frame = frame.reset_index(drop=True)
+                self._frame = frame
+                self._records = [format_item(record) for record in frame.to_dict('records')]
+                self._positions = {name: i for i, name in enumerate(frame['item'])}
+                self._version = version
+            return self._version, self._frame, self._records, self._positions
+
+    @property
+    def version(self):
+        return self._base()[0]
+
+    def frame(self, custom_prices=None):
+        """
+        Per-item results as a DataFrame (do not modify without copying), sorted
+        by suggested profit increase, with custom prices ({item: price}) applied
+        """
+        _, frame, _, positions = self._base()
+        rows = [positions[name] for name in (custom_prices or {}) if name in positions]
+        if not rows:
+            return frame
+        frame = frame.copy()
+        frame.loc[rows, 'custom_price'] = [custom_prices[frame.at[row, 'item']] for row in rows]
+        changed = apply_custom_columns(frame.loc[rows].copy())
+        frame.loc[rows, CUSTOM_COLUMNS] = changed[CUSTOM_COLUMNS]
+        return frame
+
+    def records(self, custom_prices=None):
+        """
+        Formatted per-item records for the simulator page and the result frame;
+        only the rows of custom-priced items are formatted again
+        """
+        _, _, base_records, positions = self._base()
+        frame = self.frame(custom_prices)
+        records = list(base_records)
+        for name in custom_prices or {}:
+            row = positions.get(name)
+            if row is not None:
+                records[row] = format_item(frame.iloc[row].to_dict())
+        return records, frame
+
+    @staticmethod
+    def totals(frame):
+        """Total current, suggested, demand-adjusted and custom profit"""
+        return {
+            'total_current_profit': float(frame['profit'].sum()),
+            'total_suggested_profit': float(frame['profit_suggested'].sum()),
+            'total_adjusted_profit': float(frame['profit_suggested_adjusted'].sum()),
+            'total_custom_profit': float(frame['profit_custom'].sum()),
+        }
+
+
+# Shared simulator results, rebuilt when the jobs data changes
+simulator_results = SimulatorResults()